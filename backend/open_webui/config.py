@@ -4,6 +4,8 @@ import os
 import shutil
 import base64
 import redis
+import threading
+import time
 
 from datetime import datetime
 from pathlib import Path
@@ -24,6 +26,7 @@ from open_webui.env import (
     REDIS_KEY_PREFIX,
     REDIS_SENTINEL_HOSTS,
     REDIS_SENTINEL_PORT,
+    REDIS_CONFIG_SYNC_INTERVAL,
     FRONTEND_BUILD_DIR,
     OFFLINE_MODE,
     OPEN_WEBUI_DIR,
@@ -225,6 +228,7 @@ class AppConfig:
     _state: dict[str, PersistentConfig]
     _redis: Union[redis.Redis, redis.cluster.RedisCluster] = None
     _redis_key_prefix: str
+    _version: int
 
     def __init__(
         self,
@@ -235,6 +239,7 @@ class AppConfig:
     ):
         super().__setattr__("_state", {})
         super().__setattr__("_redis_key_prefix", redis_key_prefix)
+        super().__setattr__("_version", 0)
         if redis_url:
             super().__setattr__(
                 "_redis",
@@ -246,39 +251,131 @@ class AppConfig:
                 ),
             )
 
+            # Reads are served from the in-process snapshot in `_state`; a background
+            # thread keeps it fresh from pub/sub invalidations and the version counter.
+            threading.Thread(
+                target=self._redis_sync_listener,
+                name="app-config-redis-sync",
+                daemon=True,
+            ).start()
+
+    @property
+    def _redis_channel(self) -> str:
+        return f"{self._redis_key_prefix}:config:updates"
+
+    @property
+    def _redis_version_key(self) -> str:
+        return f"{self._redis_key_prefix}:config:version"
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self._redis_key_prefix}:config:{key}"
+
     def __setattr__(self, key, value):
         if isinstance(value, PersistentConfig):
             self._state[key] = value
+
+            if self._redis:
+                # Pick up values changed by other workers before this one started
+                try:
+                    self._sync_key_from_redis(key)
+                except Exception as e:
+                    log.error(f"Failed to load config {key} from Redis: {e}")
         else:
             self._state[key].value = value
             self._state[key].save()
 
             if self._redis:
-                redis_key = f"{self._redis_key_prefix}:config:{key}"
-                self._redis.set(redis_key, json.dumps(self._state[key].value))
+                try:
+                    self._redis.set(
+                        self._redis_key(key), json.dumps(self._state[key].value)
+                    )
+                    version = self._redis.incr(self._redis_version_key)
+                    super().__setattr__("_version", version)
+                    self._redis.publish(
+                        self._redis_channel,
+                        json.dumps({"key": key, "version": version}),
+                    )
+                except Exception as e:
+                    log.error(f"Failed to publish config update for {key}: {e}")
 
     def __getattr__(self, key):
         if key not in self._state:
             raise AttributeError(f"Config key '{key}' not found")
 
-        # If Redis is available, check for an updated value
-        if self._redis:
-            redis_key = f"{self._redis_key_prefix}:config:{key}"
-            redis_value = self._redis.get(redis_key)
-
-            if redis_value is not None:
-                try:
-                    decoded_value = json.loads(redis_value)
-
-                    # Update the in-memory value if different
-                    if self._state[key].value != decoded_value:
-                        self._state[key].value = decoded_value
-                        log.info(f"Updated {key} from Redis: {decoded_value}")
+        return self._state[key].value
 
-                except json.JSONDecodeError:
-                    log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
+    def _apply_redis_value(self, key: str, redis_value: Optional[str]):
+        if redis_value is None or key not in self._state:
+            return
 
-        return self._state[key].value
+        try:
+            decoded_value = json.loads(redis_value)
+        except json.JSONDecodeError:
+            log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
+            return
+
+        # Update the in-memory value if different
+        if self._state[key].value != decoded_value:
+            self._state[key].value = decoded_value
+            log.info(f"Updated {key} from Redis: {decoded_value}")
+
+    def _sync_key_from_redis(self, key: str):
+        self._apply_redis_value(key, self._redis.get(self._redis_key(key)))
+
+    def _sync_all_from_redis(self):
+        keys = list(self._state.keys())
+        if not keys:
+            return
+
+        values = self._redis.mget([self._redis_key(key) for key in keys])
+        for key, redis_value in zip(keys, values):
+            self._apply_redis_value(key, redis_value)
+
+    def _sync_version_from_redis(self, force: bool = False):
+        version = int(self._redis.get(self._redis_version_key) or 0)
+        if force or version != self._version:
+            self._sync_all_from_redis()
+            super().__setattr__("_version", version)
+
+    def _redis_sync_listener(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._redis_channel)
+
+                # Catch up on anything published while we were not subscribed
+                self._sync_version_from_redis(force=True)
+
+                while True:
+                    message = pubsub.get_message(timeout=REDIS_CONFIG_SYNC_INTERVAL)
+                    if message is None:
+                        # No invalidation received, fall back to the version counter
+                        self._sync_version_from_redis()
+                        continue
+
+                    if message.get("type") != "message":
+                        continue
+
+                    try:
+                        data = json.loads(message["data"])
+                    except (TypeError, json.JSONDecodeError):
+                        log.error(f"Invalid config update message: {message}")
+                        continue
+
+                    version = int(data.get("version") or 0)
+                    if version and version == self._version:
+                        # Published by this worker, the snapshot is already current
+                        continue
+
+                    if version and version != self._version + 1:
+                        # Missed at least one update in between, resync everything
+                        self._sync_version_from_redis(force=True)
+                    else:
+                        self._sync_key_from_redis(data.get("key"))
+                        super().__setattr__("_version", version)
+            except Exception as e:
+                log.error(f"Config sync with Redis failed, retrying: {e}")
+                time.sleep(REDIS_CONFIG_SYNC_INTERVAL)
 
 
 ####################################
@@ -800,6 +897,22 @@ S3_ENABLE_TAGGING = os.getenv("S3_ENABLE_TAGGING", "false").lower() == "true"
 UPLOAD_DIR = DATA_DIR / "uploads"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Uploads are copied to storage in chunks of this size, and at most
+# STORAGE_UPLOAD_BUFFER_SIZE bytes of chunks are held in memory at once
+try:
+    STORAGE_UPLOAD_CHUNK_SIZE = int(
+        os.environ.get("STORAGE_UPLOAD_CHUNK_SIZE", str(1024 * 1024))
+    )
+except ValueError:
+    STORAGE_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+try:
+    STORAGE_UPLOAD_BUFFER_SIZE = int(
+        os.environ.get("STORAGE_UPLOAD_BUFFER_SIZE", str(64 * 1024 * 1024))
+    )
+except ValueError:
+    STORAGE_UPLOAD_BUFFER_SIZE = 64 * 1024 * 1024
+
 
 ####################################
 # Cache DIR
@@ -1618,6 +1731,27 @@ ENABLE_TITLE_GENERATION = PersistentConfig(
     os.environ.get("ENABLE_TITLE_GENERATION", "True").lower() == "true",
 )
 
+# Generate the title, tags and follow-ups of a response in one structured call
+ENABLE_COMBINED_TASKS_GENERATION = PersistentConfig(
+    "ENABLE_COMBINED_TASKS_GENERATION",
+    "task.combined.enable",
+    os.environ.get("ENABLE_COMBINED_TASKS_GENERATION", "True").lower() == "true",
+)
+
+DEFAULT_CHAT_TASKS_GENERATION_PROMPT_TEMPLATE = """### Task:
+Generate the following fields describing the chat history:
+{{TASKS}}
+### Guidelines:
+- Use the chat's primary language; default to English if multilingual.
+- Prioritize accuracy over excessive creativity; keep it clear and simple.
+- Your entire response must consist solely of a single, raw JSON object with exactly these fields, without any markdown code fences or other encapsulating text.
+### Output:
+JSON format: {{OUTPUT}}
+### Chat History:
+<chat_history>
+{{MESSAGES:END:6}}
+</chat_history>"""
+
 
 ENABLE_SEARCH_QUERY_GENERATION = PersistentConfig(
     "ENABLE_SEARCH_QUERY_GENERATION",
@@ -1772,6 +1906,30 @@ Responses from models: {{responses}}"""
 
 VECTOR_DB = os.environ.get("VECTOR_DB", "chroma")
 
+# Items per upsert/delete call sent to the vector DB
+try:
+    VECTOR_DB_BATCH_SIZE = max(int(os.environ.get("VECTOR_DB_BATCH_SIZE", "1000")), 1)
+except ValueError:
+    VECTOR_DB_BATCH_SIZE = 1000
+
+# Threads the async vector DB interface runs synchronous backends on
+try:
+    VECTOR_DB_MAX_WORKERS = max(int(os.environ.get("VECTOR_DB_MAX_WORKERS", "8")), 1)
+except ValueError:
+    VECTOR_DB_MAX_WORKERS = 8
+
+# Seconds a cached collection handle is trusted before it is looked up again,
+# bounding how long another worker's delete can go unnoticed
+try:
+    VECTOR_DB_COLLECTION_CACHE_TTL = float(
+        os.environ.get("VECTOR_DB_COLLECTION_CACHE_TTL", "300")
+    )
+except ValueError:
+    VECTOR_DB_COLLECTION_CACHE_TTL = 300.0
+
+# Keyword (BM25) index used by hybrid search, kept next to the vector store
+BM25_INDEX_DIR = f"{DATA_DIR}/bm25_index"
+
 # Chroma
 CHROMA_DATA_PATH = f"{DATA_DIR}/vector_db"
 
@@ -1795,6 +1953,33 @@ if VECTOR_DB == "chroma":
     else:
         CHROMA_HTTP_HEADERS = None
     CHROMA_HTTP_SSL = os.environ.get("CHROMA_HTTP_SSL", "false").lower() == "true"
+
+# Embedded HNSW index (VECTOR_DB=hnsw)
+HNSW_DATA_PATH = f"{DATA_DIR}/hnsw_db"
+
+# Graph degree and build-time candidate list size, used for new collections
+try:
+    HNSW_M = int(os.environ.get("HNSW_M", "16"))
+except ValueError:
+    HNSW_M = 16
+
+try:
+    HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", "200"))
+except ValueError:
+    HNSW_EF_CONSTRUCTION = 200
+
+# Search-time candidate list size, higher trades latency for recall
+try:
+    HNSW_EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", "100"))
+except ValueError:
+    HNSW_EF_SEARCH = 100
+
+# Seconds between saves of a changed index, it is rebuilt from the stored
+# vectors if the process stops before saving
+try:
+    HNSW_SAVE_INTERVAL = float(os.environ.get("HNSW_SAVE_INTERVAL", "30"))
+except ValueError:
+    HNSW_SAVE_INTERVAL = 30.0
 # this uses the model defined in the Dockerfile ENV variable. If you dont use docker or docker based deployments such as k8s, the default embedding model will be used (sentence-transformers/all-MiniLM-L6-v2)
 
 
@@ -2133,6 +2318,65 @@ RAG_EMBEDDING_PREFIX_FIELD_NAME = os.environ.get(
     "RAG_EMBEDDING_PREFIX_FIELD_NAME", None
 )
 
+ENABLE_RAG_EMBEDDING_CACHE = (
+    os.environ.get("ENABLE_RAG_EMBEDDING_CACHE", "True").lower() == "true"
+)
+RAG_EMBEDDING_CACHE_PATH = f"{CACHE_DIR}/embeddings.sqlite3"
+
+# Maximum number of embeddings kept per tier, 0 disables the tier
+try:
+    RAG_EMBEDDING_CACHE_MEMORY_SIZE = int(
+        os.environ.get("RAG_EMBEDDING_CACHE_MEMORY_SIZE", "10000")
+    )
+except ValueError:
+    RAG_EMBEDDING_CACHE_MEMORY_SIZE = 10000
+
+try:
+    RAG_EMBEDDING_CACHE_DISK_SIZE = int(
+        os.environ.get("RAG_EMBEDDING_CACHE_DISK_SIZE", "500000")
+    )
+except ValueError:
+    RAG_EMBEDDING_CACHE_DISK_SIZE = 500000
+
+# Embedding batches in flight at once to an OpenAI or Ollama embedding backend
+try:
+    RAG_EMBEDDING_CONCURRENT_REQUESTS = max(
+        int(os.environ.get("RAG_EMBEDDING_CONCURRENT_REQUESTS", "4")), 1
+    )
+except ValueError:
+    RAG_EMBEDDING_CONCURRENT_REQUESTS = 4
+
+# Estimated tokens per embedding batch, 0 limits batches by RAG_EMBEDDING_BATCH_SIZE only
+try:
+    RAG_EMBEDDING_BATCH_MAX_TOKENS = int(
+        os.environ.get("RAG_EMBEDDING_BATCH_MAX_TOKENS", "100000")
+    )
+except ValueError:
+    RAG_EMBEDDING_BATCH_MAX_TOKENS = 100000
+
+# Retries of an embedding batch failing with 429, 5xx or a connection error
+try:
+    RAG_EMBEDDING_MAX_RETRIES = int(os.environ.get("RAG_EMBEDDING_MAX_RETRIES", "3"))
+except ValueError:
+    RAG_EMBEDDING_MAX_RETRIES = 3
+
+# Persistent queue of file ingestion jobs (uploads, knowledge reindexing)
+RAG_INGESTION_QUEUE_PATH = f"{DATA_DIR}/ingestion_queue.sqlite3"
+
+# Worker threads per process that run ingestion jobs
+try:
+    RAG_INGESTION_WORKERS = int(os.environ.get("RAG_INGESTION_WORKERS", "4"))
+except ValueError:
+    RAG_INGESTION_WORKERS = 4
+
+# Processes used to parse files, 0 parses in the worker threads
+try:
+    RAG_INGESTION_PARSE_PROCESSES = int(
+        os.environ.get("RAG_INGESTION_PARSE_PROCESSES", "2")
+    )
+except ValueError:
+    RAG_INGESTION_PARSE_PROCESSES = 2
+
 RAG_RERANKING_ENGINE = PersistentConfig(
     "RAG_RERANKING_ENGINE",
     "rag.reranking_engine",
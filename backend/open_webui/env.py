@@ -353,6 +353,32 @@ if DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL is not None:
     except Exception:
         DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL = 0.0
 
+# Last active timestamps are collected in memory and written for all users in
+# one statement every DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL seconds
+try:
+    DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL = float(
+        os.environ.get("DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL", "5")
+    )
+except Exception:
+    DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL = 5.0
+
+# Seconds an authenticated user (by id or API key) is reused across requests;
+# user changes made on this worker invalidate it immediately, changes on other
+# workers (e.g. a role change) take effect after this
+try:
+    DATABASE_USER_CACHE_TTL = float(os.environ.get("DATABASE_USER_CACHE_TTL", "10"))
+except Exception:
+    DATABASE_USER_CACHE_TTL = 10.0
+
+# Seconds a user's group ids are reused across requests; group edits made on
+# this worker invalidate them immediately, edits on other workers after this
+try:
+    DATABASE_GROUP_MEMBERSHIP_CACHE_TTL = float(
+        os.environ.get("DATABASE_GROUP_MEMBERSHIP_CACHE_TTL", "5")
+    )
+except Exception:
+    DATABASE_GROUP_MEMBERSHIP_CACHE_TTL = 5.0
+
 RESET_CONFIG_ON_START = (
     os.environ.get("RESET_CONFIG_ON_START", "False").lower() == "true"
 )
@@ -361,6 +387,31 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+# Streamed message changes (status, content, files, sources) are merged in
+# memory and written at most every CHAT_WRITE_BUFFER_INTERVAL seconds, or once
+# CHAT_WRITE_BUFFER_MAX_EVENTS changes are pending; 0 writes every change
+try:
+    CHAT_WRITE_BUFFER_INTERVAL = float(
+        os.environ.get("CHAT_WRITE_BUFFER_INTERVAL", "1")
+    )
+except ValueError:
+    CHAT_WRITE_BUFFER_INTERVAL = 1.0
+
+try:
+    CHAT_WRITE_BUFFER_MAX_EVENTS = int(
+        os.environ.get("CHAT_WRITE_BUFFER_MAX_EVENTS", "100")
+    )
+except ValueError:
+    CHAT_WRITE_BUFFER_MAX_EVENTS = 100
+
+# Chat search ranks at most this many of a user's most recent matching titles
+# and messages (more when paging deeper), which bounds the cost of very common
+# search terms
+try:
+    CHAT_SEARCH_MAX_MATCHES = int(os.environ.get("CHAT_SEARCH_MAX_MATCHES", "1000"))
+except ValueError:
+    CHAT_SEARCH_MAX_MATCHES = 1000
+
 ENABLE_QUERIES_CACHE = os.environ.get("ENABLE_QUERIES_CACHE", "False").lower() == "true"
 
 ####################################
@@ -384,6 +435,16 @@ try:
 except ValueError:
     REDIS_SENTINEL_MAX_RETRY_COUNT = 2
 
+# Interval (in seconds) at which workers compare the shared config version in Redis
+# with their local snapshot, as a fallback for missed pub/sub invalidation messages
+REDIS_CONFIG_SYNC_INTERVAL = os.environ.get("REDIS_CONFIG_SYNC_INTERVAL", "5")
+try:
+    REDIS_CONFIG_SYNC_INTERVAL = float(REDIS_CONFIG_SYNC_INTERVAL)
+    if REDIS_CONFIG_SYNC_INTERVAL <= 0:
+        REDIS_CONFIG_SYNC_INTERVAL = 5
+except ValueError:
+    REDIS_CONFIG_SYNC_INTERVAL = 5
+
 ####################################
 # UVICORN WORKERS
 ####################################
@@ -545,6 +606,47 @@ else:
         CHAT_RESPONSE_MAX_TOOL_CALL_RETRIES = 10
 
 
+# Tool calls of one model turn run concurrently, up to this many at a time
+CHAT_RESPONSE_MAX_TOOL_CALL_CONCURRENCY = os.environ.get(
+    "CHAT_RESPONSE_MAX_TOOL_CALL_CONCURRENCY", "8"
+)
+
+try:
+    CHAT_RESPONSE_MAX_TOOL_CALL_CONCURRENCY = max(
+        int(CHAT_RESPONSE_MAX_TOOL_CALL_CONCURRENCY), 1
+    )
+except Exception:
+    CHAT_RESPONSE_MAX_TOOL_CALL_CONCURRENCY = 8
+
+# Seconds a single tool call may take before its result becomes a timeout error
+CHAT_RESPONSE_TOOL_CALL_TIMEOUT = os.environ.get("CHAT_RESPONSE_TOOL_CALL_TIMEOUT", "")
+
+if CHAT_RESPONSE_TOOL_CALL_TIMEOUT == "":
+    CHAT_RESPONSE_TOOL_CALL_TIMEOUT = None
+else:
+    try:
+        CHAT_RESPONSE_TOOL_CALL_TIMEOUT = float(CHAT_RESPONSE_TOOL_CALL_TIMEOUT)
+    except Exception:
+        CHAT_RESPONSE_TOOL_CALL_TIMEOUT = None
+
+# Seconds a generated title, tags or follow-ups are reused for the same prompt
+TASK_RESULT_CACHE_TTL = os.environ.get("TASK_RESULT_CACHE_TTL", "3600")
+
+try:
+    TASK_RESULT_CACHE_TTL = int(TASK_RESULT_CACHE_TTL)
+except Exception:
+    TASK_RESULT_CACHE_TTL = 3600
+
+# Seconds a task model that rejected the structured output of the combined chat
+# tasks is not asked for them again
+CHAT_TASKS_UNSUPPORTED_TTL = os.environ.get("CHAT_TASKS_UNSUPPORTED_TTL", "86400")
+
+try:
+    CHAT_TASKS_UNSUPPORTED_TTL = int(CHAT_TASKS_UNSUPPORTED_TTL)
+except Exception:
+    CHAT_TASKS_UNSUPPORTED_TTL = 86400
+
+
 ####################################
 # WEBSOCKET SUPPORT
 ####################################
@@ -571,6 +673,31 @@ except ValueError:
 WEBSOCKET_SENTINEL_HOSTS = os.environ.get("WEBSOCKET_SENTINEL_HOSTS", "")
 WEBSOCKET_SENTINEL_PORT = os.environ.get("WEBSOCKET_SENTINEL_PORT", "26379")
 
+# Pending collaborative document updates are merged into the stored snapshot
+# once either threshold is reached
+try:
+    YDOC_COMPACTION_UPDATES = int(os.environ.get("YDOC_COMPACTION_UPDATES", "500"))
+except ValueError:
+    YDOC_COMPACTION_UPDATES = 500
+
+try:
+    YDOC_COMPACTION_BYTES = int(os.environ.get("YDOC_COMPACTION_BYTES", "1048576"))
+except ValueError:
+    YDOC_COMPACTION_BYTES = 1048576
+
+# Decoded collaborative documents kept in memory by each worker
+try:
+    YDOC_CACHED_DOCUMENTS = int(os.environ.get("YDOC_CACHED_DOCUMENTS", "100"))
+except ValueError:
+    YDOC_CACHED_DOCUMENTS = 100
+
+# Seconds between keep-alive comments on idle server-sent event streams, so
+# proxies do not close a stream that is waiting for the next state change
+try:
+    SSE_HEARTBEAT_INTERVAL = float(os.environ.get("SSE_HEARTBEAT_INTERVAL", "15"))
+except ValueError:
+    SSE_HEARTBEAT_INTERVAL = 15.0
+
 
 AIOHTTP_CLIENT_TIMEOUT = os.environ.get("AIOHTTP_CLIENT_TIMEOUT", "")
 
@@ -620,6 +747,70 @@ AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL = (
     os.environ.get("AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL", "True").lower() == "true"
 )
 
+# Shared connection pool used for upstream requests, 0 means no limit
+AIOHTTP_CLIENT_POOL_LIMIT = os.environ.get("AIOHTTP_CLIENT_POOL_LIMIT", "0")
+
+try:
+    AIOHTTP_CLIENT_POOL_LIMIT = max(int(AIOHTTP_CLIENT_POOL_LIMIT), 0)
+except Exception:
+    AIOHTTP_CLIENT_POOL_LIMIT = 0
+
+AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST = os.environ.get(
+    "AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST", "0"
+)
+
+try:
+    AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST = max(int(AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST), 0)
+except Exception:
+    AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST = 0
+
+AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT = os.environ.get(
+    "AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT", "30"
+)
+
+try:
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT = float(AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT)
+except Exception:
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT = 30
+
+AIOHTTP_CLIENT_DNS_CACHE_TTL = os.environ.get("AIOHTTP_CLIENT_DNS_CACHE_TTL", "300")
+
+if AIOHTTP_CLIENT_DNS_CACHE_TTL == "":
+    AIOHTTP_CLIENT_DNS_CACHE_TTL = None
+else:
+    try:
+        AIOHTTP_CLIENT_DNS_CACHE_TTL = int(AIOHTTP_CLIENT_DNS_CACHE_TTL)
+    except Exception:
+        AIOHTTP_CLIENT_DNS_CACHE_TTL = 300
+
+
+####################################
+# OLLAMA LOAD BALANCING
+####################################
+
+# One of: random, least_connections, ewma, weighted, consistent_hash
+OLLAMA_LOAD_BALANCER = os.environ.get(
+    "OLLAMA_LOAD_BALANCER", "least_connections"
+).lower()
+
+# Consecutive failures after which a backend is ejected, 0 disables ejection
+OLLAMA_LOAD_BALANCER_MAX_FAILURES = os.environ.get(
+    "OLLAMA_LOAD_BALANCER_MAX_FAILURES", "3"
+)
+
+try:
+    OLLAMA_LOAD_BALANCER_MAX_FAILURES = int(OLLAMA_LOAD_BALANCER_MAX_FAILURES)
+except Exception:
+    OLLAMA_LOAD_BALANCER_MAX_FAILURES = 3
+
+# Seconds an ejected backend is kept out of rotation
+OLLAMA_LOAD_BALANCER_COOLDOWN = os.environ.get("OLLAMA_LOAD_BALANCER_COOLDOWN", "30")
+
+try:
+    OLLAMA_LOAD_BALANCER_COOLDOWN = float(OLLAMA_LOAD_BALANCER_COOLDOWN)
+except Exception:
+    OLLAMA_LOAD_BALANCER_COOLDOWN = 30
+
 
 ####################################
 # SENTENCE TRANSFORMERS
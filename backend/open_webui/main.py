@@ -97,6 +97,7 @@ from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 from open_webui.models.users import UserModel, Users
 from open_webui.models.chats import Chats
+from open_webui.models.groups import request_group_ids
 
 from open_webui.config import (
     # Ollama
@@ -258,6 +259,7 @@ from open_webui.config import (
     ENABLE_TAGS_GENERATION,
     ENABLE_TITLE_GENERATION,
     ENABLE_FOLLOW_UP_GENERATION,
+    ENABLE_COMBINED_TASKS_GENERATION,
     ENABLE_SEARCH_QUERY_GENERATION,
     ENABLE_RETRIEVAL_QUERY_GENERATION,
     ENABLE_AUTOCOMPLETE_GENERATION,
@@ -330,11 +332,15 @@ from open_webui.utils.auth import (
     decode_token,
     get_admin_user,
     get_verified_user,
+    periodic_user_last_active_flush,
 )
 from open_webui.utils.plugin import install_tool_and_function_dependencies
 from open_webui.utils.oauth import OAuthManager
 from open_webui.utils.security_headers import SecurityHeadersMiddleware
 from open_webui.utils.redis import get_redis_connection
+from open_webui.utils.session_pool import SESSION_POOL
+from open_webui.retrieval.ingest import INGESTION_QUEUE
+from open_webui.utils.events import EVENT_BUS
 
 from open_webui.tasks import (
     redis_task_command_listener,
@@ -411,6 +417,11 @@ async def lifespan(app: FastAPI):
         limiter.total_tokens = THREAD_POOL_SIZE
 
     asyncio.create_task(periodic_usage_pool_cleanup())
+    asyncio.create_task(periodic_user_last_active_flush())
+
+    await SESSION_POOL.start()
+    EVENT_BUS.start(app.state.redis)
+    INGESTION_QUEUE.start(app)
 
     if app.state.config.ENABLE_BASE_MODELS_CACHE:
         await get_all_models(
@@ -438,6 +449,13 @@ async def lifespan(app: FastAPI):
     if hasattr(app.state, "redis_task_command_listener"):
         app.state.redis_task_command_listener.cancel()
 
+    INGESTION_QUEUE.stop()
+    await EVENT_BUS.stop()
+    # Write out buffered chat message updates before the process exits
+    Chats.flush_all_message_updates()
+    Users.flush_users_last_active()
+    await SESSION_POOL.close()
+
 
 app = FastAPI(
     title="Open WebUI",
@@ -794,6 +812,7 @@ app.state.config.ENABLE_AUTOCOMPLETE_GENERATION = ENABLE_AUTOCOMPLETE_GENERATION
 app.state.config.ENABLE_TAGS_GENERATION = ENABLE_TAGS_GENERATION
 app.state.config.ENABLE_TITLE_GENERATION = ENABLE_TITLE_GENERATION
 app.state.config.ENABLE_FOLLOW_UP_GENERATION = ENABLE_FOLLOW_UP_GENERATION
+app.state.config.ENABLE_COMBINED_TASKS_GENERATION = ENABLE_COMBINED_TASKS_GENERATION
 
 
 app.state.config.TITLE_GENERATION_PROMPT_TEMPLATE = TITLE_GENERATION_PROMPT_TEMPLATE
@@ -870,6 +889,7 @@ async def check_url(request: Request, call_next):
     )
 
     request.state.enable_api_key = app.state.config.ENABLE_API_KEY
+    request_group_ids.set({})
     response = await call_next(request)
     process_time = int(time.time()) - start_time
     response.headers["X-Process-Time"] = str(process_time)
@@ -1520,6 +1540,15 @@ async def get_current_usage(user=Depends(get_verified_user)):
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+@app.get("/api/usage/connections")
+async def get_connection_pool_usage(user=Depends(get_admin_user)):
+    """
+    Get usage statistics of the shared upstream HTTP connection pool.
+    This is an experimental endpoint and subject to change.
+    """
+    return SESSION_POOL.stats()
+
+
 ############################
 # OAuth Login & Callback
 ############################
@@ -0,0 +1,223 @@
+"""Add chat search index
+
+Revision ID: 4f7d2b9e1c3a
+Revises: 6a1c2f0e8d4b
+Create Date: 2025-08-24 03:00:00.000000
+
+"""
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+log = logging.getLogger(__name__)
+
+revision = "4f7d2b9e1c3a"
+down_revision = "6a1c2f0e8d4b"
+branch_labels = None
+depends_on = None
+
+
+# SQLite: an FTS5 table over the message contents and chat titles, with the
+# owner's id (without dashes, so it is a single token) as an indexed column so
+# searches only visit that user's rows. Its
+# rowids come from `chat_search`, which maps them to (chat_id, message_id)
+# with a stable integer key; titles use message_id ''. Triggers keep both in
+# sync with every write to `chat_message` and `chat`.
+SQLITE_UPGRADE = [
+    """
+    CREATE TABLE chat_search (
+        id INTEGER PRIMARY KEY,
+        chat_id TEXT NOT NULL,
+        message_id TEXT NOT NULL,
+        UNIQUE (chat_id, message_id)
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE chat_search_fts USING fts5(
+        user_id, content, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # Rank by the content only, the user_id column matches every row
+    """
+    INSERT INTO chat_search_fts (chat_search_fts, rank) VALUES ('rank', 'bm25(0.0, 1.0)')
+    """,
+    """
+    CREATE TRIGGER chat_message_search_insert AFTER INSERT ON chat_message
+    BEGIN
+        INSERT OR IGNORE INTO chat_search (chat_id, message_id)
+        VALUES (new.chat_id, new.id);
+        DELETE FROM chat_search_fts WHERE rowid = (
+            SELECT id FROM chat_search
+            WHERE chat_id = new.chat_id AND message_id = new.id
+        );
+        INSERT INTO chat_search_fts (rowid, user_id, content)
+        SELECT
+            id,
+            (SELECT replace(user_id, '-', '') FROM chat WHERE chat.id = new.chat_id),
+            coalesce(json_extract(new.data, '$.content'), '')
+        FROM chat_search
+        WHERE chat_id = new.chat_id AND message_id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER chat_message_search_update AFTER UPDATE OF data ON chat_message
+    WHEN json_extract(old.data, '$.content') IS NOT json_extract(new.data, '$.content')
+    BEGIN
+        UPDATE chat_search_fts
+        SET content = coalesce(json_extract(new.data, '$.content'), '')
+        WHERE rowid = (
+            SELECT id FROM chat_search
+            WHERE chat_id = new.chat_id AND message_id = new.id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER chat_message_search_delete AFTER DELETE ON chat_message
+    BEGIN
+        DELETE FROM chat_search_fts WHERE rowid = (
+            SELECT id FROM chat_search
+            WHERE chat_id = old.chat_id AND message_id = old.id
+        );
+        DELETE FROM chat_search
+        WHERE chat_id = old.chat_id AND message_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER chat_search_insert AFTER INSERT ON chat
+    BEGIN
+        INSERT OR IGNORE INTO chat_search (chat_id, message_id)
+        VALUES (new.id, '');
+        DELETE FROM chat_search_fts WHERE rowid = (
+            SELECT id FROM chat_search WHERE chat_id = new.id AND message_id = ''
+        );
+        INSERT INTO chat_search_fts (rowid, user_id, content)
+        SELECT id, replace(new.user_id, '-', ''), coalesce(new.title, '')
+        FROM chat_search
+        WHERE chat_id = new.id AND message_id = '';
+        -- Messages may have been written before their chat
+        UPDATE chat_search_fts SET user_id = replace(new.user_id, '-', '')
+        WHERE rowid IN (SELECT id FROM chat_search WHERE chat_id = new.id)
+            AND user_id IS NOT replace(new.user_id, '-', '');
+    END
+    """,
+    """
+    CREATE TRIGGER chat_search_update AFTER UPDATE OF title ON chat
+    WHEN old.title IS NOT new.title
+    BEGIN
+        UPDATE chat_search_fts
+        SET content = coalesce(new.title, '')
+        WHERE rowid = (
+            SELECT id FROM chat_search WHERE chat_id = new.id AND message_id = ''
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER chat_search_delete AFTER DELETE ON chat
+    BEGIN
+        DELETE FROM chat_search_fts WHERE rowid = (
+            SELECT id FROM chat_search WHERE chat_id = old.id AND message_id = ''
+        );
+        DELETE FROM chat_search WHERE chat_id = old.id AND message_id = '';
+    END
+    """,
+    # Backfill the existing chats and messages
+    """
+    INSERT OR IGNORE INTO chat_search (chat_id, message_id)
+    SELECT id, '' FROM chat
+    """,
+    """
+    INSERT OR IGNORE INTO chat_search (chat_id, message_id)
+    SELECT chat_id, id FROM chat_message
+    """,
+    """
+    INSERT INTO chat_search_fts (rowid, user_id, content)
+    SELECT chat_search.id, replace(chat.user_id, '-', ''), coalesce(chat.title, '')
+    FROM chat_search JOIN chat ON chat.id = chat_search.chat_id
+    WHERE chat_search.message_id = ''
+    """,
+    """
+    INSERT INTO chat_search_fts (rowid, user_id, content)
+    SELECT
+        chat_search.id,
+        replace(chat.user_id, '-', ''),
+        coalesce(json_extract(chat_message.data, '$.content'), '')
+    FROM chat_search
+    JOIN chat_message
+        ON chat_message.chat_id = chat_search.chat_id
+        AND chat_message.id = chat_search.message_id
+    JOIN chat ON chat.id = chat_search.chat_id
+    """,
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS chat_message_search_insert",
+    "DROP TRIGGER IF EXISTS chat_message_search_update",
+    "DROP TRIGGER IF EXISTS chat_message_search_delete",
+    "DROP TRIGGER IF EXISTS chat_search_insert",
+    "DROP TRIGGER IF EXISTS chat_search_update",
+    "DROP TRIGGER IF EXISTS chat_search_delete",
+    "DROP TABLE IF EXISTS chat_search_fts",
+    "DROP TABLE IF EXISTS chat_search",
+]
+
+# PostgreSQL: GIN indexes on the same tsvector expressions the search uses, so
+# they are maintained by every write and built from the existing rows here.
+POSTGRESQL_UPGRADE = [
+    """
+    CREATE INDEX chat_message_search_idx ON chat_message
+    USING GIN (to_tsvector('simple', coalesce(data->>'content', '')))
+    """,
+    """
+    CREATE INDEX chat_title_search_idx ON chat
+    USING GIN (to_tsvector('simple', coalesce(title, '')))
+    """,
+]
+
+POSTGRESQL_DOWNGRADE = [
+    "DROP INDEX IF EXISTS chat_message_search_idx",
+    "DROP INDEX IF EXISTS chat_title_search_idx",
+]
+
+
+def has_fts5(conn) -> bool:
+    try:
+        conn.execute(sa.text("CREATE VIRTUAL TABLE temp.fts5_check USING fts5(x)"))
+        conn.execute(sa.text("DROP TABLE temp.fts5_check"))
+        return True
+    except Exception:
+        return False
+
+
+def upgrade():
+    conn = op.get_bind()
+    dialect_name = conn.dialect.name
+
+    if dialect_name == "sqlite":
+        if not has_fts5(conn):
+            log.warning("SQLite was built without FTS5, chat search is not indexed")
+            return
+        statements = SQLITE_UPGRADE
+    elif dialect_name == "postgresql":
+        statements = POSTGRESQL_UPGRADE
+    else:
+        return
+
+    for statement in statements:
+        conn.execute(sa.text(statement))
+
+
+def downgrade():
+    conn = op.get_bind()
+    dialect_name = conn.dialect.name
+
+    if dialect_name == "sqlite":
+        statements = SQLITE_DOWNGRADE
+    elif dialect_name == "postgresql":
+        statements = POSTGRESQL_DOWNGRADE
+    else:
+        return
+
+    for statement in statements:
+        conn.execute(sa.text(statement))
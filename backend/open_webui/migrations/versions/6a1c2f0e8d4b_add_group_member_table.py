@@ -0,0 +1,70 @@
+"""Add group_member table
+
+Revision ID: 6a1c2f0e8d4b
+Revises: b10670c03dd5
+Create Date: 2025-08-22 03:00:00.000000
+
+"""
+
+import json
+import time
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, select
+
+revision = "6a1c2f0e8d4b"
+down_revision = "b10670c03dd5"
+branch_labels = None
+depends_on = None
+
+
+group_table = table(
+    "group",
+    sa.Column("id", sa.Text()),
+    sa.Column("user_ids", sa.JSON()),
+)
+
+group_member_table = table(
+    "group_member",
+    sa.Column("group_id", sa.Text()),
+    sa.Column("user_id", sa.Text()),
+    sa.Column("created_at", sa.BigInteger()),
+)
+
+
+def upgrade():
+    op.create_table(
+        "group_member",
+        sa.Column("group_id", sa.Text(), nullable=False),
+        sa.Column("user_id", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("group_id", "user_id"),
+    )
+    op.create_index("group_member_user_id_idx", "group_member", ["user_id"])
+
+    # Copy the memberships out of the `group.user_ids` JSON arrays
+    conn = op.get_bind()
+    now = int(time.time())
+    for row in conn.execute(select(group_table.c.id, group_table.c.user_ids)):
+        user_ids = row.user_ids
+        if isinstance(user_ids, str):
+            try:
+                user_ids = json.loads(user_ids)
+            except Exception:
+                user_ids = None
+        if not isinstance(user_ids, list):
+            continue
+
+        members = [
+            {"group_id": row.id, "user_id": user_id, "created_at": now}
+            for user_id in dict.fromkeys(user_ids)
+            if isinstance(user_id, str)
+        ]
+        if members:
+            conn.execute(group_member_table.insert(), members)
+
+
+def downgrade():
+    op.drop_index("group_member_user_id_idx", table_name="group_member")
+    op.drop_table("group_member")
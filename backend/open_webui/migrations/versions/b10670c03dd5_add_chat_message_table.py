@@ -0,0 +1,149 @@
+"""Add chat_message table
+
+Revision ID: b10670c03dd5
+Revises: 3af16a1c9fb6
+Create Date: 2025-08-20 03:00:00.000000
+
+"""
+
+import time
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, select
+
+revision = "b10670c03dd5"
+down_revision = "3af16a1c9fb6"
+branch_labels = None
+depends_on = None
+
+
+chat_table = table(
+    "chat",
+    sa.Column("id", sa.String()),
+    sa.Column("chat", sa.JSON()),
+    sa.Column("created_at", sa.BigInteger()),
+    sa.Column("current_message_id", sa.Text()),
+)
+
+chat_message_table = table(
+    "chat_message",
+    sa.Column("chat_id", sa.String()),
+    sa.Column("id", sa.String()),
+    sa.Column("parent_id", sa.String()),
+    sa.Column("role", sa.String()),
+    sa.Column("data", sa.JSON()),
+    sa.Column("created_at", sa.BigInteger()),
+    sa.Column("updated_at", sa.BigInteger()),
+)
+
+
+def upgrade():
+    op.create_table(
+        "chat_message",
+        sa.Column("chat_id", sa.String(), nullable=False),
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("parent_id", sa.String(), nullable=True),
+        sa.Column("role", sa.String(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("chat_id", "id"),
+    )
+    op.create_index(
+        "chat_message_chat_id_parent_id_idx",
+        "chat_message",
+        ["chat_id", "parent_id"],
+    )
+
+    op.add_column("chat", sa.Column("current_message_id", sa.Text(), nullable=True))
+
+    # Move `chat.history.messages` out of the chat documents, one chat at a time
+    # to keep memory usage independent of the size of the table
+    conn = op.get_bind()
+    chat_ids = [row.id for row in conn.execute(select(chat_table.c.id))]
+
+    for chat_id in chat_ids:
+        row = conn.execute(
+            select(chat_table.c.chat, chat_table.c.created_at).where(
+                chat_table.c.id == chat_id
+            )
+        ).first()
+
+        chat = row.chat if row else None
+        if not isinstance(chat, dict) or not isinstance(chat.get("history"), dict):
+            continue
+
+        history = {**chat["history"]}
+        messages = history.pop("messages", None) or {}
+        current_id = history.pop("currentId", None)
+        created_at = row.created_at or int(time.time())
+
+        if messages:
+            conn.execute(
+                chat_message_table.insert(),
+                [
+                    {
+                        "chat_id": chat_id,
+                        "id": message_id,
+                        "parent_id": message.get("parentId"),
+                        "role": message.get("role"),
+                        "data": message,
+                        "created_at": created_at,
+                        "updated_at": created_at,
+                    }
+                    for message_id, message in messages.items()
+                    if isinstance(message, dict)
+                ],
+            )
+
+        conn.execute(
+            sa.update(chat_table)
+            .where(chat_table.c.id == chat_id)
+            .values(chat={**chat, "history": history}, current_message_id=current_id)
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+    chat_ids = [row.id for row in conn.execute(select(chat_table.c.id))]
+
+    for chat_id in chat_ids:
+        row = conn.execute(
+            select(chat_table.c.chat, chat_table.c.current_message_id).where(
+                chat_table.c.id == chat_id
+            )
+        ).first()
+
+        chat = row.chat if row else None
+        if not isinstance(chat, dict) or not isinstance(chat.get("history"), dict):
+            continue
+
+        messages = {
+            message.id: message.data
+            for message in conn.execute(
+                select(chat_message_table.c.id, chat_message_table.c.data)
+                .where(chat_message_table.c.chat_id == chat_id)
+                .order_by(chat_message_table.c.created_at)
+            )
+        }
+
+        conn.execute(
+            sa.update(chat_table)
+            .where(chat_table.c.id == chat_id)
+            .values(
+                chat={
+                    **chat,
+                    "history": {
+                        **chat["history"],
+                        "messages": messages,
+                        "currentId": row.current_message_id,
+                    },
+                }
+            )
+        )
+
+    op.drop_column("chat", "current_message_id")
+
+    op.drop_index("chat_message_chat_id_parent_id_idx", table_name="chat_message")
+    op.drop_table("chat_message")
@@ -1,17 +1,24 @@
+import asyncio
 import logging
 import json
+import threading
 import time
 import uuid
-from typing import Optional
+from typing import Any, Optional
 
 from open_webui.internal.db import Base, get_db
 from open_webui.models.tags import TagModel, Tag, Tags
 from open_webui.models.folders import Folders
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    CHAT_SEARCH_MAX_MATCHES,
+    CHAT_WRITE_BUFFER_INTERVAL,
+    CHAT_WRITE_BUFFER_MAX_EVENTS,
+)
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON, Index
-from sqlalchemy import or_, func, select, and_, text
+from sqlalchemy import BigInteger, Boolean, Column, Float, String, Text, JSON, Index
+from sqlalchemy import or_, func, select, and_, text, table, column
 from sqlalchemy.sql import exists
 from sqlalchemy.sql.expression import bindparam
 
@@ -41,6 +48,10 @@ class Chat(Base):
     meta = Column(JSON, server_default="{}")
     folder_id = Column(Text, nullable=True)
 
+    # history.currentId, kept out of the `chat` document so that appending a
+    # message does not rewrite it (see ChatMessage)
+    current_message_id = Column(Text, nullable=True)
+
     __table_args__ = (
         # Performance indexes for common queries
         # WHERE folder_id = ...
@@ -56,6 +67,26 @@ class Chat(Base):
     )
 
 
+class ChatMessage(Base):
+    __tablename__ = "chat_message"
+
+    # The messages of `chat.history.messages`, one row per message
+    chat_id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True)
+
+    parent_id = Column(String, nullable=True)
+    role = Column(String, nullable=True)
+    data = Column(JSON)
+
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+    __table_args__ = (
+        # WHERE chat_id = ... AND parent_id = ...
+        Index("chat_message_chat_id_parent_id_idx", "chat_id", "parent_id"),
+    )
+
+
 class ChatModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -75,6 +106,52 @@ class ChatModel(BaseModel):
     folder_id: Optional[str] = None
 
 
+class ChatMessageModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    chat_id: str
+    id: str
+
+    parent_id: Optional[str] = None
+    role: Optional[str] = None
+    data: dict
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+
+def split_chat_history(chat: dict) -> tuple[dict, dict, Optional[str]]:
+    """
+    Splits a chat document into the document stored in the `chat` column, the
+    `history.messages` stored as `chat_message` rows and `history.currentId`.
+    """
+    if not isinstance(chat.get("history"), dict):
+        return chat, {}, None
+
+    history = {**chat["history"]}
+    messages = history.pop("messages", None) or {}
+    current_id = history.pop("currentId", None)
+
+    return {**chat, "history": history}, messages, current_id
+
+
+def merge_chat_history(chat: dict, messages: dict, current_id: Optional[str]) -> dict:
+    """
+    Rebuilds the legacy chat document shape from its stored parts.
+    """
+    if "history" not in chat and not messages:
+        return chat
+
+    return {
+        **chat,
+        "history": {
+            **(chat.get("history") or {}),
+            "messages": messages,
+            "currentId": current_id,
+        },
+    }
+
+
 ####################
 # Forms
 ####################
@@ -122,10 +199,236 @@ class ChatTitleIdResponse(BaseModel):
     created_at: int
 
 
+class PendingMessageUpdate:
+    """
+    Changes to one message that are not written yet, merged per field.
+
+    A field is either replaced (`set`) or patched around its stored value
+    (`prepend`/`append` of strings or lists), so any number of events folds
+    into a single write that is computed against the row at flush time.
+    """
+
+    def __init__(self):
+        # field -> (replace, head, tail)
+        self.fields: dict[str, tuple[bool, Any, Any]] = {}
+        self.events = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+    def set(self, field: str, value):
+        self.fields[field] = (True, value, None)
+
+    def append(self, field: str, value):
+        replace, head, tail = self.fields.get(field, (False, None, None))
+        if replace:
+            self.fields[field] = (True, head + value, None)
+        else:
+            self.fields[field] = (False, head, value if tail is None else tail + value)
+
+    def prepend(self, field: str, value):
+        replace, head, tail = self.fields.get(field, (False, None, None))
+        if replace:
+            self.fields[field] = (True, value + head, None)
+        else:
+            self.fields[field] = (False, value if head is None else value + head, tail)
+
+    def apply(self, message: dict) -> dict:
+        updates = {}
+        for field, (replace, head, tail) in self.fields.items():
+            if replace:
+                updates[field] = head
+                continue
+
+            value = None
+            for part in (head, message.get(field), tail):
+                if part is not None:
+                    value = part if value is None else value + part
+            updates[field] = value
+        return updates
+
+
 class ChatTable:
+    def __init__(self):
+        # Write-behind buffer of streamed message changes, keyed by
+        # (chat_id, message_id). Reads and direct writes of a message flush its
+        # pending changes first, so callers in this process always see them.
+        self._pending: dict[tuple[str, str], PendingMessageUpdate] = {}
+        self._pending_lock = threading.RLock()
+        # Whether the full-text search tables exist, checked on first search
+        self._search_index_available: Optional[bool] = None
+
+    def buffer_message_update(
+        self,
+        id: str,
+        message_id: str,
+        set: Optional[dict] = None,
+        append: Optional[dict] = None,
+        prepend: Optional[dict] = None,
+    ):
+        """
+        Queue changes to a message: `set` replaces fields, `append`/`prepend`
+        extend the stored string or list. Written after CHAT_WRITE_BUFFER_INTERVAL
+        seconds, after CHAT_WRITE_BUFFER_MAX_EVENTS changes, or on the next read
+        or direct write of the message, whichever comes first.
+        """
+        key = (id, message_id)
+        with self._pending_lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = PendingMessageUpdate()
+
+            for field, value in (set or {}).items():
+                pending.set(field, value)
+            for field, value in (append or {}).items():
+                pending.append(field, value)
+            for field, value in (prepend or {}).items():
+                pending.prepend(field, value)
+            pending.events += 1
+
+            if (
+                CHAT_WRITE_BUFFER_INTERVAL <= 0
+                or pending.events >= CHAT_WRITE_BUFFER_MAX_EVENTS
+            ):
+                self.flush_message_updates(id, message_id)
+            elif pending.timer is None:
+                try:
+                    loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    # No event loop to flush later from, write through
+                    self.flush_message_updates(id, message_id)
+                else:
+                    pending.timer = loop.call_later(
+                        CHAT_WRITE_BUFFER_INTERVAL,
+                        self.flush_message_updates,
+                        id,
+                        message_id,
+                    )
+
+    def flush_message_updates(self, id: str, message_id: str):
+        # The lock is held during the write so a concurrent direct write of the
+        # same message cannot land before the changes queued ahead of it
+        with self._pending_lock:
+            pending = self._pending.pop((id, message_id), None)
+            if pending is None:
+                return
+
+            if pending.timer is not None:
+                pending.timer.cancel()
+
+            try:
+                message = self._get_message(id, message_id)
+                if message is not None:
+                    self._upsert_message(id, message_id, pending.apply(message))
+            except Exception as e:
+                log.exception(f"Failed to write message {id}/{message_id}: {e}")
+
+    def flush_chat_updates(self, id: str):
+        if not self._pending:
+            return
+
+        with self._pending_lock:
+            keys = [key for key in self._pending if key[0] == id]
+            for _, message_id in keys:
+                self.flush_message_updates(id, message_id)
+
+    def flush_all_message_updates(self):
+        with self._pending_lock:
+            for id, message_id in list(self._pending):
+                self.flush_message_updates(id, message_id)
+
+    def _discard_chat_updates(self, id: str):
+        if not self._pending:
+            return
+
+        with self._pending_lock:
+            for key in [key for key in self._pending if key[0] == id]:
+                pending = self._pending.pop(key)
+                if pending.timer is not None:
+                    pending.timer.cancel()
+
+    def _to_chat_model(self, chat: Chat, messages: dict) -> ChatModel:
+        chat_model = ChatModel.model_validate(chat)
+        chat_model.chat = merge_chat_history(
+            chat_model.chat, messages, chat.current_message_id
+        )
+        return chat_model
+
+    def _to_chat_models(self, db, chats) -> list[ChatModel]:
+        chats = list(chats)
+        messages = self._get_messages_by_chat_ids(db, [chat.id for chat in chats])
+        return [self._to_chat_model(chat, messages[chat.id]) for chat in chats]
+
+    def _get_messages_by_chat_ids(self, db, chat_ids: list[str]) -> dict[str, dict]:
+        messages = {chat_id: {} for chat_id in chat_ids}
+
+        # Chunked to stay below the bound parameter limit of the database
+        for idx in range(0, len(chat_ids), 500):
+            rows = (
+                db.query(ChatMessage)
+                .filter(ChatMessage.chat_id.in_(chat_ids[idx : idx + 500]))
+                .order_by(ChatMessage.created_at)
+                .all()
+            )
+            for row in rows:
+                messages[row.chat_id][row.id] = row.data
+
+        return messages
+
+    def _sync_chat_messages(self, db, chat_id: str, messages: dict, now: int):
+        """
+        Writes the given `history.messages` of a chat, touching only the rows that changed.
+        """
+        existing = {
+            row.id: row
+            for row in db.query(ChatMessage).filter_by(chat_id=chat_id).all()
+        }
+
+        for message_id, message in messages.items():
+            row = existing.pop(message_id, None)
+            if row is None:
+                db.add(
+                    ChatMessage(
+                        chat_id=chat_id,
+                        id=message_id,
+                        parent_id=message.get("parentId"),
+                        role=message.get("role"),
+                        data=message,
+                        created_at=now,
+                        updated_at=now,
+                    )
+                )
+            elif row.data != message:
+                row.parent_id = message.get("parentId")
+                row.role = message.get("role")
+                row.data = message
+                row.updated_at = now
+
+        for row in existing.values():
+            db.delete(row)
+
+    def _copy_chat_messages(self, db, from_chat_id: str, to_chat_id: str):
+        db.query(ChatMessage).filter_by(chat_id=to_chat_id).delete()
+        for row in db.query(ChatMessage).filter_by(chat_id=from_chat_id).all():
+            db.add(
+                ChatMessage(
+                    chat_id=to_chat_id,
+                    id=row.id,
+                    parent_id=row.parent_id,
+                    role=row.role,
+                    data=row.data,
+                    created_at=row.created_at,
+                    updated_at=row.updated_at,
+                )
+            )
+
+    def _delete_chat_messages(self, db, chat_ids):
+        db.query(ChatMessage).filter(ChatMessage.chat_id.in_(chat_ids)).delete(
+            synchronize_session=False
+        )
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
+            document, messages, current_id = split_chat_history(form_data.chat)
             chat = ChatModel(
                 **{
                     "id": id,
@@ -135,24 +438,26 @@ class ChatTable:
                         if "title" in form_data.chat
                         else "New Chat"
                     ),
-                    "chat": form_data.chat,
+                    "chat": document,
                     "folder_id": form_data.folder_id,
                     "created_at": int(time.time()),
                     "updated_at": int(time.time()),
                 }
             )
 
-            result = Chat(**chat.model_dump())
+            result = Chat(**chat.model_dump(), current_message_id=current_id)
             db.add(result)
+            self._sync_chat_messages(db, id, messages, chat.created_at)
             db.commit()
             db.refresh(result)
-            return ChatModel.model_validate(result) if result else None
+            return self._to_chat_model(result, messages) if result else None
 
     def import_chat(
         self, user_id: str, form_data: ChatImportForm
     ) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
+            document, messages, current_id = split_chat_history(form_data.chat)
             chat = ChatModel(
                 **{
                     "id": id,
@@ -162,7 +467,7 @@ class ChatTable:
                         if "title" in form_data.chat
                         else "New Chat"
                     ),
-                    "chat": form_data.chat,
+                    "chat": document,
                     "meta": form_data.meta,
                     "pinned": form_data.pinned,
                     "folder_id": form_data.folder_id,
@@ -179,23 +484,33 @@ class ChatTable:
                 }
             )
 
-            result = Chat(**chat.model_dump())
+            result = Chat(**chat.model_dump(), current_message_id=current_id)
             db.add(result)
+            self._sync_chat_messages(db, id, messages, chat.created_at)
             db.commit()
             db.refresh(result)
-            return ChatModel.model_validate(result) if result else None
+            return self._to_chat_model(result, messages) if result else None
 
     def update_chat_by_id(self, id: str, chat: dict) -> Optional[ChatModel]:
+        self.flush_chat_updates(id)
         try:
             with get_db() as db:
                 chat_item = db.get(Chat, id)
-                chat_item.chat = chat
+                document, messages, current_id = split_chat_history(chat)
+
+                chat_item.chat = document
                 chat_item.title = chat["title"] if "title" in chat else "New Chat"
                 chat_item.updated_at = int(time.time())
+                if "history" in chat:
+                    chat_item.current_message_id = current_id
+                    self._sync_chat_messages(db, id, messages, chat_item.updated_at)
+                else:
+                    messages = self._get_messages_by_chat_ids(db, [id])[id]
+
                 db.commit()
                 db.refresh(chat_item)
 
-                return ChatModel.model_validate(chat_item)
+                return self._to_chat_model(chat_item, messages)
         except Exception:
             return None
 
@@ -230,72 +545,107 @@ class ChatTable:
         return self.get_chat_by_id(id)
 
     def get_chat_title_by_id(self, id: str) -> Optional[str]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        with get_db() as db:
+            chat = db.query(Chat.title).filter_by(id=id).first()
+            if chat is None:
+                return None
 
-        return chat.chat.get("title", "New Chat")
+            return chat.title
 
     def get_messages_by_chat_id(self, id: str) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        self.flush_chat_updates(id)
+        with get_db() as db:
+            if db.query(Chat.id).filter_by(id=id).first() is None:
+                return None
 
-        return chat.chat.get("history", {}).get("messages", {}) or {}
+            return self._get_messages_by_chat_ids(db, [id])[id]
 
     def get_message_by_id_and_message_id(
         self, id: str, message_id: str
     ) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        self.flush_message_updates(id, message_id)
+        return self._get_message(id, message_id)
+
+    def _get_message(self, id: str, message_id: str) -> Optional[dict]:
+        with get_db() as db:
+            message = db.get(ChatMessage, (id, message_id))
+            if message:
+                return message.data
 
-        return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
+            if db.query(Chat.id).filter_by(id=id).first() is None:
+                return None
+
+            return {}
 
     def upsert_message_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, message: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+    ) -> Optional[ChatMessageModel]:
+        self.flush_message_updates(id, message_id)
+        return self._upsert_message(id, message_id, message)
 
+    def _upsert_message(
+        self, id: str, message_id: str, message: dict
+    ) -> Optional[ChatMessageModel]:
         # Sanitize message content for null characters before upserting
         if isinstance(message.get("content"), str):
             message["content"] = message["content"].replace("\x00", "")
 
-        chat = chat.chat
-        history = chat.get("history", {})
-
-        if message_id in history.get("messages", {}):
-            history["messages"][message_id] = {
-                **history["messages"][message_id],
-                **message,
-            }
-        else:
-            history["messages"][message_id] = message
+        with get_db() as db:
+            now = int(time.time())
 
-        history["currentId"] = message_id
+            # Only the message row and the chat's scalar columns are written,
+            # independent of the size of the conversation
+            updated = (
+                db.query(Chat)
+                .filter_by(id=id)
+                .update({"current_message_id": message_id, "updated_at": now})
+            )
+            if not updated:
+                return None
+
+            row = db.get(ChatMessage, (id, message_id))
+            if row:
+                data = {**(row.data or {}), **message}
+                row.parent_id = data.get("parentId")
+                row.role = data.get("role")
+                row.data = data
+                row.updated_at = now
+            else:
+                row = ChatMessage(
+                    chat_id=id,
+                    id=message_id,
+                    parent_id=message.get("parentId"),
+                    role=message.get("role"),
+                    data=message,
+                    created_at=now,
+                    updated_at=now,
+                )
+                db.add(row)
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+            db.commit()
+            db.refresh(row)
+            return ChatMessageModel.model_validate(row)
 
     def add_message_status_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, status: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
-        chat = chat.chat
-        history = chat.get("history", {})
-
-        if message_id in history.get("messages", {}):
-            status_history = history["messages"][message_id].get("statusHistory", [])
-            status_history.append(status)
-            history["messages"][message_id]["statusHistory"] = status_history
+    ) -> Optional[ChatMessageModel]:
+        self.flush_message_updates(id, message_id)
+        with get_db() as db:
+            row = db.get(ChatMessage, (id, message_id))
+            if row is None:
+                return None
+
+            now = int(time.time())
+            row.data = {
+                **row.data,
+                "statusHistory": [*row.data.get("statusHistory", []), status],
+            }
+            row.updated_at = now
+            db.query(Chat).filter_by(id=id).update({"updated_at": now})
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+            db.commit()
+            db.refresh(row)
+            return ChatMessageModel.model_validate(row)
 
     def insert_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         with get_db() as db:
@@ -318,8 +668,12 @@ class ChatTable:
                     "updated_at": int(time.time()),
                 }
             )
-            shared_result = Chat(**shared_chat.model_dump())
+            shared_result = Chat(
+                **shared_chat.model_dump(),
+                current_message_id=chat.current_message_id,
+            )
             db.add(shared_result)
+            self._copy_chat_messages(db, chat_id, shared_chat.id)
             db.commit()
             db.refresh(shared_result)
 
@@ -330,7 +684,11 @@ class ChatTable:
                 .update({"share_id": shared_chat.id})
             )
             db.commit()
-            return shared_chat if (shared_result and result) else None
+            return (
+                self._to_chat_models(db, [shared_result])[0]
+                if (shared_result and result)
+                else None
+            )
 
     def update_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         try:
@@ -348,17 +706,22 @@ class ChatTable:
                 shared_chat.meta = chat.meta
                 shared_chat.pinned = chat.pinned
                 shared_chat.folder_id = chat.folder_id
+                shared_chat.current_message_id = chat.current_message_id
                 shared_chat.updated_at = int(time.time())
+                self._copy_chat_messages(db, chat_id, shared_chat.id)
                 db.commit()
                 db.refresh(shared_chat)
 
-                return ChatModel.model_validate(shared_chat)
+                return self._to_chat_models(db, [shared_chat])[0]
         except Exception:
             return None
 
     def delete_shared_chat_by_chat_id(self, chat_id: str) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(
+                    db, select(Chat.id).where(Chat.user_id == f"shared-{chat_id}")
+                )
                 db.query(Chat).filter_by(user_id=f"shared-{chat_id}").delete()
                 db.commit()
 
@@ -375,7 +738,7 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -387,7 +750,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -399,7 +762,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -447,7 +810,7 @@ class ChatTable:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chat_list_by_user_id(
         self,
@@ -486,7 +849,7 @@ class ChatTable:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chat_title_id_list_by_user_id(
         self,
@@ -537,13 +900,14 @@ class ChatTable:
                 .order_by(Chat.updated_at.desc())
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chat_by_id(self, id: str) -> Optional[ChatModel]:
+        self.flush_chat_updates(id)
         try:
             with get_db() as db:
                 chat = db.get(Chat, id)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -562,10 +926,11 @@ class ChatTable:
             return None
 
     def get_chat_by_id_and_user_id(self, id: str, user_id: str) -> Optional[ChatModel]:
+        self.flush_chat_updates(id)
         try:
             with get_db() as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                return self._to_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -576,7 +941,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -585,7 +950,7 @@ class ChatTable:
                 .filter_by(user_id=user_id)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -594,7 +959,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, pinned=True, archived=False)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_archived_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -603,7 +968,129 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
+
+    def _get_search_index(
+        self,
+        db,
+        user_id: str,
+        words: list[str],
+        max_matches: int,
+        scope=None,
+    ):
+        """
+        Returns a subquery of (chat_id, rank) for the chats of the user whose
+        title or any message matches all `words` (the last one as a prefix),
+        ranked over at most `max_matches` of the most recent matches on SQLite,
+        or None when the database has no search index. Higher ranks are better.
+
+        `scope` is an optional subquery of the chat ids to consider. It is
+        applied before the matches are capped, so matches in other chats do not
+        count against `max_matches`.
+        """
+        words = [word for word in words if word]
+        if not words:
+            return None
+
+        dialect_name = db.bind.dialect.name
+        if dialect_name == "sqlite":
+            if self._search_index_available is None:
+                self._search_index_available = (
+                    db.execute(
+                        text(
+                            "SELECT 1 FROM sqlite_master "
+                            "WHERE type = 'table' AND name = 'chat_search_fts'"
+                        )
+                    ).first()
+                    is not None
+                )
+            if not self._search_index_available:
+                return None
+
+            # Only the last word is matched as a prefix (search as you type),
+            # prefix queries cannot stop early on very common terms
+            phrases = ['"' + word.replace('"', '""') + '"' for word in words]
+            phrases[-1] += "*"
+            search_query = 'user_id : "{}" AND content : ({})'.format(
+                user_id.replace("-", "").replace('"', '""'), " ".join(phrases)
+            )
+            chat_search_fts = table("chat_search_fts", column("rowid"), column("rank"))
+            chat_search = table("chat_search", column("id"), column("chat_id"))
+
+            # FTS5's `rank` (bm25) is lower for better matches
+            matches = (
+                select(
+                    chat_search.c.chat_id.label("chat_id"),
+                    chat_search_fts.c.rank.label("score"),
+                )
+                .select_from(
+                    chat_search_fts.join(
+                        chat_search, chat_search.c.id == chat_search_fts.c.rowid
+                    )
+                )
+                .where(
+                    text("chat_search_fts MATCH :search_query").bindparams(
+                        search_query=search_query
+                    )
+                )
+            )
+            if scope is not None:
+                matches = matches.where(chat_search.c.chat_id.in_(select(scope.c.id)))
+            matches = (
+                matches.order_by(chat_search_fts.c.rowid.desc())
+                .limit(max_matches)
+                .subquery("matches")
+            )
+
+            return (
+                select(
+                    matches.c.chat_id,
+                    (-func.min(matches.c.score)).label("rank"),
+                )
+                .group_by(matches.c.chat_id)
+                .subquery("search_index")
+            )
+        elif dialect_name == "postgresql":
+            search_query = " & ".join(
+                "'" + word.replace("\\", "\\\\").replace("'", "''") + "'"
+                for word in words
+            )
+            search_query += ":*"
+            search_sql = """
+                SELECT matches.chat_id AS chat_id, max(matches.rank) AS rank
+                FROM (
+                    SELECT chat_message.chat_id AS chat_id,
+                        ts_rank(
+                            to_tsvector('simple', coalesce(chat_message.data->>'content', '')),
+                            search_query
+                        ) AS rank
+                    FROM chat_message
+                    JOIN chat ON chat.id = chat_message.chat_id,
+                        to_tsquery('simple', :search_query) AS search_query
+                    WHERE chat.user_id = :user_id
+                        AND to_tsvector('simple', coalesce(chat_message.data->>'content', ''))
+                        @@ search_query
+                    UNION ALL
+                    SELECT chat.id AS chat_id,
+                        ts_rank(
+                            to_tsvector('simple', coalesce(title, '')), search_query
+                        ) AS rank
+                    FROM chat, to_tsquery('simple', :search_query) AS search_query
+                    WHERE chat.user_id = :user_id
+                        AND to_tsvector('simple', coalesce(title, '')) @@ search_query
+                ) AS matches
+                GROUP BY matches.chat_id
+            """
+            params = {"search_query": search_query, "user_id": user_id}
+        else:
+            return None
+
+        return (
+            text(search_sql)
+            .bindparams(**params)
+            .columns(chat_id=String, rank=Float)
+            .subquery("search_index")
+        )
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -695,26 +1182,9 @@ class ChatTable:
             if folder_ids:
                 query = query.filter(Chat.folder_id.in_(folder_ids))
 
-            query = query.order_by(Chat.updated_at.desc())
-
             # Check if the database dialect is either 'sqlite' or 'postgresql'
             dialect_name = db.bind.dialect.name
             if dialect_name == "sqlite":
-                # SQLite case: using JSON1 extension for JSON searching
-                sqlite_content_sql = (
-                    "EXISTS ("
-                    "    SELECT 1 "
-                    "    FROM json_each(Chat.chat, '$.messages') AS message "
-                    "    WHERE LOWER(message.value->>'content') LIKE '%' || :content_key || '%'"
-                    ")"
-                )
-                sqlite_content_clause = text(sqlite_content_sql)
-                query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")), sqlite_content_clause
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
-                )
-
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
                     query = query.filter(
@@ -746,22 +1216,6 @@ class ChatTable:
                     )
 
             elif dialect_name == "postgresql":
-                # PostgreSQL relies on proper JSON query for search
-                postgres_content_sql = (
-                    "EXISTS ("
-                    "    SELECT 1 "
-                    "    FROM json_array_elements(Chat.chat->'messages') AS message "
-                    "    WHERE LOWER(message->>'content') LIKE '%' || :content_key || '%'"
-                    ")"
-                )
-                postgres_content_clause = text(postgres_content_sql)
-                query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")),
-                        postgres_content_clause,
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
-                )
-
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
                     query = query.filter(
@@ -796,13 +1250,52 @@ class ChatTable:
                     f"Unsupported dialect: {db.bind.dialect.name}"
                 )
 
+            # The matches are capped after the filters above are applied, so
+            # chats outside the scope (archived, other folders, ...) cannot
+            # crowd out the ones that are in it
+            search_index = (
+                self._get_search_index(
+                    db,
+                    user_id,
+                    search_text_words,
+                    max(CHAT_SEARCH_MAX_MATCHES, (skip + limit) * 10),
+                    scope=query.with_entities(Chat.id).subquery(),
+                )
+                if search_text
+                else None
+            )
+            if search_index is not None:
+                # Best matches first, ties by recency
+                query = query.join(
+                    search_index, search_index.c.chat_id == Chat.id
+                ).order_by(search_index.c.rank.desc(), Chat.updated_at.desc())
+            else:
+                query = query.order_by(Chat.updated_at.desc())
+
+            if dialect_name == "sqlite" and search_index is None:
+                # SQLite without FTS5: using JSON1 extension for JSON searching
+                sqlite_content_sql = (
+                    "EXISTS ("
+                    "    SELECT 1 "
+                    "    FROM json_each(Chat.chat, '$.messages') AS message "
+                    "    WHERE LOWER(message.value->>'content') LIKE '%' || :content_key || '%'"
+                    ")"
+                )
+                sqlite_content_clause = text(sqlite_content_sql)
+                query = query.filter(
+                    or_(
+                        Chat.title.ilike(bindparam("title_key")),
+                        sqlite_content_clause,
+                    ).params(title_key=f"%{search_text}%", content_key=search_text)
+                )
+
             # Perform pagination at the SQL level
             all_chats = query.offset(skip).limit(limit).all()
 
             log.info(f"The number of chats: {len(all_chats)}")
 
             # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_folder_id_and_user_id(
         self, folder_id: str, user_id: str
@@ -815,7 +1308,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_folder_ids_and_user_id(
         self, folder_ids: list[str], user_id: str
@@ -830,7 +1323,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str
@@ -843,7 +1336,7 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -882,7 +1375,7 @@ class ChatTable:
 
             all_chats = query.all()
             log.debug(f"all_chats: {all_chats}")
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str
@@ -903,7 +1396,7 @@ class ChatTable:
 
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -977,8 +1470,10 @@ class ChatTable:
             return False
 
     def delete_chat_by_id(self, id: str) -> bool:
+        self._discard_chat_updates(id)
         try:
             with get_db() as db:
+                self._delete_chat_messages(db, [id])
                 db.query(Chat).filter_by(id=id).delete()
                 db.commit()
 
@@ -987,8 +1482,13 @@ class ChatTable:
             return False
 
     def delete_chat_by_id_and_user_id(self, id: str, user_id: str) -> bool:
+        self._discard_chat_updates(id)
         try:
             with get_db() as db:
+                self._delete_chat_messages(
+                    db,
+                    select(Chat.id).where(Chat.id == id, Chat.user_id == user_id),
+                )
                 db.query(Chat).filter_by(id=id, user_id=user_id).delete()
                 db.commit()
 
@@ -1001,6 +1501,9 @@ class ChatTable:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
 
+                self._delete_chat_messages(
+                    db, select(Chat.id).where(Chat.user_id == user_id)
+                )
                 db.query(Chat).filter_by(user_id=user_id).delete()
                 db.commit()
 
@@ -1013,6 +1516,12 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(
+                    db,
+                    select(Chat.id).where(
+                        Chat.user_id == user_id, Chat.folder_id == folder_id
+                    ),
+                )
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
@@ -1026,6 +1535,9 @@ class ChatTable:
                 chats_by_user = db.query(Chat).filter_by(user_id=user_id).all()
                 shared_chat_ids = [f"shared-{chat.id}" for chat in chats_by_user]
 
+                self._delete_chat_messages(
+                    db, select(Chat.id).where(Chat.user_id.in_(shared_chat_ids))
+                )
                 db.query(Chat).filter(Chat.user_id.in_(shared_chat_ids)).delete()
                 db.commit()
 
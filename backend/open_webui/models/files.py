@@ -4,6 +4,7 @@ from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
 from open_webui.env import SRC_LOG_LEVELS
+from open_webui.utils.events import EVENT_BUS, get_file_status_topic
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Column, String, Text, JSON
 
@@ -196,11 +197,19 @@ class FilesTable:
                 file = db.query(File).filter_by(id=id).first()
                 file.data = {**(file.data if file.data else {}), **data}
                 db.commit()
-                return FileModel.model_validate(file)
+                file = FileModel.model_validate(file)
             except Exception as e:
 
                 return None
 
+        if "status" in data:
+            event = {"status": data["status"]}
+            if data["status"] == "failed":
+                event["error"] = data.get("error")
+            EVENT_BUS.publish(get_file_status_topic(id), event)
+
+        return file
+
     def update_file_metadata_by_id(self, id: str, meta: dict) -> Optional[FileModel]:
         with get_db() as db:
             try:
@@ -83,6 +83,14 @@ class FunctionValves(BaseModel):
 
 
 class FunctionsTable:
+    def __init__(self):
+        # Bumped on every change to a function, its valves or a user's valves
+        # in this process, so compiled filter chains know to rebuild
+        self.version = 0
+
+    def _bump_version(self):
+        self.version += 1
+
     def insert_new_function(
         self, user_id: str, type: str, form_data: FunctionForm
     ) -> Optional[FunctionModel]:
@@ -101,6 +109,7 @@ class FunctionsTable:
                 result = Function(**function.model_dump())
                 db.add(result)
                 db.commit()
+                self._bump_version()
                 db.refresh(result)
                 if result:
                     return FunctionModel.model_validate(result)
@@ -149,6 +158,7 @@ class FunctionsTable:
                         db.delete(func)
 
                 db.commit()
+                self._bump_version()
 
                 return [
                     FunctionModel.model_validate(func)
@@ -232,6 +242,7 @@ class FunctionsTable:
                 function.valves = valves
                 function.updated_at = int(time.time())
                 db.commit()
+                self._bump_version()
                 db.refresh(function)
                 return self.get_function_by_id(id)
             except Exception:
@@ -272,6 +283,7 @@ class FunctionsTable:
 
             # Update the user settings in the database
             Users.update_user_by_id(user_id, {"settings": user_settings})
+            self._bump_version()
 
             return user_settings["functions"]["valves"][id]
         except Exception as e:
@@ -290,6 +302,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                self._bump_version()
                 return self.get_function_by_id(id)
             except Exception:
                 return None
@@ -304,6 +317,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                self._bump_version()
                 return True
             except Exception:
                 return None
@@ -313,6 +327,7 @@ class FunctionsTable:
             try:
                 db.query(Function).filter_by(id=id).delete()
                 db.commit()
+                self._bump_version()
 
                 return True
             except Exception:
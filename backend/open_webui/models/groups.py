@@ -1,17 +1,19 @@
 import json
 import logging
+import threading
 import time
+from contextvars import ContextVar
 from typing import Optional
 import uuid
 
 from open_webui.internal.db import Base, get_db
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import DATABASE_GROUP_MEMBERSHIP_CACHE_TTL, SRC_LOG_LEVELS
 
 from open_webui.models.files import FileMetadataResponse
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, String, Text, JSON, func
+from sqlalchemy import BigInteger, Column, Index, Text, JSON
 
 
 log = logging.getLogger(__name__)
@@ -41,6 +43,28 @@ class Group(Base):
     updated_at = Column(BigInteger)
 
 
+class GroupMember(Base):
+    __tablename__ = "group_member"
+
+    # Indexed copy of `group.user_ids`, kept in sync by GroupTable
+    group_id = Column(Text, primary_key=True)
+    user_id = Column(Text, primary_key=True)
+
+    created_at = Column(BigInteger)
+
+    __table_args__ = (
+        # WHERE user_id = ...
+        Index("group_member_user_id_idx", "user_id"),
+    )
+
+
+# Group ids per user, memoized for the duration of a request. The HTTP
+# middleware sets a fresh dict per request; outside of requests it is None.
+request_group_ids: ContextVar[Optional[dict]] = ContextVar(
+    "request_group_ids", default=None
+)
+
+
 class GroupModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: str
@@ -92,6 +116,66 @@ class GroupUpdateForm(GroupForm, UserIdsForm):
 
 
 class GroupTable:
+    def __init__(self):
+        self._member_cache: dict[str, tuple[float, list[str]]] = {}
+        self._member_cache_lock = threading.Lock()
+
+    def _set_members(self, db, group_id: str, user_ids: Optional[list[str]]):
+        db.query(GroupMember).filter_by(group_id=group_id).delete()
+        now = int(time.time())
+        db.add_all(
+            [
+                GroupMember(group_id=group_id, user_id=user_id, created_at=now)
+                for user_id in dict.fromkeys(user_ids or [])
+            ]
+        )
+
+    def invalidate_member_cache(self):
+        with self._member_cache_lock:
+            self._member_cache.clear()
+        memo = request_group_ids.get()
+        if memo is not None:
+            memo.clear()
+
+    def get_group_ids_by_member_id(self, user_id: str) -> list[str]:
+        """
+        Ids of the groups a user is a member of, from the per-request memo, the
+        short-lived per-user cache, or a single indexed query.
+        """
+        memo = request_group_ids.get()
+        if memo is not None and user_id in memo:
+            return memo[user_id]
+
+        now = time.monotonic()
+        entry = self._member_cache.get(user_id)
+        if entry is not None and entry[0] > now:
+            group_ids = entry[1]
+        else:
+            with get_db() as db:
+                group_ids = [
+                    group_id
+                    for (group_id,) in db.query(GroupMember.group_id)
+                    .filter_by(user_id=user_id)
+                    .all()
+                ]
+
+            if DATABASE_GROUP_MEMBERSHIP_CACHE_TTL > 0:
+                with self._member_cache_lock:
+                    if len(self._member_cache) >= 10000:
+                        self._member_cache = {
+                            key: value
+                            for key, value in self._member_cache.items()
+                            if value[0] > now
+                        }
+                    self._member_cache[user_id] = (
+                        now + DATABASE_GROUP_MEMBERSHIP_CACHE_TTL,
+                        group_ids,
+                    )
+
+        if memo is not None:
+            memo[user_id] = group_ids
+        return group_ids
+
     def insert_new_group(
         self, user_id: str, form_data: GroupForm
     ) -> Optional[GroupModel]:
@@ -109,7 +193,9 @@ class GroupTable:
             try:
                 result = Group(**group.model_dump())
                 db.add(result)
+                self._set_members(db, group.id, group.user_ids)
                 db.commit()
+                self.invalidate_member_cache()
                 db.refresh(result)
                 if result:
                     return GroupModel.model_validate(result)
@@ -131,12 +217,8 @@ class GroupTable:
             return [
                 GroupModel.model_validate(group)
                 for group in db.query(Group)
-                .filter(
-                    func.json_array_length(Group.user_ids) > 0
-                )  # Ensure array exists
-                .filter(
-                    Group.user_ids.cast(String).like(f'%"{user_id}"%')
-                )  # String-based check
+                .join(GroupMember, GroupMember.group_id == Group.id)
+                .filter(GroupMember.user_id == user_id)
                 .order_by(Group.updated_at.desc())
                 .all()
             ]
@@ -167,7 +249,10 @@ class GroupTable:
                         "updated_at": int(time.time()),
                     }
                 )
+                if form_data.user_ids is not None:
+                    self._set_members(db, id, form_data.user_ids)
                 db.commit()
+                self.invalidate_member_cache()
                 return self.get_group_by_id(id=id)
         except Exception as e:
             log.exception(e)
@@ -177,7 +262,9 @@ class GroupTable:
         try:
             with get_db() as db:
                 db.query(Group).filter_by(id=id).delete()
+                db.query(GroupMember).filter_by(group_id=id).delete()
                 db.commit()
+                self.invalidate_member_cache()
                 return True
         except Exception:
             return False
@@ -186,7 +273,9 @@ class GroupTable:
         with get_db() as db:
             try:
                 db.query(Group).delete()
+                db.query(GroupMember).delete()
                 db.commit()
+                self.invalidate_member_cache()
 
                 return True
             except Exception:
@@ -207,6 +296,9 @@ class GroupTable:
                     )
                     db.commit()
 
+                db.query(GroupMember).filter_by(user_id=user_id).delete()
+                db.commit()
+                self.invalidate_member_cache()
                 return True
             except Exception:
                 return False
@@ -261,19 +353,30 @@ class GroupTable:
                                 "updated_at": int(time.time()),
                             }
                         )
+                        db.query(GroupMember).filter_by(
+                            group_id=group.id, user_id=user_id
+                        ).delete()
 
                 # Add user to new groups
                 for group in groups:
-                    if user_id not in group.user_ids:
-                        group.user_ids.append(user_id)
+                    if user_id not in (group.user_ids or []):
+                        group_user_ids = [*(group.user_ids or []), user_id]
                         db.query(Group).filter_by(id=group.id).update(
                             {
-                                "user_ids": group.user_ids,
+                                "user_ids": group_user_ids,
                                 "updated_at": int(time.time()),
                             }
                         )
+                        db.merge(
+                            GroupMember(
+                                group_id=group.id,
+                                user_id=user_id,
+                                created_at=int(time.time()),
+                            )
+                        )
 
                 db.commit()
+                self.invalidate_member_cache()
                 return True
             except Exception as e:
                 log.exception(e)
@@ -300,7 +403,9 @@ class GroupTable:
 
                 group.user_ids = group_user_ids
                 group.updated_at = int(time.time())
+                self._set_members(db, id, group_user_ids)
                 db.commit()
+                self.invalidate_member_cache()
                 db.refresh(group)
                 return GroupModel.model_validate(group)
         except Exception as e:
@@ -329,8 +434,10 @@ class GroupTable:
 
                 group.user_ids = group_user_ids
                 group.updated_at = int(time.time())
+                self._set_members(db, id, group_user_ids)
 
                 db.commit()
+                self.invalidate_member_cache()
                 db.refresh(group)
                 return GroupModel.model_validate(group)
         except Exception as e:
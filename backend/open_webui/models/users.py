@@ -1,10 +1,14 @@
+import threading
 import time
 from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
 
 
-from open_webui.env import DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL
+from open_webui.env import (
+    DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL,
+    DATABASE_USER_CACHE_TTL,
+)
 from open_webui.models.chats import Chats
 from open_webui.models.groups import Groups
 from open_webui.utils.misc import throttle
@@ -12,7 +16,7 @@ from open_webui.utils.misc import throttle
 
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Column, String, Text, Date
-from sqlalchemy import or_
+from sqlalchemy import case, or_
 
 import datetime
 
@@ -141,6 +145,114 @@ class UserUpdateForm(BaseModel):
 
 
 class UsersTable:
+    def __init__(self):
+        # id -> (expires_at, user) and api_key -> (expires_at, id) of recently
+        # authenticated users
+        self._user_cache: dict[str, tuple[float, UserModel]] = {}
+        self._api_key_cache: dict[str, tuple[float, str]] = {}
+        self._user_cache_lock = threading.Lock()
+
+        # id -> last active timestamp not written yet
+        self._last_active: dict[str, int] = {}
+        self._last_active_lock = threading.Lock()
+
+    def _cache_user(self, user: UserModel, api_key: Optional[str] = None):
+        if DATABASE_USER_CACHE_TTL <= 0:
+            return
+
+        now = time.monotonic()
+        with self._user_cache_lock:
+            if len(self._user_cache) >= 10000:
+                self._user_cache = {
+                    key: value
+                    for key, value in self._user_cache.items()
+                    if value[0] > now
+                }
+            if len(self._api_key_cache) >= 10000:
+                self._api_key_cache = {
+                    key: value
+                    for key, value in self._api_key_cache.items()
+                    if value[0] > now
+                }
+
+            self._user_cache[user.id] = (now + DATABASE_USER_CACHE_TTL, user)
+            if api_key is not None:
+                self._api_key_cache[api_key] = (now + DATABASE_USER_CACHE_TTL, user.id)
+
+    def invalidate_user_cache(self, id: str):
+        with self._user_cache_lock:
+            self._user_cache.pop(id, None)
+            for api_key, (_, user_id) in list(self._api_key_cache.items()):
+                if user_id == id:
+                    self._api_key_cache.pop(api_key, None)
+
+    def get_cached_user_by_id(self, id: str) -> Optional[UserModel]:
+        """
+        The user from the short-lived cache of authenticated users, or a query.
+        """
+        entry = self._user_cache.get(id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        user = self.get_user_by_id(id)
+        if user is not None:
+            self._cache_user(user)
+        return user
+
+    def get_cached_user_by_api_key(self, api_key: str) -> Optional[UserModel]:
+        now = time.monotonic()
+        entry = self._api_key_cache.get(api_key)
+        if entry is not None and entry[0] > now:
+            user_entry = self._user_cache.get(entry[1])
+            if user_entry is not None and user_entry[0] > now:
+                return user_entry[1]
+
+        user = self.get_user_by_api_key(api_key)
+        if user is not None:
+            self._cache_user(user, api_key)
+        return user
+
+    def record_user_last_active(self, id: str):
+        """Note the user as active now; written by `flush_users_last_active`."""
+        with self._last_active_lock:
+            self._last_active[id] = int(time.time())
+
+    def flush_users_last_active(self) -> int:
+        """Write the pending last active timestamps, one statement per chunk."""
+        with self._last_active_lock:
+            pending, self._last_active = self._last_active, {}
+
+        if not pending:
+            return 0
+
+        ids = list(pending.keys())
+        written = 0
+        try:
+            with get_db() as db:
+                # About 3 bound parameters per user, chunked to stay below the
+                # parameter limit of the database
+                for idx in range(0, len(ids), 300):
+                    chunk = {id: pending[id] for id in ids[idx : idx + 300]}
+                    db.query(User).filter(User.id.in_(chunk.keys())).update(
+                        {
+                            "last_active_at": case(
+                                chunk, value=User.id, else_=User.last_active_at
+                            )
+                        },
+                        synchronize_session=False,
+                    )
+                    db.commit()
+                    written += len(chunk)
+        except Exception:
+            # Keep the unwritten ones for the next flush unless newer ones
+            # were recorded
+            with self._last_active_lock:
+                for id in ids[written:]:
+                    self._last_active.setdefault(id, pending[id])
+            raise
+
+        return written
+
     def insert_new_user(
         self,
         id: str,
@@ -317,6 +429,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"role": role})
                 db.commit()
+                self.invalidate_user_cache(id)
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
         except Exception:
@@ -331,6 +444,7 @@ class UsersTable:
                     {"profile_image_url": profile_image_url}
                 )
                 db.commit()
+                self.invalidate_user_cache(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -358,6 +472,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"oauth_sub": oauth_sub})
                 db.commit()
+                self.invalidate_user_cache(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -369,6 +484,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update(updated)
                 db.commit()
+                self.invalidate_user_cache(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -389,6 +505,7 @@ class UsersTable:
 
                 db.query(User).filter_by(id=id).update({"settings": user_settings})
                 db.commit()
+                self.invalidate_user_cache(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -407,6 +524,7 @@ class UsersTable:
                     # Delete User
                     db.query(User).filter_by(id=id).delete()
                     db.commit()
+                self.invalidate_user_cache(id)
 
                 return True
             else:
@@ -419,6 +537,7 @@ class UsersTable:
             with get_db() as db:
                 result = db.query(User).filter_by(id=id).update({"api_key": api_key})
                 db.commit()
+                self.invalidate_user_cache(id)
                 return True if result == 1 else False
         except Exception:
             return False
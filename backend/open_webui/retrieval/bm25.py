@@ -0,0 +1,220 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import uuid
+from contextlib import closing
+from typing import Optional
+
+from open_webui.config import BM25_INDEX_DIR
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.retrieval.vector.main import GetResult, SearchResult
+from open_webui.retrieval.vector.utils import where_to_sql
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+QUERY_TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunk (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL,
+    metadata TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5(
+    text, content='chunk', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS chunk_ai AFTER INSERT ON chunk BEGIN
+    INSERT INTO chunk_fts(rowid, text) VALUES (new.rowid, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS chunk_ad AFTER DELETE ON chunk BEGIN
+    INSERT INTO chunk_fts(chunk_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS chunk_au AFTER UPDATE ON chunk BEGIN
+    INSERT INTO chunk_fts(chunk_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+    INSERT INTO chunk_fts(rowid, text) VALUES (new.rowid, new.text);
+END;
+"""
+
+
+class BM25Index:
+    """
+    Persistent keyword index backing the BM25 half of hybrid search.
+
+    Every vector collection gets its own SQLite FTS5 database so term statistics
+    stay per collection (as with an in-memory BM25Retriever built from the whole
+    collection) while a query only touches the posting lists of its own terms.
+    The index is kept in step with the vector store by the routers that write to
+    it; collections that predate the index are built once on first use.
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        # Databases whose schema this process already created or checked
+        self._ready_paths: set[str] = set()
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    def _get_path(self, collection_name: str) -> str:
+        if COLLECTION_NAME_PATTERN.match(collection_name):
+            filename = collection_name
+        else:
+            filename = hashlib.sha256(collection_name.encode()).hexdigest()
+        return os.path.join(self.index_dir, f"{filename}.sqlite3")
+
+    def _connect(self, path: str) -> sqlite3.Connection:
+        # A file missing now may have been removed by another process since we
+        # last created it
+        ready = path in self._ready_paths and os.path.exists(path)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not ready:
+            conn.executescript(SCHEMA)
+            self._ready_paths.add(path)
+        return conn
+
+    @staticmethod
+    def _write_items(conn: sqlite3.Connection, items: list[dict]):
+        conn.executemany(
+            "INSERT INTO chunk(id, text, metadata) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET text = excluded.text, metadata = excluded.metadata",
+            [
+                (
+                    str(item["id"]),
+                    item.get("text") or "",
+                    json.dumps(item.get("metadata") or {}, default=str),
+                )
+                for item in items
+            ],
+        )
+
+    def has_collection(self, collection_name: str) -> bool:
+        return os.path.exists(self._get_path(collection_name))
+
+    def insert(self, collection_name: str, items: list[dict]):
+        """Add (or replace by id) chunks in the index of the collection."""
+        with closing(self._connect(self._get_path(collection_name))) as conn:
+            with conn:
+                self._write_items(conn, items)
+
+    def build(self, collection_name: str, result: Optional[GetResult]):
+        """
+        (Re)build the index of a collection from a full vector DB read.
+
+        The index is written to a scratch file and swapped in atomically, so
+        concurrent readers never see a partially built index.
+        """
+        items = []
+        if result is not None and result.ids:
+            items = [
+                {
+                    "id": id,
+                    "text": result.documents[0][idx],
+                    "metadata": result.metadatas[0][idx],
+                }
+                for idx, id in enumerate(result.ids[0])
+            ]
+
+        path = self._get_path(collection_name)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with closing(sqlite3.connect(tmp_path)) as conn:
+                conn.executescript(SCHEMA)
+                with conn:
+                    self._write_items(conn, items)
+                conn.execute("INSERT INTO chunk_fts(chunk_fts) VALUES ('optimize')")
+            self._remove(path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        log.info(f"bm25 index built for {collection_name} ({len(items)} chunks)")
+
+    def search(
+        self,
+        collection_name: str,
+        query: str,
+        limit: int,
+        filter: Optional[dict] = None,
+    ) -> Optional[SearchResult]:
+        """
+        Return the `limit` best BM25 matches for any of the query terms, among
+        the chunks whose metadata matches `filter` if one is given.
+        """
+        if not self.has_collection(collection_name):
+            return None
+
+        terms = QUERY_TERM_PATTERN.findall(query)
+        if not terms:
+            return SearchResult(
+                ids=[[]], documents=[[]], metadatas=[[]], distances=[[]]
+            )
+
+        # Quote each term so user input is never parsed as FTS5 query syntax
+        match = " OR ".join(
+            '"{}"'.format(term.replace('"', '""')) for term in dict.fromkeys(terms)
+        )
+
+        condition, params = where_to_sql(filter)
+        with closing(self._connect(self._get_path(collection_name))) as conn:
+            rows = conn.execute(
+                "SELECT chunk.id, chunk.text, chunk.metadata, bm25(chunk_fts) AS score "
+                "FROM chunk_fts JOIN chunk ON chunk.rowid = chunk_fts.rowid "
+                f"WHERE chunk_fts MATCH ? AND {condition} ORDER BY score LIMIT ?",
+                (match, *params, limit),
+            ).fetchall()
+
+        return SearchResult(
+            ids=[[row[0] for row in rows]],
+            documents=[[row[1] for row in rows]],
+            metadatas=[[json.loads(row[2]) if row[2] else {} for row in rows]],
+            # FTS5 reports bm25 scores negated so that lower sorts first
+            distances=[[-row[3] for row in rows]],
+        )
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        """Delete chunks by id or by metadata equality, mirroring VectorDBBase.delete."""
+        if not self.has_collection(collection_name):
+            return
+
+        with closing(self._connect(self._get_path(collection_name))) as conn:
+            with conn:
+                if ids:
+                    conn.executemany(
+                        "DELETE FROM chunk WHERE id = ?", [(str(id),) for id in ids]
+                    )
+                elif filter:
+                    clauses = " AND ".join(
+                        "json_extract(metadata, ?) = ?" for _ in filter
+                    )
+                    params = []
+                    for key, value in filter.items():
+                        params.extend([f'$."{key}"', value])
+                    conn.execute(f"DELETE FROM chunk WHERE {clauses}", params)
+
+    def _remove(self, path: str):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(f"{path}{suffix}"):
+                os.remove(f"{path}{suffix}")
+
+    def delete_collection(self, collection_name: str):
+        self._remove(self._get_path(collection_name))
+
+    def reset(self):
+        for filename in os.listdir(self.index_dir):
+            os.remove(os.path.join(self.index_dir, filename))
+
+
+BM25_INDEX = BM25Index(BM25_INDEX_DIR)
@@ -0,0 +1,316 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+from typing import Callable, Optional, Union
+
+from open_webui.config import (
+    ENABLE_RAG_EMBEDDING_CACHE,
+    RAG_EMBEDDING_CACHE_PATH,
+    RAG_EMBEDDING_CACHE_MEMORY_SIZE,
+    RAG_EMBEDDING_CACHE_DISK_SIZE,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class EmbeddingCacheBackend(ABC):
+    """
+    A single storage tier of the embedding cache.
+
+    Backends map opaque cache keys to embeddings and are responsible for their
+    own eviction; they return the number of entries evicted from `set_many`.
+    """
+
+    @abstractmethod
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        pass
+
+    @abstractmethod
+    def set_many(self, items: dict[str, list[float]]) -> int:
+        pass
+
+    @abstractmethod
+    def size(self) -> int:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class MemoryEmbeddingCache(EmbeddingCacheBackend):
+    """Process-local LRU tier."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._items:
+                    self._items.move_to_end(key)
+                    found[key] = self._items[key]
+        return found
+
+    def set_many(self, items: dict[str, list[float]]) -> int:
+        evicted = 0
+        with self._lock:
+            for key, embedding in items.items():
+                self._items[key] = embedding
+                self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def size(self) -> int:
+        return len(self._items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class SQLiteEmbeddingCache(EmbeddingCacheBackend):
+    """
+    On-disk tier shared by all workers of an instance.
+
+    Embeddings are stored as packed doubles so they round-trip exactly, and the
+    least recently used entries are evicted once `max_size` is exceeded.
+    """
+
+    def __init__(self, path: str, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embedding ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embedding_accessed_at_idx "
+            "ON embedding (accessed_at)"
+        )
+        self._conn.commit()
+
+        # Approximate entry count, recounted only when it crosses max_size
+        self._count = self._size()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embedding WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = array("d", vector).tolist()
+
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embedding SET accessed_at = ? WHERE key = ?",
+                        [(now, key) for key in found],
+                    )
+        return found
+
+    def set_many(self, items: dict[str, list[float]]) -> int:
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embedding (key, vector, accessed_at) VALUES (?, ?, ?)",
+                    [
+                        (key, array("d", embedding).tobytes(), now)
+                        for key, embedding in items.items()
+                    ],
+                )
+
+                self._count += len(items)
+                if self._count <= self.max_size:
+                    return 0
+
+                self._count = self._size()
+                excess = self._count - self.max_size
+                if excess > 0:
+                    self._conn.execute(
+                        "DELETE FROM embedding WHERE key IN ("
+                        "SELECT key FROM embedding ORDER BY accessed_at LIMIT ?)",
+                        (excess,),
+                    )
+                    self._count -= excess
+                    return excess
+        return 0
+
+    def _size(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embedding").fetchone()[0]
+
+    def size(self) -> int:
+        with self._lock:
+            return self._size()
+
+    def clear(self) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM embedding")
+            self._count = 0
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache in front of the embedding engines.
+
+    Entries are keyed by (engine, model, prefix, sha256 of the text), so the
+    same chunk uploaded to several knowledge bases, a reindex, or a repeated
+    query is only embedded once. Lookups go through the tiers in order and
+    hits in a slower tier are promoted to the faster ones.
+    """
+
+    def __init__(self, tiers: list[EmbeddingCacheBackend]):
+        self.tiers = tiers
+        self._lock = threading.Lock()
+        self.hits = [0] * len(tiers)
+        self.misses = 0
+        self.evictions = [0] * len(tiers)
+
+    @staticmethod
+    def get_key(engine: str, model: str, prefix: Optional[str], text: str) -> str:
+        text_hash = hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+        return hashlib.sha256(
+            json.dumps([engine, model, prefix, text_hash]).encode()
+        ).hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        remaining = list(dict.fromkeys(keys))
+        for idx, tier in enumerate(self.tiers):
+            if not remaining:
+                break
+
+            tier_found = tier.get_many(remaining)
+            if tier_found:
+                self._record(hits=(idx, len(tier_found)))
+                for faster_idx in range(idx):
+                    self._record(
+                        evictions=(
+                            faster_idx,
+                            self.tiers[faster_idx].set_many(tier_found),
+                        )
+                    )
+                found.update(tier_found)
+                remaining = [key for key in remaining if key not in tier_found]
+
+        self._record(misses=len(remaining))
+        return found
+
+    def set_many(self, items: dict[str, list[float]]):
+        for idx, tier in enumerate(self.tiers):
+            self._record(evictions=(idx, tier.set_many(items)))
+
+    def _record(self, hits=None, misses=0, evictions=None):
+        with self._lock:
+            if hits:
+                self.hits[hits[0]] += hits[1]
+            if evictions:
+                self.evictions[evictions[0]] += evictions[1]
+            self.misses += misses
+
+    def embed(
+        self,
+        engine: str,
+        model: str,
+        text: Union[str, list[str]],
+        prefix: Optional[str],
+        compute: Callable[[list[str]], Optional[list[list[float]]]],
+    ):
+        """
+        Return the embeddings of `text`, calling `compute` with the texts that
+        are not cached yet (each distinct text at most once).
+        """
+        texts = [text] if isinstance(text, str) else text
+        keys = [self.get_key(engine, model, prefix, t) for t in texts]
+        found = self.get_many(keys)
+
+        missing = {}
+        for key, t in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = t
+
+        if missing:
+            embeddings = compute(list(missing.values()))
+            if embeddings is None or len(embeddings) != len(missing):
+                raise ValueError(
+                    f"Failed to generate embeddings for {len(missing)} texts"
+                )
+
+            computed = dict(zip(missing.keys(), embeddings))
+            self.set_many(computed)
+            found.update(computed)
+
+        embeddings = [found[key] for key in keys]
+        return embeddings[0] if isinstance(text, str) else embeddings
+
+    def stats(self) -> dict:
+        hits = sum(self.hits)
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "tiers": [
+                {
+                    "type": type(tier).__name__,
+                    "size": tier.size(),
+                    "max_size": tier.max_size,
+                    "hits": self.hits[idx],
+                    "evictions": self.evictions[idx],
+                }
+                for idx, tier in enumerate(self.tiers)
+            ],
+        }
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    if not ENABLE_RAG_EMBEDDING_CACHE:
+        return None
+
+    tiers = []
+    if RAG_EMBEDDING_CACHE_MEMORY_SIZE > 0:
+        tiers.append(MemoryEmbeddingCache(RAG_EMBEDDING_CACHE_MEMORY_SIZE))
+    if RAG_EMBEDDING_CACHE_DISK_SIZE > 0:
+        try:
+            tiers.append(
+                SQLiteEmbeddingCache(
+                    RAG_EMBEDDING_CACHE_PATH, RAG_EMBEDDING_CACHE_DISK_SIZE
+                )
+            )
+        except Exception as e:
+            log.warning(f"Embedding disk cache unavailable: {e}")
+
+    return EmbeddingCache(tiers) if tiers else None
+
+
+EMBEDDING_CACHE = get_embedding_cache()
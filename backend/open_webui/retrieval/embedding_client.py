@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import random
+import threading
+import weakref
+from typing import Optional
+from urllib.parse import quote
+
+import aiohttp
+
+from open_webui.models.users import UserModel
+from open_webui.utils.session_pool import get_session
+
+from open_webui.config import (
+    RAG_EMBEDDING_PREFIX_FIELD_NAME,
+    RAG_EMBEDDING_CONCURRENT_REQUESTS,
+    RAG_EMBEDDING_BATCH_MAX_TOKENS,
+    RAG_EMBEDDING_MAX_RETRIES,
+)
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    AIOHTTP_CLIENT_TIMEOUT,
+    ENABLE_FORWARD_USER_INFO_HEADERS,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Consecutive successful batches after which a reduced batch size is doubled
+BATCH_SIZE_RECOVERY = 8
+
+
+class EmbeddingRequestError(Exception):
+    pass
+
+
+class EmbeddingBatchTooLarge(EmbeddingRequestError):
+    pass
+
+
+def estimate_tokens(text: str) -> int:
+    # About 4 characters per token for the common embedding tokenizers
+    return len(text) // 4 + 1
+
+
+def get_batch_end(
+    texts: list[str], start: int, max_batch_size: int, max_tokens: int = 0
+) -> int:
+    """
+    End of the batch starting at `start`: at most `max_batch_size` texts and,
+    if `max_tokens` is set, at most that many estimated tokens. A single text
+    over the token limit gets a batch of its own.
+    """
+    end = min(start + max_batch_size, len(texts))
+    if max_tokens <= 0:
+        return end
+
+    tokens = 0
+    for i in range(start, end):
+        tokens += estimate_tokens(texts[i])
+        if tokens > max_tokens and i > start:
+            return i
+    return end
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_embedding_loop() -> asyncio.AbstractEventLoop:
+    """The background event loop the synchronous embedding calls run on."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="embedding-client", daemon=True
+            ).start()
+    return _loop
+
+
+class EmbeddingClient:
+    """
+    Batched embedding requests to an OpenAI or Ollama embedding endpoint.
+
+    Texts are packed into batches by count and estimated tokens, and the
+    batches are sent concurrently over the shared connection pool, at most
+    RAG_EMBEDDING_CONCURRENT_REQUESTS at a time per client. Batches failing with 429, 5xx
+    or a connection error are retried with exponential backoff, honouring
+    Retry-After. A batch rejected as too large is split in half and the batch
+    size of the following batches shrinks, growing back after consecutive
+    successes.
+
+    `embed` is a coroutine; `embed_sync` runs it on a background event loop for
+    the synchronous callers (ingestion workers, retrieval).
+    """
+
+    def __init__(
+        self, engine: str, model: str, url: str, key: str = "", batch_size: int = 1
+    ):
+        self.engine = engine
+        self.model = model
+        self.url = url
+        self.key = key
+        self.max_batch_size = max(int(batch_size or 1), 1)
+        self.batch_size = self.max_batch_size
+        self._successes = 0
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(RAG_EMBEDDING_CONCURRENT_REQUESTS)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    def _get_request(
+        self, texts: list[str], prefix: Optional[str], user: Optional[UserModel]
+    ) -> tuple[str, dict, dict]:
+        if self.engine == "ollama":
+            url = f"{self.url}/api/embed"
+        else:
+            url = f"{self.url}/embeddings"
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.key}",
+            **(
+                {
+                    "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
+                    "X-OpenWebUI-User-Id": user.id,
+                    "X-OpenWebUI-User-Email": user.email,
+                    "X-OpenWebUI-User-Role": user.role,
+                }
+                if ENABLE_FORWARD_USER_INFO_HEADERS and user
+                else {}
+            ),
+        }
+
+        json_data = {"input": texts, "model": self.model}
+        if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
+            json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
+
+        return url, headers, json_data
+
+    def _parse_response(self, data: dict) -> list[list[float]]:
+        if self.engine == "ollama":
+            if "embeddings" in data:
+                return data["embeddings"]
+        elif "data" in data:
+            return [elem["embedding"] for elem in data["data"]]
+        raise EmbeddingRequestError(f"Unexpected embedding response: {str(data)[:200]}")
+
+    async def _post(
+        self, texts: list[str], prefix: Optional[str], user: Optional[UserModel]
+    ) -> list[list[float]]:
+        url, headers, json_data = self._get_request(texts, prefix, user)
+
+        error = None
+        for attempt in range(RAG_EMBEDDING_MAX_RETRIES + 1):
+            retry_after = None
+            try:
+                async with self._get_semaphore():
+                    async with get_session().post(
+                        url,
+                        headers=headers,
+                        json=json_data,
+                        timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
+                    ) as r:
+                        if r.status < 400:
+                            return self._parse_response(await r.json())
+
+                        body = await r.text()
+                        error = EmbeddingRequestError(f"{r.status}: {body[:200]}")
+                        if r.status == 413 or (
+                            r.status == 400
+                            and len(texts) > 1
+                            and "token" in body.lower()
+                        ):
+                            raise EmbeddingBatchTooLarge(str(error))
+                        if r.status not in RETRY_STATUS_CODES:
+                            raise error
+                        retry_after = r.headers.get("Retry-After")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+
+            if attempt == RAG_EMBEDDING_MAX_RETRIES:
+                break
+
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = min(0.5 * 2**attempt, 30) * random.uniform(1, 1.5)
+            log.warning(
+                f"Embedding request to {url} failed ({error}), retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+        raise EmbeddingRequestError(f"Embedding request to {url} failed: {error}")
+
+    async def _embed_batch(
+        self, texts: list[str], prefix: Optional[str], user: Optional[UserModel]
+    ) -> list[list[float]]:
+        try:
+            embeddings = await self._post(texts, prefix, user)
+        except EmbeddingBatchTooLarge:
+            if len(texts) == 1:
+                raise
+            half = len(texts) // 2
+            self.batch_size = max(min(self.batch_size, half), 1)
+            self._successes = 0
+            log.info(f"Embedding batch too large, reducing batch size to {half}")
+
+            first, second = await asyncio.gather(
+                self._embed_batch(texts[:half], prefix, user),
+                self._embed_batch(texts[half:], prefix, user),
+            )
+            return first + second
+
+        if len(embeddings) != len(texts):
+            raise EmbeddingRequestError(
+                f"Expected {len(texts)} embeddings, got {len(embeddings)}"
+            )
+
+        self._successes += 1
+        if (
+            self.batch_size < self.max_batch_size
+            and self._successes >= BATCH_SIZE_RECOVERY
+        ):
+            self.batch_size = min(self.batch_size * 2, self.max_batch_size)
+            self._successes = 0
+        return embeddings
+
+    async def embed(
+        self,
+        texts: list[str],
+        prefix: Optional[str] = None,
+        user: Optional[UserModel] = None,
+    ) -> list[list[float]]:
+        embeddings: list = [None] * len(texts)
+        position = 0
+
+        # Batches are taken one at a time, so a batch size reduced by a
+        # rejected batch applies to the rest of the texts
+        async def worker():
+            nonlocal position
+            while position < len(texts):
+                start = position
+                end = get_batch_end(
+                    texts, start, self.batch_size, RAG_EMBEDDING_BATCH_MAX_TOKENS
+                )
+                position = end
+                embeddings[start:end] = await self._embed_batch(
+                    texts[start:end], prefix, user
+                )
+
+        log.debug(f"Embedding {len(texts)} texts with {self.engine}:{self.model}")
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(RAG_EMBEDDING_CONCURRENT_REQUESTS, len(texts)))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        return embeddings
+
+    def embed_sync(
+        self,
+        texts: list[str],
+        prefix: Optional[str] = None,
+        user: Optional[UserModel] = None,
+    ) -> list[list[float]]:
+        return asyncio.run_coroutine_threadsafe(
+            self.embed(texts, prefix, user), get_embedding_loop()
+        ).result()
@@ -0,0 +1,467 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from multiprocessing import get_context
+from typing import Callable, Optional
+
+from fastapi import Request
+from pydantic import BaseModel
+from starlette.datastructures import Headers
+
+from open_webui.config import (
+    RAG_INGESTION_QUEUE_PATH,
+    RAG_INGESTION_WORKERS,
+    RAG_INGESTION_PARSE_PROCESSES,
+)
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.models.users import Users
+from open_webui.retrieval.loaders.main import load_documents
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+# Seconds a running job stays claimed without a heartbeat before another
+# worker (or this one after a restart) picks it up again
+LEASE_DURATION = 120
+
+# Jobs that were interrupted this many times are considered poisonous
+MAX_ATTEMPTS = 3
+
+# Files a user is waiting on go before bulk reindexing
+UPLOAD_JOB_PRIORITY = 10
+REINDEX_JOB_PRIORITY = 0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    user_id TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS job_status_priority_idx
+    ON job (status, priority DESC, created_at);
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class IngestionJob(BaseModel):
+    id: str
+    kind: str
+    payload: dict
+    user_id: Optional[str] = None
+    priority: int
+    status: str  # pending, running, completed, failed or cancelled
+    progress: float
+    error: Optional[str] = None
+    attempts: int
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+JOB_COLUMNS = (
+    "id, kind, payload, user_id, priority, status, progress, error, attempts, "
+    "created_at, started_at, finished_at"
+)
+
+
+def row_to_job(row) -> IngestionJob:
+    return IngestionJob(
+        **{
+            **dict(zip([c.strip() for c in JOB_COLUMNS.split(",")], row)),
+            "payload": json.loads(row[2]),
+        }
+    )
+
+
+class IngestionQueue:
+    """
+    Persistent, priority-ordered queue of file ingestion jobs.
+
+    Jobs live in a SQLite database under DATA_DIR, so every worker process of
+    the instance pulls from the same queue and pending work survives restarts.
+    Each process runs a bounded pool of worker threads; a claimed job is
+    leased and the lease is renewed while it runs, so jobs of a crashed or
+    restarted process are picked up again once their lease expires. File
+    parsing (the CPU bound part) is handed to a process pool, embedding and
+    vector DB writes stay batched per file in the worker threads.
+
+    Handlers are registered per job kind by the routers and are called with a
+    request bound to the application, the job and its user. They report
+    progress through `set_progress`, which also raises `JobCancelled` once the
+    job has been cancelled.
+    """
+
+    def __init__(self, path: str, workers: int, parse_processes: int):
+        self.path = path
+        self.workers = workers
+        self.parse_processes = parse_processes
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._handlers: dict[str, Callable] = {}
+        self._cancel_handlers: dict[str, Callable] = {}
+        self._app = None
+        self._threads: list[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._local = threading.local()
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._parse_pool_lock = threading.Lock()
+
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def register(
+        self, kind: str, handler: Callable, on_cancel: Optional[Callable] = None
+    ):
+        """
+        Register the handler of a job kind. `on_cancel` is called with the job
+        when it is cancelled before a worker picked it up, running jobs clean
+        up after themselves when `set_progress` raises `JobCancelled`.
+        """
+        self._handlers[kind] = handler
+        if on_cancel is not None:
+            self._cancel_handlers[kind] = on_cancel
+
+    ####################
+    # Jobs
+    ####################
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        user_id: Optional[str] = None,
+        priority: int = 0,
+    ) -> IngestionJob:
+        job_id = str(uuid.uuid4())
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO job (id, kind, payload, user_id, priority, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, 'pending', ?)",
+                (job_id, kind, json.dumps(payload), user_id, priority, time.time()),
+            )
+        self._wakeup.set()
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT {JOB_COLUMNS} FROM job WHERE id = ?", (job_id,)
+            ).fetchone()
+        return row_to_job(row) if row else None
+
+    def get_jobs(
+        self,
+        user_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 100,
+    ) -> list[IngestionJob]:
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {JOB_COLUMNS} FROM job {where} "
+                "ORDER BY created_at DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [row_to_job(row) for row in rows]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a pending job, or ask the worker running it to stop."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE job SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status = 'pending'",
+                (time.time(), job_id),
+            )
+            if not cursor.rowcount:
+                cursor = conn.execute(
+                    "UPDATE job SET cancel_requested = 1 "
+                    "WHERE id = ? AND status = 'running'",
+                    (job_id,),
+                )
+                return cursor.rowcount > 0
+
+        job = self.get_job(job_id)
+        on_cancel = self._cancel_handlers.get(job.kind) if job else None
+        if on_cancel is not None:
+            try:
+                on_cancel(job)
+            except Exception as e:
+                log.error(f"Cancel handler of ingestion job {job_id} failed: {e}")
+        return True
+
+    def set_progress(self, progress: float, job_id: Optional[str] = None):
+        """Record the progress of a running job (the current one by default)."""
+        job_id = job_id or getattr(self._local, "job_id", None)
+        if job_id is None:
+            return
+
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE job SET progress = ?, lease_until = ? WHERE id = ?",
+                (progress, time.time() + LEASE_DURATION, job_id),
+            )
+            row = conn.execute(
+                "SELECT cancel_requested FROM job WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row and row[0]:
+            raise JobCancelled(job_id)
+
+    def _claim(self) -> Optional[IngestionJob]:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            # BEGIN IMMEDIATE serializes claims across threads and processes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose lease expired were interrupted by a restart or crash
+                conn.execute(
+                    "UPDATE job SET status = 'failed', finished_at = ?, "
+                    "error = 'Interrupted too many times' "
+                    "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (now, now, MAX_ATTEMPTS),
+                )
+                conn.execute(
+                    "UPDATE job SET status = 'pending', owner = NULL "
+                    "WHERE status = 'running' AND lease_until < ?",
+                    (now,),
+                )
+
+                row = conn.execute(
+                    f"SELECT {JOB_COLUMNS} FROM job WHERE status = 'pending' "
+                    "ORDER BY priority DESC, created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                conn.execute(
+                    "UPDATE job SET status = 'running', owner = ?, lease_until = ?, "
+                    "attempts = attempts + 1, started_at = ? WHERE id = ?",
+                    (self.owner, now + LEASE_DURATION, now, row[0]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return row_to_job(row)
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE job SET status = ?, error = ?, finished_at = ?, owner = NULL, "
+                "progress = CASE WHEN ? = 'completed' THEN 1 ELSE progress END "
+                "WHERE id = ?",
+                (status, error, time.time(), status, job_id),
+            )
+
+    ####################
+    # Workers
+    ####################
+
+    def _get_request(self) -> Request:
+        return Request(
+            {
+                "type": "http",
+                "asgi.version": "3.0",
+                "asgi.spec_version": "2.0",
+                "method": "POST",
+                "path": "/internal/ingestion",
+                "query_string": b"",
+                "headers": Headers({}).raw,
+                "client": ("127.0.0.1", 12345),
+                "server": ("127.0.0.1", 80),
+                "scheme": "http",
+                "app": self._app,
+            }
+        )
+
+    def _run(self, job: IngestionJob):
+        handler = self._handlers.get(job.kind)
+        if handler is None:
+            self._finish(job.id, "failed", f"No handler for job kind {job.kind}")
+            return
+
+        self._local.job_id = job.id
+        start = time.monotonic()
+        try:
+            user = Users.get_user_by_id(job.user_id) if job.user_id else None
+            handler(self._get_request(), job, user)
+            self._finish(job.id, "completed")
+            log.debug(f"Ingestion job {job.id} done in {time.monotonic() - start:.2f}s")
+        except JobCancelled:
+            self._finish(job.id, "cancelled")
+        except Exception as e:
+            log.exception(f"Ingestion job {job.id} ({job.kind}) failed: {e}")
+            self._finish(
+                job.id, "failed", str(e.detail) if hasattr(e, "detail") else str(e)
+            )
+        finally:
+            self._local.job_id = None
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                log.error(f"Failed to claim ingestion job: {e}")
+                job = None
+
+            if job is None:
+                # Also poll, jobs may be enqueued by other processes
+                self._wakeup.wait(timeout=1)
+                self._wakeup.clear()
+                continue
+
+            self._run(job)
+
+    def _heartbeat(self):
+        while not self._stopping.wait(LEASE_DURATION / 4):
+            try:
+                with closing(self._connect()) as conn:
+                    conn.execute(
+                        "UPDATE job SET lease_until = ? "
+                        "WHERE status = 'running' AND owner = ?",
+                        (time.time() + LEASE_DURATION, self.owner),
+                    )
+            except Exception as e:
+                log.error(f"Failed to renew ingestion job leases: {e}")
+
+    def start(self, app):
+        if self._threads:
+            return
+        self._app = app
+        self._stopping.clear()
+
+        for idx in range(max(self.workers, 1)):
+            thread = threading.Thread(
+                target=self._worker, name=f"ingestion-worker-{idx}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        thread = threading.Thread(
+            target=self._heartbeat, name="ingestion-heartbeat", daemon=True
+        )
+        thread.start()
+        self._threads.append(thread)
+
+        log.info(
+            f"Started {self.workers} ingestion workers "
+            f"({self.parse_processes} parse processes)"
+        )
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+        self._threads = []
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(wait=False, cancel_futures=True)
+            self._parse_pool = None
+
+    ####################
+    # Parsing
+    ####################
+
+    def _get_parse_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.parse_processes <= 0:
+            return None
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                # spawn: forking a process with live threads and DB connections
+                # is unsafe
+                self._parse_pool = ProcessPoolExecutor(
+                    max_workers=self.parse_processes, mp_context=get_context("spawn")
+                )
+            return self._parse_pool
+
+    def load_documents(
+        self,
+        loader_config: dict,
+        filename: str,
+        file_content_type: str,
+        file_path: str,
+    ):
+        """Parse a file, in the parse process pool once the queue is started."""
+        pool = self._get_parse_pool() if self._threads else None
+        if pool is None:
+            docs = load_documents(loader_config, filename, file_content_type, file_path)
+        else:
+            try:
+                docs = pool.submit(
+                    load_documents,
+                    loader_config,
+                    filename,
+                    file_content_type,
+                    file_path,
+                ).result()
+            except BrokenProcessPool:
+                log.warning("Parse process pool broke, parsing in the worker thread")
+                with self._parse_pool_lock:
+                    self._parse_pool = None
+                docs = load_documents(
+                    loader_config, filename, file_content_type, file_path
+                )
+
+        self.set_progress(0.5)
+        return docs
+
+    def stats(self) -> dict:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            counts = dict(
+                conn.execute("SELECT status, COUNT(*) FROM job GROUP BY status")
+            )
+            completed, duration = conn.execute(
+                "SELECT COUNT(*), AVG(finished_at - started_at) FROM job "
+                "WHERE status = 'completed' AND finished_at >= ?",
+                (now - 60,),
+            ).fetchone()
+        return {
+            "workers": self.workers,
+            "parse_processes": self.parse_processes,
+            "jobs": counts,
+            "completed_last_minute": completed,
+            "average_duration_seconds": round(duration, 3) if duration else None,
+        }
+
+
+INGESTION_QUEUE = IngestionQueue(
+    RAG_INGESTION_QUEUE_PATH, RAG_INGESTION_WORKERS, RAG_INGESTION_PARSE_PROCESSES
+)
@@ -0,0 +1,204 @@
+"""
+Ingestion throughput of a generated document corpus, processed one file after
+the other (as process_file did inside a BackgroundTask) and through the
+ingestion queue with its worker threads and parse processes.
+
+    python -m open_webui.retrieval.ingest_benchmark --files 500 --workers 4
+
+Files are parsed with the default loaders and split like process_file does.
+Embedding is simulated with a fixed latency per batch, so the numbers do not
+depend on an embedding server. The corpus, queue and vector store are created
+in a temporary directory and removed afterwards.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+WORDS = (
+    "the queue worker embeds every chunk of the document before it is written "
+    "to the vector store while parsing runs in a separate process so that slow "
+    "files do not block uploads of other users and reindexing stays resumable"
+).split()
+
+
+def generate_corpus(path: str, files: int, paragraphs: int) -> list[tuple]:
+    rng = random.Random(0)
+    corpus = []
+    for idx in range(files):
+        text = [
+            " ".join(rng.choices(WORDS, k=rng.randint(40, 120)))
+            for _ in range(paragraphs)
+        ]
+        if idx % 2:
+            filename, content_type = f"doc-{idx}.html", "text/html"
+            body = "".join(f"<p>{paragraph}</p>" for paragraph in text)
+            content = f"<html><body><h1>Document {idx}</h1>{body}</body></html>"
+        else:
+            filename, content_type = f"doc-{idx}.md", "text/markdown"
+            content = f"# Document {idx}\n\n" + "\n\n".join(text)
+
+        file_path = os.path.join(path, filename)
+        with open(file_path, "w") as f:
+            f.write(content)
+        corpus.append((filename, content_type, file_path))
+    return corpus
+
+
+class Pipeline:
+    """Split, embed and insert step shared by both runs."""
+
+    def __init__(self, client, dim: int, batch_size: int, embed_latency: float):
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        self.client = client
+        self.dim = dim
+        self.batch_size = batch_size
+        self.embed_latency = embed_latency
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000, chunk_overlap=100, add_start_index=True
+        )
+        self.chunks = 0
+        self._lock = threading.Lock()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            time.sleep(self.embed_latency)
+            vectors.append(np.random.standard_normal((len(batch), self.dim)))
+        return np.concatenate(vectors).astype(np.float32)
+
+    def __call__(self, filename: str, docs: list):
+        chunks = self.splitter.split_documents(docs)
+        vectors = self.embed([chunk.page_content for chunk in chunks])
+        self.client.insert(
+            "benchmark",
+            [
+                {
+                    "id": f"{filename}-{idx}",
+                    "text": chunk.page_content,
+                    "vector": vector.tolist(),
+                    "metadata": {"name": filename},
+                }
+                for idx, (chunk, vector) in enumerate(zip(chunks, vectors))
+            ],
+        )
+        with self._lock:
+            self.chunks += len(chunks)
+
+
+def report(name: str, files: int, pipeline: Pipeline, duration: float):
+    print(
+        f"{name:<28} {duration:7.2f}s  {files / duration:8.1f} files/s  "
+        f"{pipeline.chunks / duration:9.1f} chunks/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--paragraphs", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--parse-processes", type=int, default=2)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--embed-batch-size", type=int, default=32)
+    parser.add_argument(
+        "--embed-latency", type=float, default=20, help="milliseconds per batch"
+    )
+    args = parser.parse_args()
+
+    from open_webui.retrieval.ingest import IngestionQueue
+    from open_webui.retrieval.loaders.main import load_documents
+    from open_webui.retrieval.vector.dbs.hnsw import HNSWClient
+
+    # Markdown and HTML files go to the built-in loaders, the external loader
+    # is never called
+    loader_config = {
+        "engine": "external",
+        "EXTERNAL_DOCUMENT_LOADER_URL": "http://localhost",
+        "EXTERNAL_DOCUMENT_LOADER_API_KEY": "benchmark",
+    }
+
+    with tempfile.TemporaryDirectory() as path:
+        os.makedirs(f"{path}/corpus")
+        corpus = generate_corpus(f"{path}/corpus", args.files, args.paragraphs)
+        size = sum(os.path.getsize(item[2]) for item in corpus)
+        print(
+            f"{args.files} files ({size / 1024 / 1024:.1f} MiB), "
+            f"embedding {args.embed_latency:g}ms per {args.embed_batch_size} chunks"
+        )
+
+        pipeline = Pipeline(
+            HNSWClient(f"{path}/sequential"),
+            args.dim,
+            args.embed_batch_size,
+            args.embed_latency / 1000,
+        )
+        start = time.perf_counter()
+        for filename, content_type, file_path in corpus:
+            pipeline(
+                filename,
+                load_documents(loader_config, filename, content_type, file_path),
+            )
+        report("sequential", args.files, pipeline, time.perf_counter() - start)
+
+        queue = IngestionQueue(
+            f"{path}/queue.sqlite3", args.workers, args.parse_processes
+        )
+        pipeline = Pipeline(
+            HNSWClient(f"{path}/queue"),
+            args.dim,
+            args.embed_batch_size,
+            args.embed_latency / 1000,
+        )
+
+        def handler(request, job, user):
+            filename, content_type, file_path = job.payload["file"]
+            pipeline(
+                filename,
+                queue.load_documents(loader_config, filename, content_type, file_path),
+            )
+
+        queue.register("benchmark", handler)
+        queue.start(None)
+        # Spawn the parse processes and import the loaders outside of the
+        # measurement
+        if args.parse_processes > 0:
+            pool = queue._get_parse_pool()
+            futures = [
+                pool.submit(load_documents, loader_config, *corpus[0])
+                for _ in range(args.parse_processes)
+            ]
+            for future in futures:
+                future.result()
+
+        start = time.perf_counter()
+        for item in corpus:
+            queue.enqueue("benchmark", {"file": item})
+        while True:
+            jobs = queue.stats()["jobs"]
+            if not jobs.get("pending") and not jobs.get("running"):
+                break
+            time.sleep(0.05)
+        duration = time.perf_counter() - start
+        queue.stop()
+
+        report(
+            f"queue ({args.workers}w, {args.parse_processes}p)",
+            args.files,
+            pipeline,
+            duration,
+        )
+        failed = jobs.get("failed", 0)
+        if failed:
+            print(f"{failed} jobs failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -171,3 +171,10 @@ class Loader:
                 loader = TextLoader(file_path, autodetect_encoding=True)
 
         return loader
+
+
+def load_documents(
+    loader_config: dict, filename: str, file_content_type: str, file_path: str
+) -> list[Document]:
+    """Picklable entry point so files can be parsed in a separate process."""
+    return Loader(**loader_config).load(filename, file_content_type, file_path)
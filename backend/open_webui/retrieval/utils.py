@@ -1,20 +1,24 @@
+import asyncio
 import logging
 import os
 from typing import Optional, Union
 
-import requests
 import hashlib
 from concurrent.futures import ThreadPoolExecutor
 import time
 
-from urllib.parse import quote
 from huggingface_hub import snapshot_download
 from langchain.retrievers import ContextualCompressionRetriever, EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
 
 from open_webui.config import VECTOR_DB
-from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.vector.factory import (
+    VECTOR_DB_CLIENT,
+    ASYNC_VECTOR_DB_CLIENT,
+)
+from open_webui.retrieval.bm25 import BM25_INDEX
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
+from open_webui.retrieval.embedding_client import EmbeddingClient
 
 from open_webui.models.users import UserModel
 from open_webui.models.files import Files
@@ -28,7 +32,6 @@ from open_webui.utils.access_control import has_access
 from open_webui.env import (
     SRC_LOG_LEVELS,
     OFFLINE_MODE,
-    ENABLE_FORWARD_USER_INFO_HEADERS,
 )
 from open_webui.config import (
     RAG_EMBEDDING_QUERY_PREFIX,
@@ -50,6 +53,7 @@ class VectorSearchRetriever(BaseRetriever):
     collection_name: Any
     embedding_function: Any
     top_k: int
+    filter: Optional[dict] = None
 
     def _get_relevant_documents(
         self,
@@ -61,6 +65,7 @@ class VectorSearchRetriever(BaseRetriever):
             collection_name=self.collection_name,
             vectors=[self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)],
             limit=self.top_k,
+            filter=self.filter,
         )
 
         ids = result.ids[0]
@@ -78,8 +83,58 @@ class VectorSearchRetriever(BaseRetriever):
         return results
 
 
+class BM25IndexRetriever(BaseRetriever):
+    collection_name: Any
+    top_k: int
+    filter: Optional[dict] = None
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        result = BM25_INDEX.search(
+            collection_name=self.collection_name,
+            query=query,
+            limit=self.top_k,
+            filter=self.filter,
+        )
+        if result is None:
+            return []
+
+        return [
+            Document(metadata=metadata, page_content=document)
+            for document, metadata in zip(result.documents[0], result.metadatas[0])
+        ]
+
+
+def get_bm25_index(collection_name: str) -> bool:
+    """
+    Make sure the keyword index of a collection exists, building it from the
+    vector DB once for collections created before the index was introduced.
+    Returns False if the collection could not be read.
+    """
+    if BM25_INDEX.has_collection(collection_name):
+        return True
+
+    log.info(f"get_bm25_index:building index for {collection_name}")
+    try:
+        result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+    except Exception as e:
+        log.exception(f"Failed to fetch collection {collection_name}: {e}")
+        return False
+
+    BM25_INDEX.build(collection_name, result)
+    return True
+
+
 def query_doc(
-    collection_name: str, query_embedding: list[float], k: int, user: UserModel = None
+    collection_name: str,
+    query_embedding: list[float],
+    k: int,
+    user: UserModel = None,
+    filter: Optional[dict] = None,
 ):
     try:
         log.debug(f"query_doc:doc {collection_name}")
@@ -87,6 +142,7 @@ def query_doc(
             collection_name=collection_name,
             vectors=[query_embedding],
             limit=k,
+            filter=filter,
         )
 
         if result:
@@ -114,7 +170,6 @@ def get_doc(collection_name: str, user: UserModel = None):
 
 def query_doc_with_hybrid_search(
     collection_name: str,
-    collection_result: GetResult,
     query: str,
     embedding_function,
     k: int,
@@ -122,25 +177,28 @@ def query_doc_with_hybrid_search(
     k_reranker: int,
     r: float,
     hybrid_bm25_weight: float,
+    filter: Optional[dict] = None,
 ) -> dict:
     try:
-        if not collection_result.documents[0]:
-            log.warning(f"query_doc_with_hybrid_search:no_docs {collection_name}")
-            return {"documents": [], "metadatas": [], "distances": []}
-
         # BM_25 required only if weight is greater than 0
         if hybrid_bm25_weight > 0:
+            # An empty collection just yields no keyword matches
+            if not get_bm25_index(collection_name):
+                log.warning(f"query_doc_with_hybrid_search:no_docs {collection_name}")
+                return {"documents": [], "metadatas": [], "distances": []}
+
             log.debug(f"query_doc_with_hybrid_search:doc {collection_name}")
-            bm25_retriever = BM25Retriever.from_texts(
-                texts=collection_result.documents[0],
-                metadatas=collection_result.metadatas[0],
+            bm25_retriever = BM25IndexRetriever(
+                collection_name=collection_name,
+                top_k=k,
+                filter=filter,
             )
-            bm25_retriever.k = k
 
         vector_search_retriever = VectorSearchRetriever(
             collection_name=collection_name,
             embedding_function=embedding_function,
             top_k=k,
+            filter=filter,
         )
 
         if hybrid_bm25_weight <= 0:
@@ -276,54 +334,50 @@ def get_all_items_from_collections(collection_names: list[str]) -> dict:
     return merge_get_results(results)
 
 
-def query_collection(
+async def query_collection(
     collection_names: list[str],
     queries: list[str],
     embedding_function,
     k: int,
+    filter: Optional[dict] = None,
 ) -> dict:
     results = []
-    error = False
 
-    def process_query_collection(collection_name, query_embedding):
-        try:
-            if collection_name:
-                result = query_doc(
-                    collection_name=collection_name,
-                    k=k,
-                    query_embedding=query_embedding,
-                )
-                if result is not None:
-                    return result.model_dump(), None
-            return None, None
-        except Exception as e:
-            log.exception(f"Error when querying the collection: {e}")
-            return None, e
-
-    # Generate all query embeddings (in one call)
-    query_embeddings = embedding_function(queries, prefix=RAG_EMBEDDING_QUERY_PREFIX)
+    # Generate all query embeddings (in one call), off the event loop as the
+    # embedding function may run a local model
+    query_embeddings = await asyncio.to_thread(
+        embedding_function, queries, prefix=RAG_EMBEDDING_QUERY_PREFIX
+    )
     log.debug(
         f"query_collection: processing {len(queries)} queries across {len(collection_names)} collections"
     )
 
-    with ThreadPoolExecutor() as executor:
-        future_results = []
-        for query_embedding in query_embeddings:
-            for collection_name in collection_names:
-                result = executor.submit(
-                    process_query_collection, collection_name, query_embedding
-                )
-                future_results.append(result)
-        task_results = [future.result() for future in future_results]
+    # One request per collection carrying every query vector, the collections
+    # searched concurrently on the shared vector DB thread pool
+    search_results = await ASYNC_VECTOR_DB_CLIENT.search_collections(
+        collection_names=[name for name in collection_names if name],
+        vectors=query_embeddings,
+        limit=k,
+        filter=filter,
+    )
 
-    for result, err in task_results:
-        if err is not None:
-            error = True
-        elif result is not None:
-            results.append(result)
+    for result in search_results:
+        if result is None:
+            continue
+        for ids, distances, documents, metadatas in zip(
+            result.ids, result.distances, result.documents, result.metadatas
+        ):
+            results.append(
+                {
+                    "ids": [ids],
+                    "distances": [distances],
+                    "documents": [documents],
+                    "metadatas": [metadatas],
+                }
+            )
 
-    if error and not results:
-        log.warning("All collection queries failed. No results returned.")
+    if not results:
+        log.debug("query_collection: no results returned by any collection")
 
     return merge_and_sort_query_results(results, k=k)
 
@@ -337,28 +391,17 @@ def query_collection_with_hybrid_search(
     k_reranker: int,
     r: float,
     hybrid_bm25_weight: float,
+    filter: Optional[dict] = None,
 ) -> dict:
     results = []
     error = False
-    # Fetch collection data once per collection sequentially
-    # Avoid fetching the same data multiple times later
-    collection_results = {}
-    # Only retrieve entire collection if bm_25 calculation is required
-    if hybrid_bm25_weight > 0:
-        for collection_name in collection_names:
-            try:
-                log.debug(
-                    f"query_collection_with_hybrid_search:VECTOR_DB_CLIENT.get:collection {collection_name}"
-                )
-                collection_results[collection_name] = VECTOR_DB_CLIENT.get(
-                    collection_name=collection_name
-                )
-            except Exception as e:
-                log.exception(f"Failed to fetch collection {collection_name}: {e}")
-                collection_results[collection_name] = None
-    else:
-        for collection_name in collection_names:
-            collection_results[collection_name] = []
+    # Make sure the keyword index of every collection exists before fanning out,
+    # so legacy collections are indexed once rather than once per query
+    collection_ready = {}
+    for collection_name in collection_names:
+        collection_ready[collection_name] = (
+            get_bm25_index(collection_name) if hybrid_bm25_weight > 0 else True
+        )
     log.info(
         f"Starting hybrid search for {len(queries)} queries in {len(collection_names)} collections..."
     )
@@ -367,7 +410,6 @@ def query_collection_with_hybrid_search(
         try:
             result = query_doc_with_hybrid_search(
                 collection_name=collection_name,
-                collection_result=collection_results[collection_name],
                 query=query,
                 embedding_function=embedding_function,
                 k=k,
@@ -375,6 +417,7 @@ def query_collection_with_hybrid_search(
                 k_reranker=k_reranker,
                 r=r,
                 hybrid_bm25_weight=hybrid_bm25_weight,
+                filter=filter,
             )
             return result, None
         except Exception as e:
@@ -382,12 +425,9 @@ def query_collection_with_hybrid_search(
             return None, e
 
     # Prepare tasks for all collections and queries
-    # Avoid running any tasks for collections that failed to fetch data (have assigned None)
+    # Avoid running any tasks for collections that failed to fetch data
     tasks = [
-        (cn, q)
-        for cn in collection_names
-        if collection_results[cn] is not None
-        for q in queries
+        (cn, q) for cn in collection_names if collection_ready[cn] for q in queries
     ]
 
     with ThreadPoolExecutor() as executor:
@@ -417,41 +457,37 @@ def get_embedding_function(
     embedding_batch_size,
 ):
     if embedding_engine == "":
-        return lambda query, prefix=None, user=None: embedding_function.encode(
+        func = lambda query, prefix=None, user=None: embedding_function.encode(
             query, **({"prompt": prefix} if prefix else {})
         ).tolist()
     elif embedding_engine in ["ollama", "openai"]:
-        func = lambda query, prefix=None, user=None: generate_embeddings(
-            engine=embedding_engine,
-            model=embedding_model,
-            text=query,
-            prefix=prefix,
-            url=url,
-            key=key,
-            user=user,
+        # One client per configuration, so its batches share the concurrency
+        # limit and the adapted batch size
+        client = EmbeddingClient(
+            embedding_engine, embedding_model, url, key, embedding_batch_size
         )
 
-        def generate_multiple(query, prefix, user, func):
-            if isinstance(query, list):
-                embeddings = []
-                for i in range(0, len(query), embedding_batch_size):
-                    embeddings.extend(
-                        func(
-                            query[i : i + embedding_batch_size],
-                            prefix=prefix,
-                            user=user,
-                        )
-                    )
-                return embeddings
-            else:
-                return func(query, prefix, user)
+        def func(query, prefix=None, user=None):
+            texts = query if isinstance(query, list) else [query]
+            if prefix is not None and RAG_EMBEDDING_PREFIX_FIELD_NAME is None:
+                texts = [f"{prefix}{text}" for text in texts]
 
-        return lambda query, prefix=None, user=None: generate_multiple(
-            query, prefix, user, func
-        )
+            embeddings = client.embed_sync(texts, prefix=prefix, user=user)
+            return embeddings if isinstance(query, list) else embeddings[0]
     else:
         raise ValueError(f"Unknown embedding engine: {embedding_engine}")
 
+    if EMBEDDING_CACHE is None:
+        return func
+
+    return lambda query, prefix=None, user=None: EMBEDDING_CACHE.embed(
+        engine=embedding_engine,
+        model=embedding_model,
+        text=query,
+        prefix=prefix,
+        compute=lambda texts: func(texts, prefix=prefix, user=user),
+    )
+
 
 def get_reranking_function(reranking_engine, reranking_model, reranking_function):
     if reranking_function is None:
@@ -464,7 +500,7 @@ def get_reranking_function(reranking_engine, reranking_model, reranking_function
         return lambda sentences, user=None: reranking_function.predict(sentences)
 
 
-def get_sources_from_items(
+async def get_sources_from_items(
     request,
     items,
     queries,
@@ -637,12 +673,16 @@ def get_sources_from_items(
 
             try:
                 if full_context:
-                    query_result = get_all_items_from_collections(collection_names)
+                    query_result = await asyncio.to_thread(
+                        get_all_items_from_collections, collection_names
+                    )
                 else:
                     query_result = None  # Initialize to None
                     if hybrid_search:
                         try:
-                            query_result = query_collection_with_hybrid_search(
+                            # Reranking and keyword search are CPU bound
+                            query_result = await asyncio.to_thread(
+                                query_collection_with_hybrid_search,
                                 collection_names=collection_names,
                                 queries=queries,
                                 embedding_function=embedding_function,
@@ -659,7 +699,7 @@ def get_sources_from_items(
 
                     # fallback to non-hybrid search
                     if not hybrid_search and query_result is None:
-                        query_result = query_collection(
+                        query_result = await query_collection(
                             collection_names=collection_names,
                             queries=queries,
                             embedding_function=embedding_function,
@@ -748,42 +788,13 @@ def generate_openai_batch_embeddings(
         log.debug(
             f"generate_openai_batch_embeddings:model {model} batch size: {len(texts)}"
         )
-        json_data = {"input": texts, "model": model}
-        if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
-            json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
-
-        r = requests.post(
-            f"{url}/embeddings",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {key}",
-                **(
-                    {
-                        "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
-                        "X-OpenWebUI-User-Id": user.id,
-                        "X-OpenWebUI-User-Email": user.email,
-                        "X-OpenWebUI-User-Role": user.role,
-                    }
-                    if ENABLE_FORWARD_USER_INFO_HEADERS and user
-                    else {}
-                ),
-            },
-            json=json_data,
-        )
-        r.raise_for_status()
-        data = r.json()
-        if "data" in data:
-            return [elem["embedding"] for elem in data["data"]]
-        else:
-            raise "Something went wrong :/"
+        client = EmbeddingClient("openai", model, url, key, len(texts))
+        return client.embed_sync(texts, prefix=prefix, user=user)
     except Exception as e:
         log.exception(f"Error generating openai batch embeddings: {e}")
         return None
 
 
-
-
-
 def generate_ollama_batch_embeddings(
     model: str,
     texts: list[str],
@@ -796,35 +807,8 @@ def generate_ollama_batch_embeddings(
         log.debug(
             f"generate_ollama_batch_embeddings:model {model} batch size: {len(texts)}"
         )
-        json_data = {"input": texts, "model": model}
-        if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
-            json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
-
-        r = requests.post(
-            f"{url}/api/embed",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {key}",
-                **(
-                    {
-                        "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
-                        "X-OpenWebUI-User-Id": user.id,
-                        "X-OpenWebUI-User-Email": user.email,
-                        "X-OpenWebUI-User-Role": user.role,
-                    }
-                    if ENABLE_FORWARD_USER_INFO_HEADERS
-                    else {}
-                ),
-            },
-            json=json_data,
-        )
-        r.raise_for_status()
-        data = r.json()
-
-        if "embeddings" in data:
-            return data["embeddings"]
-        else:
-            raise "Something went wrong :/"
+        client = EmbeddingClient("ollama", model, url, key, len(texts))
+        return client.embed_sync(texts, prefix=prefix, user=user)
     except Exception as e:
         log.exception(f"Error generating ollama batch embeddings: {e}")
         return None
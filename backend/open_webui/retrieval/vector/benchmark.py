@@ -0,0 +1,125 @@
+"""
+Recall and latency of the embedded HNSW backend against Chroma on the same
+random corpus, with exact cosine search as ground truth.
+
+    python -m open_webui.retrieval.vector.benchmark --items 20000 --dim 384
+
+Both stores are created in a temporary directory and removed afterwards.
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+
+def exact_search(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+
+
+def recall(found: list[list[str]], truth: np.ndarray) -> float:
+    hits = sum(
+        len({int(i) for i in row} & set(truth_row.tolist()))
+        for row, truth_row in zip(found, truth)
+    )
+    return hits / truth.size
+
+
+def measure(search, queries: np.ndarray) -> tuple[list[list[str]], list[float]]:
+    found, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        ids = search(query.tolist())
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(ids)
+    return found, latencies
+
+
+def report(name: str, build: float, found, latencies, truth):
+    print(
+        f"{name:<22} build {build:7.2f}s  recall@{truth.shape[1]} "
+        f"{recall(found, truth):.4f}  p50 {np.percentile(latencies, 50):6.2f}ms  "
+        f"p95 {np.percentile(latencies, 95):6.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--ef", type=int, nargs="+", default=[50, 100, 200])
+    args = parser.parse_args()
+
+    import chromadb
+    from chromadb import Settings
+
+    from open_webui.retrieval.vector.dbs.hnsw import HNSWClient
+
+    rng = np.random.default_rng(0)
+    # Clustered rather than uniform, closer to real embeddings
+    centers = rng.standard_normal((max(args.items // 100, 1), args.dim))
+    corpus = (
+        centers[rng.integers(0, len(centers), args.items)]
+        + 0.5 * rng.standard_normal((args.items, args.dim))
+    ).astype(np.float32)
+    queries = (
+        centers[rng.integers(0, len(centers), args.queries)]
+        + 0.5 * rng.standard_normal((args.queries, args.dim))
+    ).astype(np.float32)
+    truth = exact_search(corpus, queries, args.k)
+
+    batches = [
+        [
+            {"id": str(i), "text": "", "vector": corpus[i].tolist(), "metadata": {}}
+            for i in range(start, min(start + args.batch_size, args.items))
+        ]
+        for start in range(0, args.items, args.batch_size)
+    ]
+    print(f"{args.items} items, dim {args.dim}, {args.queries} queries, k={args.k}")
+
+    with tempfile.TemporaryDirectory() as path:
+        client = HNSWClient(f"{path}/hnsw")
+        start = time.perf_counter()
+        for batch in batches:
+            client.upsert("benchmark", batch)
+        build = time.perf_counter() - start
+
+        for ef in args.ef:
+            client.ef_search = ef
+            found, latencies = measure(
+                lambda q: client.search("benchmark", [q], args.k).ids[0],
+                queries,
+            )
+            report(f"hnsw (ef={ef})", build, found, latencies, truth)
+
+        chroma = chromadb.PersistentClient(
+            path=f"{path}/chroma",
+            settings=Settings(anonymized_telemetry=False, allow_reset=True),
+        )
+        collection = chroma.create_collection(
+            name="benchmark", metadata={"hnsw:space": "cosine"}
+        )
+        start = time.perf_counter()
+        for batch in batches:
+            collection.add(
+                ids=[item["id"] for item in batch],
+                embeddings=[item["vector"] for item in batch],
+            )
+        build = time.perf_counter() - start
+
+        def search(query):
+            result = collection.query(query_embeddings=[query], n_results=args.k)
+            return result["ids"][0]
+
+        found, latencies = measure(search, queries)
+        report("chroma", build, found, latencies, truth)
+
+
+if __name__ == "__main__":
+    main()
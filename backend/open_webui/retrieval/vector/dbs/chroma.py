@@ -1,9 +1,13 @@
 import chromadb
 import logging
+import threading
+import time
 from chromadb import Settings
+from chromadb.api.models.Collection import Collection
+from chromadb.errors import InvalidCollectionException, NotFoundError
 from chromadb.utils.batch_utils import create_batches
 
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from open_webui.retrieval.vector.main import (
     VectorDBBase,
@@ -23,12 +27,24 @@ from open_webui.config import (
     CHROMA_DATABASE,
     CHROMA_CLIENT_AUTH_PROVIDER,
     CHROMA_CLIENT_AUTH_CREDENTIALS,
+    VECTOR_DB_BATCH_SIZE,
+    VECTOR_DB_COLLECTION_CACHE_TTL,
 )
 from open_webui.env import SRC_LOG_LEVELS
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["RAG"])
 
+# Collection handles kept in memory at most
+COLLECTION_CACHE_MAX_SIZE = 10000
+
+
+class CollectionInfo:
+    def __init__(self, collection: Collection):
+        self.collection = collection
+        self.dimension: Optional[int] = collection.get_model().dimension
+        self.cached_at = time.monotonic()
+
 
 class ChromaClient(VectorDBBase):
     def __init__(self):
@@ -61,42 +77,130 @@ class ChromaClient(VectorDBBase):
                 database=CHROMA_DATABASE,
             )
 
+        # Collection handles by name, so lookups in the hot path need no
+        # round-trip to Chroma
+        self._collections: dict[str, CollectionInfo] = {}
+        self._collections_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _get_batch_size(self) -> int:
+        # Chroma rejects calls larger than its own maximum batch size
+        return min(VECTOR_DB_BATCH_SIZE, self.client.get_max_batch_size())
+
+    def _get_collection_info(
+        self, collection_name: str, create: bool = False
+    ) -> CollectionInfo:
+        # Raises if the collection does not exist and `create` is not set.
+        with self._collections_lock:
+            info = self._collections.get(collection_name)
+            if (
+                info is not None
+                and time.monotonic() - info.cached_at < VECTOR_DB_COLLECTION_CACHE_TTL
+            ):
+                self._hits += 1
+                return info
+            self._misses += 1
+
+        if create:
+            collection = self.client.get_or_create_collection(
+                name=collection_name, metadata={"hnsw:space": "cosine"}
+            )
+        else:
+            collection = self.client.get_collection(name=collection_name)
+
+        info = CollectionInfo(collection)
+        with self._collections_lock:
+            self._collections.pop(collection_name, None)
+            if len(self._collections) >= COLLECTION_CACHE_MAX_SIZE:
+                self._collections.pop(next(iter(self._collections)))
+            self._collections[collection_name] = info
+        return info
+
+    def _evict(self, collection_name: Optional[str] = None):
+        with self._collections_lock:
+            if collection_name is None:
+                self._collections.clear()
+            else:
+                self._collections.pop(collection_name, None)
+
+    def _with_collection(
+        self,
+        collection_name: str,
+        func: Callable[[CollectionInfo], Any],
+        create: bool = False,
+    ):
+        info = self._get_collection_info(collection_name, create=create)
+        try:
+            return func(info)
+        except (InvalidCollectionException, NotFoundError):
+            # The cached handle may belong to a collection another worker has
+            # deleted, and possibly created again since
+            self._evict(collection_name)
+            return func(self._get_collection_info(collection_name, create=create))
+
+    def stats(self) -> dict:
+        with self._collections_lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._collections),
+                "max_size": COLLECTION_CACHE_MAX_SIZE,
+                "ttl": VECTOR_DB_COLLECTION_CACHE_TTL,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
     def has_collection(self, collection_name: str) -> bool:
         # Check if the collection exists based on the collection name.
-        collection_names = self.client.list_collections()
-        return collection_name in collection_names
+        # Answered from the cache within its TTL; a handle that outlived a
+        # collection deleted by another worker is evicted by the operation
+        # that fails on it (see _with_collection)
+        try:
+            self._get_collection_info(collection_name)
+            return True
+        except (InvalidCollectionException, NotFoundError, ValueError):
+            return False
 
     def delete_collection(self, collection_name: str):
         # Delete the collection based on the collection name.
+        self._evict(collection_name)
         return self.client.delete_collection(name=collection_name)
 
     def search(
-        self, collection_name: str, vectors: list[list[float | int]], limit: int
+        self,
+        collection_name: str,
+        vectors: list[list[float | int]],
+        limit: int,
+        filter: Optional[dict] = None,
     ) -> Optional[SearchResult]:
         # Search for the nearest neighbor items based on the vectors and return 'limit' number of results.
-        try:
-            collection = self.client.get_collection(name=collection_name)
-            if collection:
-                result = collection.query(
-                    query_embeddings=vectors,
-                    n_results=limit,
-                )
+        # The filter is applied by Chroma before the nearest neighbors are ranked.
+        def search_collection(info: CollectionInfo) -> SearchResult:
+            result = info.collection.query(
+                query_embeddings=vectors,
+                n_results=limit,
+                where=filter or None,
+            )
 
-                # chromadb has cosine distance, 2 (worst) -> 0 (best). Re-odering to 0 -> 1
-                # https://docs.trychroma.com/docs/collections/configure cosine equation
-                distances: list = result["distances"][0]
-                distances = [2 - dist for dist in distances]
-                distances = [[dist / 2 for dist in distances]]
-
-                return SearchResult(
-                    **{
-                        "ids": result["ids"],
-                        "distances": distances,
-                        "documents": result["documents"],
-                        "metadatas": result["metadatas"],
-                    }
-                )
-            return None
+            # chromadb has cosine distance, 2 (worst) -> 0 (best). Re-odering to 0 -> 1
+            # https://docs.trychroma.com/docs/collections/configure cosine equation
+            # One row per query vector
+            distances = [
+                [(2 - dist) / 2 for dist in row] for row in result["distances"]
+            ]
+
+            return SearchResult(
+                **{
+                    "ids": result["ids"],
+                    "distances": distances,
+                    "documents": result["documents"],
+                    "metadatas": result["metadatas"],
+                }
+            )
+
+        try:
+            return self._with_collection(collection_name, search_collection)
         except Exception as e:
             return None
 
@@ -104,30 +208,29 @@ class ChromaClient(VectorDBBase):
         self, collection_name: str, filter: dict, limit: Optional[int] = None
     ) -> Optional[GetResult]:
         # Query the items from the collection based on the filter.
-        try:
-            collection = self.client.get_collection(name=collection_name)
-            if collection:
-                result = collection.get(
-                    where=filter,
-                    limit=limit,
-                )
+        def query_collection(info: CollectionInfo) -> GetResult:
+            result = info.collection.get(
+                where=filter,
+                limit=limit,
+            )
 
-                return GetResult(
-                    **{
-                        "ids": [result["ids"]],
-                        "documents": [result["documents"]],
-                        "metadatas": [result["metadatas"]],
-                    }
-                )
-            return None
+            return GetResult(
+                **{
+                    "ids": [result["ids"]],
+                    "documents": [result["documents"]],
+                    "metadatas": [result["metadatas"]],
+                }
+            )
+
+        try:
+            return self._with_collection(collection_name, query_collection)
         except:
             return None
 
     def get(self, collection_name: str) -> Optional[GetResult]:
         # Get all the items in the collection.
-        collection = self.client.get_collection(name=collection_name)
-        if collection:
-            result = collection.get()
+        def get_collection(info: CollectionInfo) -> GetResult:
+            result = info.collection.get()
             return GetResult(
                 **{
                     "ids": [result["ids"]],
@@ -135,42 +238,66 @@ class ChromaClient(VectorDBBase):
                     "metadatas": [result["metadatas"]],
                 }
             )
-        return None
+
+        return self._with_collection(collection_name, get_collection)
+
+    def _check_dimension(
+        self, collection_name: str, info: CollectionInfo, embeddings: list
+    ):
+        # Fail before the round-trip when the embedding model has changed
+        # since the collection was created
+        if not embeddings:
+            return
+        dimension = len(embeddings[0])
+        if info.dimension is not None and info.dimension != dimension:
+            raise ValueError(
+                f"Collection {collection_name} expects embeddings of dimension "
+                f"{info.dimension}, got {dimension}"
+            )
 
     def insert(self, collection_name: str, items: list[VectorItem]):
         # Insert the items into the collection, if the collection does not exist, it will be created.
-        collection = self.client.get_or_create_collection(
-            name=collection_name, metadata={"hnsw:space": "cosine"}
-        )
-
         ids = [item["id"] for item in items]
         documents = [item["text"] for item in items]
         embeddings = [item["vector"] for item in items]
         metadatas = [stringify_metadata(item["metadata"]) for item in items]
 
-        for batch in create_batches(
-            api=self.client,
-            documents=documents,
-            embeddings=embeddings,
-            ids=ids,
-            metadatas=metadatas,
-        ):
-            collection.add(*batch)
+        def insert_items(info: CollectionInfo):
+            self._check_dimension(collection_name, info, embeddings)
+            for batch in create_batches(
+                api=self.client,
+                documents=documents,
+                embeddings=embeddings,
+                ids=ids,
+                metadatas=metadatas,
+            ):
+                info.collection.add(*batch)
+            if embeddings:
+                info.dimension = len(embeddings[0])
+
+        self._with_collection(collection_name, insert_items, create=True)
 
     def upsert(self, collection_name: str, items: list[VectorItem]):
         # Update the items in the collection, if the items are not present, insert them. If the collection does not exist, it will be created.
-        collection = self.client.get_or_create_collection(
-            name=collection_name, metadata={"hnsw:space": "cosine"}
-        )
-
         ids = [item["id"] for item in items]
         documents = [item["text"] for item in items]
         embeddings = [item["vector"] for item in items]
         metadatas = [stringify_metadata(item["metadata"]) for item in items]
 
-        collection.upsert(
-            ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas
-        )
+        def upsert_items(info: CollectionInfo):
+            self._check_dimension(collection_name, info, embeddings)
+            batch_size = self._get_batch_size()
+            for i in range(0, len(ids), batch_size):
+                info.collection.upsert(
+                    ids=ids[i : i + batch_size],
+                    documents=documents[i : i + batch_size],
+                    embeddings=embeddings[i : i + batch_size],
+                    metadatas=metadatas[i : i + batch_size],
+                )
+            if embeddings:
+                info.dimension = len(embeddings[0])
+
+        self._with_collection(collection_name, upsert_items, create=True)
 
     def delete(
         self,
@@ -179,13 +306,16 @@ class ChromaClient(VectorDBBase):
         filter: Optional[dict] = None,
     ):
         # Delete the items from the collection based on the ids.
+        def delete_items(info: CollectionInfo):
+            if ids:
+                batch_size = self._get_batch_size()
+                for i in range(0, len(ids), batch_size):
+                    info.collection.delete(ids=ids[i : i + batch_size])
+            elif filter:
+                info.collection.delete(where=filter)
+
         try:
-            collection = self.client.get_collection(name=collection_name)
-            if collection:
-                if ids:
-                    collection.delete(ids=ids)
-                elif filter:
-                    collection.delete(where=filter)
+            self._with_collection(collection_name, delete_items)
         except Exception as e:
             # If collection doesn't exist, that's fine - nothing to delete
             log.debug(
@@ -195,4 +325,5 @@ class ChromaClient(VectorDBBase):
 
     def reset(self):
         # Resets the database. This will delete all collections and item entries.
+        self._evict()
         return self.client.reset()
@@ -0,0 +1,664 @@
+import atexit
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+import hnswlib
+import numpy as np
+
+from open_webui.retrieval.vector.main import (
+    VectorDBBase,
+    VectorItem,
+    SearchResult,
+    GetResult,
+)
+from open_webui.retrieval.vector.utils import (
+    stringify_metadata,
+    metadata_column,
+    where_to_sql,
+)
+
+from open_webui.config import (
+    HNSW_DATA_PATH,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HNSW_SAVE_INTERVAL,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+# Rows of the vector file and slots of the index allocated at once
+MIN_CAPACITY = 1024
+
+# Metadata keys the callers filter on, indexed in every collection
+INDEXED_METADATA_KEYS = ["file_id", "hash"]
+
+# Filtered searches matching at most this many items scan them exactly
+EXACT_SEARCH_MAX_ITEMS = 10000
+
+# Versions kept in the change log, a process further behind rebuilds its index
+CHANGELOG_VERSIONS = 1000
+
+
+class HNSWCollection:
+    """
+    One collection on disk, in its own directory:
+
+    - `items.sqlite3`: ids, documents and metadata, keyed by the integer label
+      of the item in the index, plus the labels freed by deletes.
+    - `vectors.f32`: the vectors as a memory-mapped float32 array, row `label`
+      holding the vector of that item. The index is updated or rebuilt from it
+      when it is older than the items.
+    - `index.bin`: the hnswlib index (cosine space).
+
+    Every write bumps a version stored in SQLite and logs the labels it added
+    or deleted under that version. A process that finds a newer version than
+    its own applies the logged changes to its index, so several workers can
+    share a data directory; the index is only rebuilt when the changes it
+    missed were pruned from the log.
+    """
+
+    def __init__(self, path: str, dim: Optional[int] = None):
+        self.path = path
+        self.lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        self.db = sqlite3.connect(
+            os.path.join(path, "items.sqlite3"),
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                label INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                text TEXT,
+                metadata TEXT
+            );
+            CREATE TABLE IF NOT EXISTS free_labels (label INTEGER PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS changes (
+                version INTEGER NOT NULL,
+                label INTEGER NOT NULL,
+                deleted INTEGER NOT NULL,
+                PRIMARY KEY (version, label)
+            );
+            """
+        )
+        for key in INDEXED_METADATA_KEYS:
+            self.db.execute(
+                f"CREATE INDEX IF NOT EXISTS items_{key} ON items ({metadata_column(key)})"
+            )
+
+        self.dim = self._get_meta("dim", int)
+        if self.dim is None:
+            if dim is None:
+                raise ValueError(f"Collection at {path} has no vectors")
+            self.dim = dim
+            self.db.execute("BEGIN IMMEDIATE")
+            for key, value in (
+                ("dim", dim),
+                ("m", HNSW_M),
+                ("ef_construction", HNSW_EF_CONSTRUCTION),
+                ("next_label", 0),
+                ("version", 0),
+                ("pruned_version", 0),
+            ):
+                self.db.execute(
+                    "INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)",
+                    (key, str(value)),
+                )
+            self.db.execute("COMMIT")
+            self.dim = self._get_meta("dim", int)
+
+        # Changes made before the log existed are unknown
+        self.db.execute(
+            "INSERT OR IGNORE INTO meta (key, value) "
+            "SELECT 'pruned_version', value FROM meta WHERE key = 'version'"
+        )
+
+        self.m = self._get_meta("m", int)
+        self.ef_construction = self._get_meta("ef_construction", int)
+
+        self.vectors: Optional[np.memmap] = None
+        self.index: Optional[hnswlib.Index] = None
+        self.version = -1
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        self._load()
+
+    def _get_meta(self, key: str, cast=str) -> Any:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return cast(row[0]) if row else None
+
+    def _set_meta(self, key: str, value: Any):
+        self.db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, str(value)),
+        )
+
+    def _open_vectors(self, rows: int):
+        vectors_path = os.path.join(self.path, "vectors.f32")
+        size = max(rows, MIN_CAPACITY) * self.dim * 4
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+        if not os.path.exists(vectors_path) or os.path.getsize(vectors_path) < size:
+            with open(vectors_path, "ab") as f:
+                f.truncate(size)
+        capacity = os.path.getsize(vectors_path) // (self.dim * 4)
+        self.vectors = np.memmap(
+            vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim)
+        )
+
+    def _load(self):
+        version = self._get_meta("version", int)
+        next_label = self._get_meta("next_label", int)
+        self._open_vectors(next_label)
+
+        index_path = os.path.join(self.path, "index.bin")
+        indexed_version = self._get_meta("indexed_version", int)
+        self.index = hnswlib.Index(space="cosine", dim=self.dim)
+        if (
+            os.path.exists(index_path)
+            and indexed_version is not None
+            and self._get_meta("pruned_version", int) <= indexed_version <= version
+        ):
+            self.index.load_index(
+                index_path, max_elements=max(next_label, MIN_CAPACITY)
+            )
+            self.dirty = False
+            # Catch up with the writes made after the index was saved
+            self.version = indexed_version
+            self._apply_changes(version)
+            return
+
+        labels = np.array(
+            [row[0] for row in self.db.execute("SELECT label FROM items")],
+            dtype=np.int64,
+        )
+        if len(labels):
+            log.info(f"Rebuilding HNSW index at {self.path} ({len(labels)} items)")
+        self.index.init_index(
+            max_elements=max(len(labels) * 2, next_label, MIN_CAPACITY),
+            M=self.m,
+            ef_construction=self.ef_construction,
+        )
+        if len(labels):
+            self.index.add_items(self.vectors[labels], labels)
+        self.dirty = True
+        self.version = version
+
+    def _apply_changes(self, version: int):
+        # Replay the logged changes after our version, the last one of a label wins
+        changes = dict(
+            self.db.execute(
+                "SELECT label, deleted FROM changes "
+                "WHERE version > ? AND version <= ? ORDER BY version",
+                (self.version, version),
+            ).fetchall()
+        )
+
+        next_label = self._get_meta("next_label", int)
+        if next_label > len(self.vectors):
+            self._open_vectors(next_label)
+        if next_label > self.index.get_max_elements():
+            self.index.resize_index(max(next_label, self.index.get_max_elements() * 2))
+
+        added = np.array(
+            sorted(label for label, deleted in changes.items() if not deleted),
+            dtype=np.int64,
+        )
+        if len(added):
+            self.index.add_items(self.vectors[added], added)
+        for label, deleted in changes.items():
+            if deleted:
+                try:
+                    self.index.mark_deleted(label)
+                except RuntimeError:
+                    # Never added to this index, or already deleted
+                    pass
+
+        if changes:
+            self.dirty = True
+        self.version = version
+
+    def sync(self):
+        # Pick up the writes of other processes
+        version = self._get_meta("version", int)
+        if version == self.version:
+            return
+        if (
+            self.version < self._get_meta("pruned_version", int)
+            or version < self.version
+        ):
+            self._load()
+        else:
+            self._apply_changes(version)
+
+    def _reserve(self, count: int):
+        # Make room for `count` more items in the vector file and the index
+        needed = self._get_meta("next_label", int) + count
+        if needed > len(self.vectors):
+            self._open_vectors(max(needed, len(self.vectors) * 2))
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(max(needed, self.index.get_max_elements() * 2))
+
+    def _bump_version(self, labels: list[int], deleted: bool = False):
+        self.version = self._get_meta("version", int) + 1
+        self._set_meta("version", self.version)
+        self.db.executemany(
+            "INSERT OR REPLACE INTO changes (version, label, deleted) VALUES (?, ?, ?)",
+            [(self.version, label, int(deleted)) for label in labels],
+        )
+
+        pruned_version = self.version - CHANGELOG_VERSIONS
+        if pruned_version > self._get_meta("pruned_version", int):
+            self.db.execute("DELETE FROM changes WHERE version <= ?", (pruned_version,))
+            self._set_meta("pruned_version", pruned_version)
+        self.dirty = True
+
+    def upsert(self, items: list[VectorItem]):
+        vectors = np.asarray([item["vector"] for item in items], dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Expected vectors of dimension {self.dim}, got {vectors.shape[-1]}"
+            )
+
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.sync()
+                self._reserve(len(items))
+                next_label = self._get_meta("next_label", int)
+                labels = []
+                for item in items:
+                    row = self.db.execute(
+                        "SELECT label FROM items WHERE id = ?", (item["id"],)
+                    ).fetchone()
+                    if row is None:
+                        row = self.db.execute(
+                            "SELECT label FROM free_labels LIMIT 1"
+                        ).fetchone()
+                        if row is not None:
+                            self.db.execute(
+                                "DELETE FROM free_labels WHERE label = ?", row
+                            )
+                    if row is None:
+                        row = (next_label,)
+                        next_label += 1
+                    labels.append(row[0])
+
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO items (label, id, text, metadata) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (
+                            label,
+                            item["id"],
+                            item["text"],
+                            json.dumps(stringify_metadata(item["metadata"] or {})),
+                        )
+                        for label, item in zip(labels, items)
+                    ],
+                )
+                self._set_meta("next_label", next_label)
+
+                self.vectors[labels] = vectors
+                self.vectors.flush()
+                self._bump_version(labels)
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+
+            # Existing and reused labels are updated in place, and a label
+            # deleted earlier is unmarked when added again
+            self.index.add_items(vectors, np.array(labels, dtype=np.int64))
+            self.save(force=False)
+
+    def delete(self, ids: Optional[list[str]] = None, filter: Optional[dict] = None):
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.sync()
+                if ids:
+                    labels = []
+                    for i in range(0, len(ids), 500):
+                        chunk = ids[i : i + 500]
+                        placeholders = ", ".join("?" for _ in chunk)
+                        labels.extend(
+                            row[0]
+                            for row in self.db.execute(
+                                f"SELECT label FROM items WHERE id IN ({placeholders})",
+                                chunk,
+                            )
+                        )
+                else:
+                    labels = self._get_labels(filter).tolist()
+
+                if not labels:
+                    self.db.execute("ROLLBACK")
+                    return
+
+                self.db.executemany(
+                    "DELETE FROM items WHERE label = ?", [(label,) for label in labels]
+                )
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO free_labels (label) VALUES (?)",
+                    [(label,) for label in labels],
+                )
+                self._bump_version(labels, deleted=True)
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+
+            for label in labels:
+                try:
+                    self.index.mark_deleted(label)
+                except RuntimeError:
+                    # Already deleted
+                    pass
+            self.save(force=False)
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def _get_rows(self, labels: list[int]) -> dict[int, tuple]:
+        placeholders = ", ".join("?" for _ in labels)
+        return {
+            row[0]: row[1:]
+            for row in self.db.execute(
+                f"SELECT label, id, text, metadata FROM items "
+                f"WHERE label IN ({placeholders})",
+                labels,
+            )
+        }
+
+    def _get_labels(self, filter: Optional[dict] = None) -> np.ndarray:
+        condition, params = where_to_sql(filter)
+        return np.array(
+            [
+                row[0]
+                for row in self.db.execute(
+                    f"SELECT label FROM items WHERE {condition}", params
+                )
+            ],
+            dtype=np.int64,
+        )
+
+    def _exact_search(self, queries: np.ndarray, labels: np.ndarray, k: int) -> tuple:
+        vectors = self.vectors[labels]
+        vectors = vectors / np.maximum(
+            np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12
+        )
+        queries = queries / np.maximum(
+            np.linalg.norm(queries, axis=1, keepdims=True), 1e-12
+        )
+        distances = 1 - queries @ vectors.T
+        order = np.argsort(distances, axis=1)[:, :k]
+        return labels[order], np.take_along_axis(distances, order, axis=1)
+
+    def search(
+        self,
+        vectors: list[list[float | int]],
+        limit: int,
+        ef: int = HNSW_EF_SEARCH,
+        filter: Optional[dict] = None,
+    ) -> SearchResult:
+        with self.lock:
+            self.sync()
+            allowed = self._get_labels(filter) if filter else None
+            k = min(limit, self.count() if allowed is None else len(allowed))
+            if k <= 0:
+                return SearchResult(
+                    ids=[[] for _ in vectors],
+                    documents=[[] for _ in vectors],
+                    metadatas=[[] for _ in vectors],
+                    distances=[[] for _ in vectors],
+                )
+
+            queries = np.asarray(vectors, dtype=np.float32)
+            if allowed is not None and len(allowed) <= EXACT_SEARCH_MAX_ITEMS:
+                # A scan of a few thousand vectors is cheaper than walking the
+                # graph past everything the filter rejects
+                labels, distances = self._exact_search(queries, allowed, k)
+            else:
+                allowed_set = None if allowed is None else set(allowed.tolist())
+                self.index.set_ef(max(ef, k))
+                try:
+                    labels, distances = self.index.knn_query(
+                        queries,
+                        k=k,
+                        filter=(
+                            allowed_set.__contains__
+                            if allowed_set is not None
+                            else None
+                        ),
+                    )
+                except RuntimeError:
+                    # With many deleted or filtered out items the graph may
+                    # reach fewer than k
+                    labels, distances = self._exact_search(
+                        queries,
+                        allowed if allowed is not None else self._get_labels(),
+                        k,
+                    )
+            rows = self._get_rows(sorted({int(label) for label in labels.flat}))
+
+        ids, documents, metadatas, scores = [], [], [], []
+        for row_labels, row_distances in zip(labels, distances):
+            hits = [
+                (rows[int(label)], float(distance))
+                for label, distance in zip(row_labels, row_distances)
+                if int(label) in rows
+            ]
+            ids.append([row[0] for row, _ in hits])
+            documents.append([row[1] for row, _ in hits])
+            metadatas.append([json.loads(row[2]) for row, _ in hits])
+            # Same scale as the Chroma backend: cosine distance 2 (worst) ->
+            # 0 (best) mapped to a score 0 -> 1
+            scores.append([(2 - distance) / 2 for _, distance in hits])
+
+        return SearchResult(
+            ids=ids, documents=documents, metadatas=metadatas, distances=scores
+        )
+
+    def get(self, filter: Optional[dict] = None, limit: Optional[int] = None):
+        condition, params = where_to_sql(filter)
+        sql = f"SELECT id, text, metadata FROM items WHERE {condition} ORDER BY label"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = [*params, limit]
+
+        with self.lock:
+            rows = self.db.execute(sql, params).fetchall()
+        return GetResult(
+            ids=[[row[0] for row in rows]],
+            documents=[[row[1] for row in rows]],
+            metadatas=[[json.loads(row[2]) for row in rows]],
+        )
+
+    def save(self, force: bool = True):
+        with self.lock:
+            if not self.dirty or self.index is None:
+                return
+            if not force and time.monotonic() - self.saved_at < HNSW_SAVE_INTERVAL:
+                return
+
+            index_path = os.path.join(self.path, "index.bin")
+            self.index.save_index(index_path + ".tmp")
+            os.replace(index_path + ".tmp", index_path)
+            self._set_meta("indexed_version", self.version)
+            self.dirty = False
+            self.saved_at = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self.vectors = None
+            self.index = None
+            self.db.close()
+
+
+class HNSWClient(VectorDBBase):
+    """
+    Embedded vector store: an hnswlib index per collection over memory-mapped
+    vectors, with ids, documents and metadata in a SQLite sidecar. Nothing
+    runs outside the process; see `HNSWCollection` for the on-disk layout.
+
+    The graph parameters HNSW_M and HNSW_EF_CONSTRUCTION apply to collections
+    created afterwards; `ef_search` (HNSW_EF_SEARCH) applies to every search.
+    """
+
+    def __init__(self, path: str = HNSW_DATA_PATH, ef_search: int = HNSW_EF_SEARCH):
+        self.path = path
+        self.ef_search = ef_search
+        self.collections: dict[str, HNSWCollection] = {}
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        atexit.register(self.save)
+
+    def _get_path(self, collection_name: str) -> str:
+        if not COLLECTION_NAME_PATTERN.match(collection_name):
+            raise ValueError(f"Invalid collection name: {collection_name}")
+        return os.path.join(self.path, collection_name)
+
+    def _get_collection(
+        self, collection_name: str, dim: Optional[int] = None
+    ) -> Optional[HNSWCollection]:
+        with self.lock:
+            collection = self.collections.get(collection_name)
+            if collection is not None and os.path.exists(collection.path):
+                return collection
+            if collection is not None:
+                # Deleted by another process
+                collection.close()
+                del self.collections[collection_name]
+
+            path = self._get_path(collection_name)
+            if dim is None and not os.path.exists(os.path.join(path, "items.sqlite3")):
+                return None
+
+            collection = HNSWCollection(path, dim)
+            self.collections[collection_name] = collection
+            return collection
+
+    def has_collection(self, collection_name: str) -> bool:
+        # Check if the collection exists based on the collection name.
+        if not COLLECTION_NAME_PATTERN.match(collection_name):
+            return False
+        return os.path.exists(os.path.join(self.path, collection_name, "items.sqlite3"))
+
+    def delete_collection(self, collection_name: str):
+        # Delete the collection based on the collection name.
+        with self.lock:
+            collection = self.collections.pop(collection_name, None)
+            if collection is not None:
+                collection.close()
+            path = self._get_path(collection_name)
+            if os.path.exists(path):
+                shutil.rmtree(path)
+
+    def search(
+        self,
+        collection_name: str,
+        vectors: list[list[float | int]],
+        limit: int,
+        filter: Optional[dict] = None,
+    ) -> Optional[SearchResult]:
+        # Search for the nearest neighbor items based on the vectors and return 'limit' number of results.
+        try:
+            collection = self._get_collection(collection_name)
+            if collection:
+                return collection.search(vectors, limit, self.ef_search, filter)
+            return None
+        except Exception as e:
+            log.exception(f"Error searching collection {collection_name}: {e}")
+            return None
+
+    def query(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        # Query the items from the collection based on the filter.
+        try:
+            collection = self._get_collection(collection_name)
+            if collection:
+                return collection.get(filter=filter, limit=limit)
+            return None
+        except Exception as e:
+            log.exception(f"Error querying collection {collection_name}: {e}")
+            return None
+
+    def get(self, collection_name: str) -> Optional[GetResult]:
+        # Get all the items in the collection.
+        collection = self._get_collection(collection_name)
+        if collection:
+            return collection.get()
+        return None
+
+    def insert(self, collection_name: str, items: list[VectorItem]):
+        # Insert the items into the collection, if the collection does not exist, it will be created.
+        self.upsert(collection_name, items)
+
+    def upsert(self, collection_name: str, items: list[VectorItem]):
+        # Update the items in the collection, if the items are not present, insert them. If the collection does not exist, it will be created.
+        if not items:
+            return
+        collection = self._get_collection(collection_name, dim=len(items[0]["vector"]))
+        collection.upsert(items)
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        # Delete the items from the collection based on the ids or the filter.
+        collection = self._get_collection(collection_name)
+        if collection is None:
+            log.debug(
+                f"Attempted to delete from non-existent collection {collection_name}. Ignoring."
+            )
+            return
+        if ids:
+            collection.delete(ids=ids)
+        elif filter:
+            collection.delete(filter=filter)
+
+    def save(self):
+        # Save the indexes changed since their last save.
+        with self.lock:
+            collections = list(self.collections.values())
+        for collection in collections:
+            try:
+                collection.save()
+            except Exception as e:
+                log.warning(f"Error saving HNSW index at {collection.path}: {e}")
+
+    def reset(self):
+        # Resets the database. This will delete all collections and item entries.
+        with self.lock:
+            for collection in self.collections.values():
+                collection.close()
+            self.collections = {}
+            for name in os.listdir(self.path):
+                path = os.path.join(self.path, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
@@ -1,6 +1,10 @@
-from open_webui.retrieval.vector.main import VectorDBBase
+from open_webui.retrieval.vector.main import (
+    VectorDBBase,
+    AsyncVectorDBBase,
+    AsyncVectorDBAdapter,
+)
 from open_webui.retrieval.vector.type import VectorType
-from open_webui.config import VECTOR_DB
+from open_webui.config import VECTOR_DB, VECTOR_DB_BATCH_SIZE, VECTOR_DB_MAX_WORKERS
 
 
 class Vector:
@@ -15,6 +19,23 @@ class Vector:
                 from open_webui.retrieval.vector.dbs.chroma import ChromaClient
 
                 return ChromaClient()
+            case VectorType.HNSW:
+                from open_webui.retrieval.vector.dbs.hnsw import HNSWClient
+
+                return HNSWClient()
            
 
+    @staticmethod
+    def get_async_vector(client: VectorDBBase) -> AsyncVectorDBBase:
+        """
+        get the async interface of a vector db instance
+        """
+        if isinstance(client, AsyncVectorDBBase):
+            return client
+        return AsyncVectorDBAdapter(
+            client, max_workers=VECTOR_DB_MAX_WORKERS, batch_size=VECTOR_DB_BATCH_SIZE
+        )
+
+
 VECTOR_DB_CLIENT = Vector.get_vector(VECTOR_DB)
+ASYNC_VECTOR_DB_CLIENT = Vector.get_async_vector(VECTOR_DB_CLIENT)
@@ -1,7 +1,17 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 from pydantic import BaseModel
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional, Union
 
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
 
 class VectorItem(BaseModel):
     id: str
@@ -53,9 +63,16 @@ class VectorDBBase(ABC):
 
     @abstractmethod
     def search(
-        self, collection_name: str, vectors: List[List[Union[float, int]]], limit: int
+        self,
+        collection_name: str,
+        vectors: List[List[Union[float, int]]],
+        limit: int,
+        filter: Optional[Dict] = None,
     ) -> Optional[SearchResult]:
-        """Search for similar vectors in a collection."""
+        """
+        Search for similar vectors in a collection, optionally only among the
+        items whose metadata matches `filter` (Chroma `where` syntax).
+        """
         pass
 
     @abstractmethod
@@ -84,3 +101,176 @@ class VectorDBBase(ABC):
     def reset(self) -> None:
         """Reset the vector database by removing all collections or those matching a condition."""
         pass
+
+    def stats(self) -> Optional[Dict]:
+        """Statistics of the client's collection cache, if it keeps one."""
+        return None
+
+
+class AsyncVectorDBBase(ABC):
+    """
+    Asynchronous counterpart of `VectorDBBase` for use from async code.
+
+    Backends with a native async client implement it directly; synchronous
+    backends are wrapped with `AsyncVectorDBAdapter`. Upserts and deletes by
+    id are sent in batches of `batch_size` items, and `search_collections`
+    searches several collections in one call.
+    """
+
+    batch_size: int = 1000
+
+    @abstractmethod
+    async def has_collection(self, collection_name: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def delete_collection(self, collection_name: str) -> None:
+        pass
+
+    @abstractmethod
+    async def insert(self, collection_name: str, items: List[VectorItem]) -> None:
+        pass
+
+    @abstractmethod
+    async def upsert(self, collection_name: str, items: List[VectorItem]) -> None:
+        pass
+
+    @abstractmethod
+    async def search(
+        self,
+        collection_name: str,
+        vectors: List[List[Union[float, int]]],
+        limit: int,
+        filter: Optional[Dict] = None,
+    ) -> Optional[SearchResult]:
+        pass
+
+    async def search_collections(
+        self,
+        collection_names: List[str],
+        vectors: List[List[Union[float, int]]],
+        limit: int,
+        filter: Optional[Dict] = None,
+    ) -> List[Optional[SearchResult]]:
+        """
+        Search every collection concurrently, all vectors in one request per
+        collection, among the items matching `filter` if one is given. Returns
+        one result per collection (None if it could not be searched) with a
+        row per vector.
+        """
+
+        async def search_collection(collection_name: str) -> Optional[SearchResult]:
+            try:
+                return await self.search(collection_name, vectors, limit, filter)
+            except Exception as e:
+                log.exception(f"Error searching collection {collection_name}: {e}")
+                return None
+
+        return await asyncio.gather(
+            *[
+                search_collection(collection_name)
+                for collection_name in collection_names
+            ]
+        )
+
+    @abstractmethod
+    async def query(
+        self, collection_name: str, filter: Dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        pass
+
+    @abstractmethod
+    async def get(self, collection_name: str) -> Optional[GetResult]:
+        pass
+
+    @abstractmethod
+    async def delete(
+        self,
+        collection_name: str,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict] = None,
+    ) -> None:
+        pass
+
+    @abstractmethod
+    async def reset(self) -> None:
+        pass
+
+
+class AsyncVectorDBAdapter(AsyncVectorDBBase):
+    """
+    `AsyncVectorDBBase` over a synchronous `VectorDBBase`.
+
+    Calls run on one thread pool shared by all callers instead of blocking the
+    event loop, so concurrent requests (and the searches of one
+    `search_collections` call) overlap.
+    """
+
+    def __init__(self, client: VectorDBBase, max_workers: int, batch_size: int):
+        self.client = client
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="vector-db"
+        )
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def has_collection(self, collection_name: str) -> bool:
+        return await self._run(self.client.has_collection, collection_name)
+
+    async def delete_collection(self, collection_name: str) -> None:
+        return await self._run(self.client.delete_collection, collection_name)
+
+    async def insert(self, collection_name: str, items: List[VectorItem]) -> None:
+        for i in range(0, len(items), self.batch_size):
+            await self._run(
+                self.client.insert, collection_name, items[i : i + self.batch_size]
+            )
+
+    async def upsert(self, collection_name: str, items: List[VectorItem]) -> None:
+        for i in range(0, len(items), self.batch_size):
+            await self._run(
+                self.client.upsert, collection_name, items[i : i + self.batch_size]
+            )
+
+    async def search(
+        self,
+        collection_name: str,
+        vectors: List[List[Union[float, int]]],
+        limit: int,
+        filter: Optional[Dict] = None,
+    ) -> Optional[SearchResult]:
+        return await self._run(
+            self.client.search, collection_name, vectors, limit, filter
+        )
+
+    async def query(
+        self, collection_name: str, filter: Dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        return await self._run(self.client.query, collection_name, filter, limit)
+
+    async def get(self, collection_name: str) -> Optional[GetResult]:
+        return await self._run(self.client.get, collection_name)
+
+    async def delete(
+        self,
+        collection_name: str,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict] = None,
+    ) -> None:
+        if ids:
+            for i in range(0, len(ids), self.batch_size):
+                await self._run(
+                    self.client.delete,
+                    collection_name,
+                    ids=ids[i : i + self.batch_size],
+                )
+        else:
+            await self._run(self.client.delete, collection_name, filter=filter)
+
+    async def reset(self) -> None:
+        return await self._run(self.client.reset)
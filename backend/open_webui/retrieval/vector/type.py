@@ -3,4 +3,4 @@ from enum import StrEnum
 
 class VectorType(StrEnum):
     CHROMA = "chroma"
-   
+    HNSW = "hnsw"
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 
 
 def stringify_metadata(
@@ -12,3 +13,75 @@ def stringify_metadata(
         ):
             metadata[key] = str(value)
     return metadata
+
+
+FILTER_OPERATORS = {
+    "$eq": "=",
+    "$ne": "!=",
+    "$gt": ">",
+    "$gte": ">=",
+    "$lt": "<",
+    "$lte": "<=",
+}
+
+
+def metadata_column(key: str) -> str:
+    # The JSON path is inlined rather than bound so that SQLite can match the
+    # expression against an index on it
+    path = '$."' + key.replace('"', '""') + '"'
+    return "json_extract(metadata, '" + path.replace("'", "''") + "')"
+
+
+def where_to_sql(where: Optional[dict]) -> tuple[str, list]:
+    """
+    Translate a Chroma style metadata filter into a SQL condition on the JSON
+    `metadata` column, returning the condition and its parameters.
+
+    Supports `{"key": value}`, the comparison operators `$eq`, `$ne`, `$gt`,
+    `$gte`, `$lt`, `$lte`, `$in` and `$nin`, and `$and` / `$or` lists. Several
+    keys in one dict must all match.
+    """
+    if not where:
+        return "1", []
+
+    conditions = []
+    params = []
+    for key, value in where.items():
+        if key in ("$and", "$or"):
+            parts = [where_to_sql(clause) for clause in value]
+            if not parts:
+                continue
+            joiner = " AND " if key == "$and" else " OR "
+            conditions.append("(" + joiner.join(part for part, _ in parts) + ")")
+            for _, part_params in parts:
+                params.extend(part_params)
+            continue
+
+        if key.startswith("$"):
+            raise ValueError(f"Unsupported filter operator: {key}")
+
+        column = metadata_column(key)
+
+        if isinstance(value, dict):
+            for op, operand in value.items():
+                if op in FILTER_OPERATORS:
+                    conditions.append(f"{column} {FILTER_OPERATORS[op]} ?")
+                    params.append(operand)
+                elif op in ("$in", "$nin"):
+                    operands = list(operand)
+                    if not operands:
+                        conditions.append("0" if op == "$in" else "1")
+                        continue
+                    placeholders = ", ".join("?" for _ in operands)
+                    negation = "NOT " if op == "$nin" else ""
+                    conditions.append(f"{column} {negation}IN ({placeholders})")
+                    params.extend(operands)
+                else:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+        else:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+
+    if not conditions:
+        return "1", []
+    return "(" + " AND ".join(conditions) + ")", params
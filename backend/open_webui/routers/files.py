@@ -1,5 +1,6 @@
 import logging
 import os
+import time
 import uuid
 import json
 from fnmatch import fnmatch
@@ -23,8 +24,15 @@ from fastapi import (
 
 from fastapi.responses import FileResponse, StreamingResponse
 from open_webui.constants import ERROR_MESSAGES
-from open_webui.env import SRC_LOG_LEVELS
-from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.env import SRC_LOG_LEVELS, SSE_HEARTBEAT_INTERVAL
+from open_webui.retrieval.vector.factory import ASYNC_VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import BM25_INDEX
+from open_webui.retrieval.ingest import (
+    INGESTION_QUEUE,
+    IngestionJob,
+    JobCancelled,
+    UPLOAD_JOB_PRIORITY,
+)
 
 from open_webui.models.users import Users
 from open_webui.models.files import (
@@ -40,6 +48,7 @@ from open_webui.routers.retrieval import ProcessFileForm, process_file
 # from open_webui.routers.audio import transcribe
 from open_webui.storage.provider import Storage
 from open_webui.utils.auth import get_admin_user, get_verified_user
+from open_webui.utils.events import EVENT_BUS, get_file_status_topic
 from pydantic import BaseModel
 
 log = logging.getLogger(__name__)
@@ -85,16 +94,18 @@ def has_access_to_file(
 ############################
 
 
-def process_uploaded_file(request, file, file_path, file_item, file_metadata, user):
+def process_uploaded_file(
+    request, content_type, file_path, file_item, file_metadata, user
+):
     try:
-        if file.content_type:
+        if content_type:
             stt_supported_content_types = getattr(
                 request.app.state.config, "STT_SUPPORTED_CONTENT_TYPES", []
             )
 
             if any(
-                fnmatch(file.content_type, content_type)
-                for content_type in (
+                fnmatch(content_type, supported_content_type)
+                for supported_content_type in (
                     stt_supported_content_types
                     if stt_supported_content_types
                     and any(t.strip() for t in stt_supported_content_types)
@@ -111,13 +122,13 @@ def process_uploaded_file(request, file, file_path, file_item, file_metadata, us
                     ),
                     user=user,
                 )
-            elif (not file.content_type.startswith(("image/", "video/"))) or (
+            elif (not content_type.startswith(("image/", "video/"))) or (
                 request.app.state.config.CONTENT_EXTRACTION_ENGINE == "external"
             ):
                 process_file(request, ProcessFileForm(file_id=file_item.id), user=user)
         else:
             log.info(
-                f"File type {file.content_type} is not provided, but trying to process anyway"
+                f"File type {content_type} is not provided, but trying to process anyway"
             )
             process_file(request, ProcessFileForm(file_id=file_item.id), user=user)
 
@@ -125,6 +136,12 @@ def process_uploaded_file(request, file, file_path, file_item, file_metadata, us
             file_item.id,
             {"status": "completed"},
         )
+    except JobCancelled:
+        Files.update_file_data_by_id(
+            file_item.id,
+            {"status": "failed", "error": "Processing was cancelled"},
+        )
+        raise
     except Exception as e:
         log.error(f"Error processing file: {file_item.id}")
         Files.update_file_data_by_id(
@@ -136,6 +153,39 @@ def process_uploaded_file(request, file, file_path, file_item, file_metadata, us
         )
 
 
+def process_uploaded_file_job(request, job: IngestionJob, user):
+    file_item = Files.get_file_by_id(job.payload["file_id"])
+    if file_item is None:
+        raise ValueError(f"File {job.payload['file_id']} not found")
+
+    process_uploaded_file(
+        request,
+        file_item.meta.get("content_type"),
+        file_item.path,
+        file_item,
+        job.payload.get("file_metadata", {}),
+        user,
+    )
+
+    # process_uploaded_file records failures on the file, surface them on the job
+    file_item = Files.get_file_by_id(file_item.id)
+    if file_item and file_item.data.get("status") == "failed":
+        raise Exception(file_item.data.get("error", "Failed to process file"))
+
+
+def cancel_uploaded_file_job(job: IngestionJob):
+    # The job never ran, so process_uploaded_file did not get to record it
+    Files.update_file_data_by_id(
+        job.payload["file_id"],
+        {"status": "failed", "error": "Processing was cancelled"},
+    )
+
+
+INGESTION_QUEUE.register(
+    "upload", process_uploaded_file_job, on_cancel=cancel_uploaded_file_job
+)
+
+
 @router.post("/", response_model=FileModelResponse)
 def upload_file(
     request: Request,
@@ -203,7 +253,7 @@ def upload_file_handler(
         id = str(uuid.uuid4())
         name = filename
         filename = f"{id}_{filename}"
-        contents, file_path = Storage.upload_file(
+        stored_file = Storage.upload_file(
             file.file,
             filename,
             {
@@ -219,15 +269,16 @@ def upload_file_handler(
             FileForm(
                 **{
                     "id": id,
+                    "hash": stored_file.sha256,
                     "filename": name,
-                    "path": file_path,
+                    "path": stored_file.path,
                     "data": {
                         **({"status": "pending"} if process else {}),
                     },
                     "meta": {
                         "name": name,
                         "content_type": file.content_type,
-                        "size": len(contents),
+                        "size": stored_file.size,
                         "data": file_metadata,
                     },
                 }
@@ -236,21 +287,18 @@ def upload_file_handler(
 
         if process:
             if background_tasks and process_in_background:
-                background_tasks.add_task(
-                    process_uploaded_file,
-                    request,
-                    file,
-                    file_path,
-                    file_item,
-                    file_metadata,
-                    user,
+                job = INGESTION_QUEUE.enqueue(
+                    "upload",
+                    {"file_id": file_item.id, "file_metadata": file_metadata},
+                    user_id=user.id,
+                    priority=UPLOAD_JOB_PRIORITY,
                 )
-                return {"status": True, **file_item.model_dump()}
+                return {"status": True, "job_id": job.id, **file_item.model_dump()}
             else:
                 process_uploaded_file(
                     request,
-                    file,
-                    file_path,
+                    file.content_type,
+                    stored_file.path,
                     file_item,
                     file_metadata,
                     user,
@@ -346,7 +394,8 @@ async def delete_all_files(user=Depends(get_admin_user)):
     if result:
         try:
             Storage.delete_all_files()
-            VECTOR_DB_CLIENT.reset()
+            await ASYNC_VECTOR_DB_CLIENT.reset()
+            BM25_INDEX.reset()
         except Exception as e:
             log.exception(e)
             log.error("Error deleting files")
@@ -390,6 +439,11 @@ async def get_file_by_id(id: str, user=Depends(get_verified_user)):
         )
 
 
+# Seconds between status reads of a streamed file status when the events of
+# other workers are not relayed over Redis
+FILE_STATUS_POLL_INTERVAL = 0.5
+
+
 @router.get("/{id}/process/status")
 async def get_file_process_status(
     id: str, stream: bool = Query(False), user=Depends(get_verified_user)
@@ -410,26 +464,63 @@ async def get_file_process_status(
         if stream:
             MAX_FILE_PROCESSING_DURATION = 3600 * 2
 
-            async def event_stream(file_item):
-                for _ in range(MAX_FILE_PROCESSING_DURATION):
-                    file_item = Files.get_file_by_id(file_item.id)
-                    if file_item:
-                        data = file_item.model_dump().get("data", {})
-                        status = data.get("status")
+            def get_status_event(file_id: str) -> Optional[dict]:
+                file_item = Files.get_file_by_id(file_id)
+                if not file_item:
+                    return None
 
-                        if status:
-                            event = {"status": status}
-                            if status == "failed":
-                                event["error"] = data.get("error")
+                data = file_item.data or {}
+                event = {"status": data.get("status")}
+                if not event["status"]:
+                    # Legacy
+                    return None
+                if event["status"] == "failed":
+                    event["error"] = data.get("error")
+                return event
 
+            async def event_stream(file_item):
+                # Subscribe before reading the current status so no transition
+                # is lost in between. Without Redis, events published by other
+                # workers never arrive here, so the status is also read again
+                # every FILE_STATUS_POLL_INTERVAL seconds.
+                poll_interval = None if EVENT_BUS.relayed else FILE_STATUS_POLL_INTERVAL
+                with EVENT_BUS.subscribe(get_file_status_topic(file_item.id)) as queue:
+                    event = get_status_event(file_item.id)
+                    if event is None:
+                        return
+
+                    deadline = time.monotonic() + MAX_FILE_PROCESSING_DURATION
+                    last_event = None
+                    last_sent = time.monotonic()
+                    while True:
+                        if event is not None and event != last_event:
                             yield f"data: {json.dumps(event)}\n\n"
-                            if status in ("completed", "failed"):
+                            last_event = event
+                            last_sent = time.monotonic()
+                            if event["status"] in ("completed", "failed"):
                                 break
-                        else:
-                            # Legacy
+
+                        now = time.monotonic()
+                        if now >= deadline:
                             break
+                        if now - last_sent >= SSE_HEARTBEAT_INTERVAL:
+                            yield ": heartbeat\n\n"
+                            last_sent = now
 
-                    await asyncio.sleep(0.5)
+                        timeout = (
+                            min(last_sent + SSE_HEARTBEAT_INTERVAL, deadline) - now
+                        )
+                        if poll_interval is not None:
+                            timeout = min(timeout, poll_interval)
+
+                        try:
+                            event = await asyncio.wait_for(queue.get(), timeout)
+                        except asyncio.TimeoutError:
+                            event = (
+                                get_status_event(file_item.id)
+                                if poll_interval is not None
+                                else None
+                            )
 
             return StreamingResponse(
                 event_stream(file),
@@ -723,7 +814,8 @@ async def delete_file_by_id(id: str, user=Depends(get_verified_user)):
         if result:
             try:
                 Storage.delete_file(file.path)
-                VECTOR_DB_CLIENT.delete(collection_name=f"file-{id}")
+                await ASYNC_VECTOR_DB_CLIENT.delete(collection_name=f"file-{id}")
+                BM25_INDEX.delete_collection(collection_name=f"file-{id}")
             except Exception as e:
                 log.exception(e)
                 log.error("Error deleting files")
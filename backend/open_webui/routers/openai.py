@@ -1,10 +1,10 @@
 import asyncio
+import hashlib
 import json
 import logging
 from typing import Optional
 
 import aiohttp
-from aiocache import cached
 from urllib.parse import quote
 
 from fastapi import Depends, HTTPException, Request, APIRouter
@@ -30,6 +30,8 @@ from open_webui.utils.payload import (
 )
 from open_webui.utils.misc import convert_logit_bias_input_to_json
 from open_webui.utils.auth import get_admin_user, get_verified_user
+from open_webui.utils.session_pool import get_session, cleanup_response
+from open_webui.utils.model_registry import ModelRegistry
 from open_webui.utils.access_control import has_access
 
 log = logging.getLogger(__name__)
@@ -49,43 +51,33 @@ async def send_get_request(url: str, key: Optional[str] = None, user: Optional[U
     """Generic GET helper to retrieve /models or other resources from external OpenAI-compatible endpoints."""
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            headers = {
-                **({"Authorization": f"Bearer {key}"} if key else {}),
-                **(
-                    {
-                        "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
-                        "X-OpenWebUI-User-Id": user.id,
-                        "X-OpenWebUI-User-Email": user.email,
-                        "X-OpenWebUI-User-Role": user.role,
-                    }
-                    if ENABLE_FORWARD_USER_INFO_HEADERS and user
-                    else {}
-                ),
-            }
-            async with session.get(url, headers=headers, ssl=AIOHTTP_CLIENT_SESSION_SSL) as response:
-                # Try to parse JSON; return None on parse/connection failure
-                try:
-                    return await response.json()
-                except Exception:
-                    text = await response.text()
-                    log.debug(f"send_get_request non-json response for {url}: {text}")
-                    return None
+        session = get_session()
+        headers = {
+            **({"Authorization": f"Bearer {key}"} if key else {}),
+            **(
+                {
+                    "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
+                    "X-OpenWebUI-User-Id": user.id,
+                    "X-OpenWebUI-User-Email": user.email,
+                    "X-OpenWebUI-User-Role": user.role,
+                }
+                if ENABLE_FORWARD_USER_INFO_HEADERS and user
+                else {}
+            ),
+        }
+        async with session.get(url, headers=headers, timeout=timeout, ssl=AIOHTTP_CLIENT_SESSION_SSL) as response:
+            # Try to parse JSON; return None on parse/connection failure
+            try:
+                return await response.json()
+            except Exception:
+                text = await response.text()
+                log.debug(f"send_get_request non-json response for {url}: {text}")
+                return None
     except Exception as e:
         log.error(f"Connection error for {url}: {e}")
         return None
 
 
-async def cleanup_response(
-    response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
-):
-    if response:
-        response.close()
-    if session:
-        await session.close()
-
-
 def openai_reasoning_model_handler(payload: dict) -> dict:
     """
     Handle reasoning-model-specific parameters.
@@ -178,14 +170,54 @@ async def get_filtered_models(models: dict, user: UserModel):
     return filtered_models
 
 
-@cached(ttl=MODELS_CACHE_TTL)
-async def get_all_models(request: Request, user: UserModel) -> dict:
+def get_models_cache_key(request: Request) -> str:
+    """Stable key of the model list: changes only with the connection settings."""
+    config = request.app.state.config
+    return hashlib.sha256(
+        json.dumps(
+            [
+                config.ENABLE_OPENAI_API,
+                config.OPENAI_API_BASE_URLS,
+                config.OPENAI_API_KEYS,
+                config.OPENAI_API_CONFIGS,
+            ],
+            sort_keys=True,
+            default=str,
+        ).encode()
+    ).hexdigest()
+
+
+# Last successful /models response per connection (url, key and config), so a
+# connection that is briefly down does not drop its models from the list
+LAST_MODELS_RESPONSES = {}
+
+
+def get_connection_key(request: Request, idx: int, url: str) -> str:
+    config = request.app.state.config
+    api_config = config.OPENAI_API_CONFIGS.get(str(idx), config.OPENAI_API_CONFIGS.get(url, {}))
+    keys = config.OPENAI_API_KEYS
+    return json.dumps([url, keys[idx] if idx < len(keys) else "", api_config], sort_keys=True, default=str)
+
+
+async def load_all_models(request: Request) -> dict:
     log.info("get_all_models()")
 
     if not request.app.state.config.ENABLE_OPENAI_API:
+        request.app.state.OPENAI_MODELS = {}
         return {"data": []}
 
-    responses = await get_all_models_responses(request, user=user)
+    # Shared by all users, so no user info is forwarded
+    responses = await get_all_models_responses(request, user=None)
+
+    # Isolate failures per connection: fall back to its last good response
+    for idx, url in enumerate(request.app.state.config.OPENAI_API_BASE_URLS[: len(responses)]):
+        connection_key = get_connection_key(request, idx, url)
+        response = responses[idx]
+        if response is not None and not (isinstance(response, dict) and "error" in response):
+            LAST_MODELS_RESPONSES[connection_key] = response
+        elif connection_key in LAST_MODELS_RESPONSES:
+            log.warning(f"Using last known models of {url}")
+            responses[idx] = LAST_MODELS_RESPONSES[connection_key]
 
     def extract_data(response):
         if response and isinstance(response, dict) and "data" in response:
@@ -226,6 +258,30 @@ async def get_all_models(request: Request, user: UserModel) -> dict:
     return models
 
 
+OPENAI_MODELS_REGISTRY = ModelRegistry("openai", load_all_models, get_models_cache_key, MODELS_CACHE_TTL)
+
+
+async def get_all_models(request: Request, user: UserModel = None, refresh: bool = False) -> dict:
+    """
+    Return the merged model list of all connections from memory.
+
+    The list is reloaded in the background once older than MODELS_CACHE_TTL and
+    synchronously only on first use or after the connection settings changed.
+    """
+    return await OPENAI_MODELS_REGISTRY.get(request, refresh=refresh)
+
+
+async def get_model(request: Request, model_id: str, user: UserModel = None) -> Optional[dict]:
+    """Resolve a model (and its urlIdx) without fanning out to the connections."""
+    await get_all_models(request, user=user)
+    model = (request.app.state.OPENAI_MODELS or {}).get(model_id)
+    if model is None and not OPENAI_MODELS_REGISTRY.is_fresh():
+        # The model may have been added upstream since the last load
+        await get_all_models(request, user=user, refresh=True)
+        model = request.app.state.OPENAI_MODELS.get(model_id)
+    return model
+
+
 ##########################################
 #
 # Routes: config, models, verify, chat, embeddings, proxy
@@ -310,55 +366,57 @@ async def get_models(
             models = {"data": api_config.get("model_ids", []) or [], "object": "list"}
         else:
             r = None
-            async with aiohttp.ClientSession(
-                trust_env=True,
-                timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST),
-            ) as session:
-                try:
-                    headers = {
-                        "Content-Type": "application/json",
-                        **(
-                            {
-                                "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
-                                "X-OpenWebUI-User-Id": user.id,
-                                "X-OpenWebUI-User-Email": user.email,
-                                "X-OpenWebUI-User-Role": user.role,
-                            }
-                            if ENABLE_FORWARD_USER_INFO_HEADERS
-                            else {}
-                        ),
-                        "Authorization": f"Bearer {key}",
-                    }
+            session = get_session()
+            try:
+                headers = {
+                    "Content-Type": "application/json",
+                    **(
+                        {
+                            "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
+                            "X-OpenWebUI-User-Id": user.id,
+                            "X-OpenWebUI-User-Email": user.email,
+                            "X-OpenWebUI-User-Role": user.role,
+                        }
+                        if ENABLE_FORWARD_USER_INFO_HEADERS
+                        else {}
+                    ),
+                    "Authorization": f"Bearer {key}",
+                }
+
+                async with session.get(
+                    f"{url}/models",
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST),
+                    ssl=AIOHTTP_CLIENT_SESSION_SSL,
+                ) as r:
+                    if r.status != 200:
+                        try:
+                            res = await r.json()
+                        except Exception:
+                            res = await r.text()
+                        error_detail = f"HTTP Error: {r.status} - {res}"
+                        raise Exception(error_detail)
 
-                    async with session.get(f"{url}/models", headers=headers, ssl=AIOHTTP_CLIENT_SESSION_SSL) as r:
-                        if r.status != 200:
-                            try:
-                                res = await r.json()
-                            except Exception:
-                                res = await r.text()
-                            error_detail = f"HTTP Error: {r.status} - {res}"
-                            raise Exception(error_detail)
-
-                        response_data = await r.json()
-
-                        # Filter out certain OpenAI internal models (legacy filtering)
-                        if "api.openai.com" in url:
-                            response_data["data"] = [
-                                model
-                                for model in response_data.get("data", [])
-                                if not any(
-                                    name in model.get("id", "")
-                                    for name in ["babbage", "dall-e", "davinci", "embedding", "tts", "whisper"]
-                                )
-                            ]
-
-                        models = response_data
-                except aiohttp.ClientError as e:
-                    log.exception(f"Client error fetching models from {url}: {str(e)}")
-                    raise HTTPException(status_code=500, detail="Open WebUI: Server Connection Error")
-                except Exception as e:
-                    log.exception(f"Unexpected error fetching models from {url}: {e}")
-                    raise HTTPException(status_code=500, detail=str(e))
+                    response_data = await r.json()
+
+                    # Filter out certain OpenAI internal models (legacy filtering)
+                    if "api.openai.com" in url:
+                        response_data["data"] = [
+                            model
+                            for model in response_data.get("data", [])
+                            if not any(
+                                name in model.get("id", "")
+                                for name in ["babbage", "dall-e", "davinci", "embedding", "tts", "whisper"]
+                            )
+                        ]
+
+                    models = response_data
+            except aiohttp.ClientError as e:
+                log.exception(f"Client error fetching models from {url}: {str(e)}")
+                raise HTTPException(status_code=500, detail="Open WebUI: Server Connection Error")
+            except Exception as e:
+                log.exception(f"Unexpected error fetching models from {url}: {e}")
+                raise HTTPException(status_code=500, detail=str(e))
 
     # Apply access control filtering for regular users unless bypass is enabled
     if user.role == "user" and not BYPASS_MODEL_ACCESS_CONTROL:
@@ -382,45 +440,48 @@ async def verify_connection(form_data: ConnectionVerificationForm, user=Depends(
     url = form_data.url
     key = form_data.key
 
-    async with aiohttp.ClientSession(
-        trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST)
-    ) as session:
-        try:
-            headers = {
-                "Content-Type": "application/json",
-                **(
-                    {
-                        "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
-                        "X-OpenWebUI-User-Id": user.id,
-                        "X-OpenWebUI-User-Email": user.email,
-                        "X-OpenWebUI-User-Role": user.role,
-                    }
-                    if ENABLE_FORWARD_USER_INFO_HEADERS
-                    else {}
-                ),
-                "Authorization": f"Bearer {key}",
-            }
+    session = get_session()
+    try:
+        headers = {
+            "Content-Type": "application/json",
+            **(
+                {
+                    "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
+                    "X-OpenWebUI-User-Id": user.id,
+                    "X-OpenWebUI-User-Email": user.email,
+                    "X-OpenWebUI-User-Role": user.role,
+                }
+                if ENABLE_FORWARD_USER_INFO_HEADERS
+                else {}
+            ),
+            "Authorization": f"Bearer {key}",
+        }
 
-            async with session.get(f"{url}/models", headers=headers, ssl=AIOHTTP_CLIENT_SESSION_SSL) as r:
-                try:
-                    response_data = await r.json()
-                except Exception:
-                    response_data = await r.text()
+        async with session.get(
+            f"{url}/models",
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST),
+            ssl=AIOHTTP_CLIENT_SESSION_SSL,
+        ) as r:
+            try:
+                response_data = await r.json()
+            except Exception:
+                response_data = await r.text()
 
-                if r.status != 200:
-                    if isinstance(response_data, (dict, list)):
-                        return JSONResponse(status_code=r.status, content=response_data)
-                    else:
-                        return PlainTextResponse(status_code=r.status, content=response_data)
+            if r.status != 200:
+                if isinstance(response_data, (dict, list)):
+                    return JSONResponse(status_code=r.status, content=response_data)
+                else:
+                    return PlainTextResponse(status_code=r.status, content=response_data)
 
-                return response_data
+            return response_data
 
-        except aiohttp.ClientError as e:
-            log.exception(f"Client error verifying connection to {url}: {str(e)}")
-            raise HTTPException(status_code=500, detail="Open WebUI: Server Connection Error")
-        except Exception as e:
-            log.exception(f"Unexpected error verifying connection to {url}: {e}")
-            raise HTTPException(status_code=500, detail="Open WebUI: Server Connection Error")
+    except aiohttp.ClientError as e:
+        log.exception(f"Client error verifying connection to {url}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Open WebUI: Server Connection Error")
+    except Exception as e:
+        log.exception(f"Unexpected error verifying connection to {url}: {e}")
+        raise HTTPException(status_code=500, detail="Open WebUI: Server Connection Error")
 
 
 def is_openai_reasoning_model(model: str) -> bool:
@@ -465,9 +526,7 @@ async def generate_chat_completion(
         if not bypass_filter and user.role != "admin":
             raise HTTPException(status_code=403, detail="Model not found")
 
-    # Ensure global model cache is populated
-    await get_all_models(request, user=user)
-    model = request.app.state.OPENAI_MODELS.get(model_id)
+    model = await get_model(request, model_id, user=user)
     if model:
         idx = model["urlIdx"]
     else:
@@ -536,16 +595,20 @@ async def generate_chat_completion(
     payload_body = json.dumps(payload)
 
     r = None
-    session = None
     streaming = False
     response = None
 
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
+        session = get_session()
 
-        r = await session.request(method="POST", url=request_url, data=payload_body, headers=headers, ssl=AIOHTTP_CLIENT_SESSION_SSL)
+        r = await session.request(
+            method="POST",
+            url=request_url,
+            data=payload_body,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
+            ssl=AIOHTTP_CLIENT_SESSION_SSL,
+        )
 
         # Streamed SSE handling
         content_type = r.headers.get("Content-Type", "")
@@ -555,7 +618,7 @@ async def generate_chat_completion(
                 r.content,
                 status_code=r.status,
                 headers=dict(r.headers),
-                background=BackgroundTask(cleanup_response, response=r, session=session),
+                background=BackgroundTask(cleanup_response, response=r),
             )
         else:
             try:
@@ -576,7 +639,7 @@ async def generate_chat_completion(
         raise HTTPException(status_code=r.status if r else 500, detail="Open WebUI: Server Connection Error")
     finally:
         if not streaming:
-            await cleanup_response(r, session)
+            await cleanup_response(r)
 
 
 @router.post("/embeddings")
@@ -589,20 +652,18 @@ async def embeddings(request: Request, form_data: dict, user=Depends(get_verifie
     body = json.dumps(form_data)
 
     # Resolve model -> backend idx if present
-    await get_all_models(request, user=user)
     model_id = form_data.get("model")
-    models = request.app.state.OPENAI_MODELS or {}
-    if model_id in models:
-        idx = models[model_id]["urlIdx"]
+    model = await get_model(request, model_id, user=user) if model_id else None
+    if model:
+        idx = model["urlIdx"]
 
     url = request.app.state.config.OPENAI_API_BASE_URLS[idx]
     key = request.app.state.config.OPENAI_API_KEYS[idx]
 
     r = None
-    session = None
     streaming = False
     try:
-        session = aiohttp.ClientSession(trust_env=True)
+        session = get_session()
         r = await session.request(
             method="POST",
             url=f"{url}/embeddings",
@@ -631,7 +692,7 @@ async def embeddings(request: Request, form_data: dict, user=Depends(get_verifie
                 r.content,
                 status_code=r.status,
                 headers=dict(r.headers),
-                background=BackgroundTask(cleanup_response, response=r, session=session),
+                background=BackgroundTask(cleanup_response, response=r),
             )
         else:
             try:
@@ -651,7 +712,7 @@ async def embeddings(request: Request, form_data: dict, user=Depends(get_verifie
         raise HTTPException(status_code=r.status if r else 500, detail="Open WebUI: Server Connection Error")
     finally:
         if not streaming:
-            await cleanup_response(r, session)
+            await cleanup_response(r)
 
 
 @router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
@@ -670,7 +731,6 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
     )
 
     r = None
-    session = None
     streaming = False
 
     try:
@@ -691,7 +751,7 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
 
         request_url = f"{url}/{path}"
 
-        session = aiohttp.ClientSession(trust_env=True)
+        session = get_session()
         r = await session.request(method=request.method, url=request_url, data=body, headers=headers, ssl=AIOHTTP_CLIENT_SESSION_SSL)
 
         content_type = r.headers.get("Content-Type", "")
@@ -701,7 +761,7 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
                 r.content,
                 status_code=r.status,
                 headers=dict(r.headers),
-                background=BackgroundTask(cleanup_response, response=r, session=session),
+                background=BackgroundTask(cleanup_response, response=r),
             )
         else:
             try:
@@ -722,4 +782,4 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
         raise HTTPException(status_code=r.status if r else 500, detail="Open WebUI: Server Connection Error")
     finally:
         if not streaming:
-            await cleanup_response(r, session)
+            await cleanup_response(r)
@@ -37,9 +37,15 @@ from open_webui.storage.provider import Storage
 
 
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import BM25_INDEX
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
+from open_webui.retrieval.ingest import (
+    INGESTION_QUEUE,
+    IngestionJob,
+    JobCancelled,
+)
 
 # Document loaders
-from open_webui.retrieval.loaders.main import Loader
 
 
 from open_webui.retrieval.utils import (
@@ -219,6 +225,29 @@ async def get_embedding_config(request: Request, user=Depends(get_admin_user)):
     }
 
 
+@router.get("/embedding/cache")
+async def get_embedding_cache_stats(user=Depends(get_admin_user)):
+    if EMBEDDING_CACHE is None:
+        return {"status": False}
+    return {"status": True, **EMBEDDING_CACHE.stats()}
+
+
+@router.post("/embedding/cache/reset")
+async def reset_embedding_cache(user=Depends(get_admin_user)):
+    if EMBEDDING_CACHE is None:
+        return {"status": False}
+    EMBEDDING_CACHE.clear()
+    return {"status": True}
+
+
+@router.get("/vector/cache")
+async def get_vector_db_cache_stats(user=Depends(get_admin_user)):
+    stats = VECTOR_DB_CLIENT.stats()
+    if stats is None:
+        return {"status": False}
+    return {"status": True, **stats}
+
+
 class OpenAIConfigForm(BaseModel):
     url: str
     key: str
@@ -953,17 +982,27 @@ def save_docs_to_vector_db(
     ]
 
     try:
+        # Whether the keyword index can be updated incrementally; collections
+        # written before the index existed are indexed in full on first search
+        update_bm25_index = True
+
         if VECTOR_DB_CLIENT.has_collection(collection_name=collection_name):
             log.info(f"collection {collection_name} already exists")
 
             if overwrite:
                 VECTOR_DB_CLIENT.delete_collection(collection_name=collection_name)
+                BM25_INDEX.delete_collection(collection_name=collection_name)
                 log.info(f"deleting existing collection {collection_name}")
             elif add is False:
                 log.info(
                     f"collection {collection_name} already exists, overwrite is False and add is False"
                 )
                 return True
+            else:
+                update_bm25_index = BM25_INDEX.has_collection(collection_name)
+        else:
+            # Drop any index left behind by a collection of the same name
+            BM25_INDEX.delete_collection(collection_name=collection_name)
 
         log.info(f"adding to collection {collection_name}")
         embedding_function = get_embedding_function(
@@ -1013,12 +1052,49 @@ def save_docs_to_vector_db(
             items=items,
         )
 
+        if update_bm25_index:
+            BM25_INDEX.insert(collection_name=collection_name, items=items)
+
         return True
     except Exception as e:
         log.exception(e)
         raise e
 
 
+def get_loader_config(request: Request) -> dict:
+    """Keyword arguments of the document Loader for the current settings."""
+    return dict(
+        engine=request.app.state.config.CONTENT_EXTRACTION_ENGINE,
+        DATALAB_MARKER_API_KEY=request.app.state.config.DATALAB_MARKER_API_KEY,
+        DATALAB_MARKER_API_BASE_URL=request.app.state.config.DATALAB_MARKER_API_BASE_URL,
+        DATALAB_MARKER_ADDITIONAL_CONFIG=request.app.state.config.DATALAB_MARKER_ADDITIONAL_CONFIG,
+        DATALAB_MARKER_SKIP_CACHE=request.app.state.config.DATALAB_MARKER_SKIP_CACHE,
+        DATALAB_MARKER_FORCE_OCR=request.app.state.config.DATALAB_MARKER_FORCE_OCR,
+        DATALAB_MARKER_PAGINATE=request.app.state.config.DATALAB_MARKER_PAGINATE,
+        DATALAB_MARKER_STRIP_EXISTING_OCR=request.app.state.config.DATALAB_MARKER_STRIP_EXISTING_OCR,
+        DATALAB_MARKER_DISABLE_IMAGE_EXTRACTION=request.app.state.config.DATALAB_MARKER_DISABLE_IMAGE_EXTRACTION,
+        DATALAB_MARKER_FORMAT_LINES=request.app.state.config.DATALAB_MARKER_FORMAT_LINES,
+        DATALAB_MARKER_USE_LLM=request.app.state.config.DATALAB_MARKER_USE_LLM,
+        DATALAB_MARKER_OUTPUT_FORMAT=request.app.state.config.DATALAB_MARKER_OUTPUT_FORMAT,
+        EXTERNAL_DOCUMENT_LOADER_URL=request.app.state.config.EXTERNAL_DOCUMENT_LOADER_URL,
+        EXTERNAL_DOCUMENT_LOADER_API_KEY=request.app.state.config.EXTERNAL_DOCUMENT_LOADER_API_KEY,
+        TIKA_SERVER_URL=request.app.state.config.TIKA_SERVER_URL,
+        DOCLING_SERVER_URL=request.app.state.config.DOCLING_SERVER_URL,
+        DOCLING_PARAMS={
+            "ocr_engine": request.app.state.config.DOCLING_OCR_ENGINE,
+            "ocr_lang": request.app.state.config.DOCLING_OCR_LANG,
+            "do_picture_description": request.app.state.config.DOCLING_DO_PICTURE_DESCRIPTION,
+            "picture_description_mode": request.app.state.config.DOCLING_PICTURE_DESCRIPTION_MODE,
+            "picture_description_local": request.app.state.config.DOCLING_PICTURE_DESCRIPTION_LOCAL,
+            "picture_description_api": request.app.state.config.DOCLING_PICTURE_DESCRIPTION_API,
+        },
+        PDF_EXTRACT_IMAGES=request.app.state.config.PDF_EXTRACT_IMAGES,
+        DOCUMENT_INTELLIGENCE_ENDPOINT=request.app.state.config.DOCUMENT_INTELLIGENCE_ENDPOINT,
+        DOCUMENT_INTELLIGENCE_KEY=request.app.state.config.DOCUMENT_INTELLIGENCE_KEY,
+        MISTRAL_OCR_API_KEY=request.app.state.config.MISTRAL_OCR_API_KEY,
+    )
+
+
 class ProcessFileForm(BaseModel):
     file_id: str
     content: Optional[str] = None
@@ -1046,6 +1122,7 @@ def process_file(
             try:
                 # /files/{file_id}/data/content/update
                 VECTOR_DB_CLIENT.delete_collection(collection_name=f"file-{file.id}")
+                BM25_INDEX.delete_collection(collection_name=f"file-{file.id}")
             except:
                 # Audio file upload pipeline
                 pass
@@ -1101,38 +1178,11 @@ def process_file(
             file_path = file.path
             if file_path:
                 file_path = Storage.get_file(file_path)
-                loader = Loader(
-                    engine=request.app.state.config.CONTENT_EXTRACTION_ENGINE,
-                    DATALAB_MARKER_API_KEY=request.app.state.config.DATALAB_MARKER_API_KEY,
-                    DATALAB_MARKER_API_BASE_URL=request.app.state.config.DATALAB_MARKER_API_BASE_URL,
-                    DATALAB_MARKER_ADDITIONAL_CONFIG=request.app.state.config.DATALAB_MARKER_ADDITIONAL_CONFIG,
-                    DATALAB_MARKER_SKIP_CACHE=request.app.state.config.DATALAB_MARKER_SKIP_CACHE,
-                    DATALAB_MARKER_FORCE_OCR=request.app.state.config.DATALAB_MARKER_FORCE_OCR,
-                    DATALAB_MARKER_PAGINATE=request.app.state.config.DATALAB_MARKER_PAGINATE,
-                    DATALAB_MARKER_STRIP_EXISTING_OCR=request.app.state.config.DATALAB_MARKER_STRIP_EXISTING_OCR,
-                    DATALAB_MARKER_DISABLE_IMAGE_EXTRACTION=request.app.state.config.DATALAB_MARKER_DISABLE_IMAGE_EXTRACTION,
-                    DATALAB_MARKER_FORMAT_LINES=request.app.state.config.DATALAB_MARKER_FORMAT_LINES,
-                    DATALAB_MARKER_USE_LLM=request.app.state.config.DATALAB_MARKER_USE_LLM,
-                    DATALAB_MARKER_OUTPUT_FORMAT=request.app.state.config.DATALAB_MARKER_OUTPUT_FORMAT,
-                    EXTERNAL_DOCUMENT_LOADER_URL=request.app.state.config.EXTERNAL_DOCUMENT_LOADER_URL,
-                    EXTERNAL_DOCUMENT_LOADER_API_KEY=request.app.state.config.EXTERNAL_DOCUMENT_LOADER_API_KEY,
-                    TIKA_SERVER_URL=request.app.state.config.TIKA_SERVER_URL,
-                    DOCLING_SERVER_URL=request.app.state.config.DOCLING_SERVER_URL,
-                    DOCLING_PARAMS={
-                        "ocr_engine": request.app.state.config.DOCLING_OCR_ENGINE,
-                        "ocr_lang": request.app.state.config.DOCLING_OCR_LANG,
-                        "do_picture_description": request.app.state.config.DOCLING_DO_PICTURE_DESCRIPTION,
-                        "picture_description_mode": request.app.state.config.DOCLING_PICTURE_DESCRIPTION_MODE,
-                        "picture_description_local": request.app.state.config.DOCLING_PICTURE_DESCRIPTION_LOCAL,
-                        "picture_description_api": request.app.state.config.DOCLING_PICTURE_DESCRIPTION_API,
-                    },
-                    PDF_EXTRACT_IMAGES=request.app.state.config.PDF_EXTRACT_IMAGES,
-                    DOCUMENT_INTELLIGENCE_ENDPOINT=request.app.state.config.DOCUMENT_INTELLIGENCE_ENDPOINT,
-                    DOCUMENT_INTELLIGENCE_KEY=request.app.state.config.DOCUMENT_INTELLIGENCE_KEY,
-                    MISTRAL_OCR_API_KEY=request.app.state.config.MISTRAL_OCR_API_KEY,
-                )
-                docs = loader.load(
-                    file.filename, file.meta.get("content_type"), file_path
+                docs = INGESTION_QUEUE.load_documents(
+                    get_loader_config(request),
+                    file.filename,
+                    file.meta.get("content_type"),
+                    file_path,
                 )
 
                 docs = [
@@ -1169,8 +1219,15 @@ def process_file(
             {"status": "completed", "content": text_content},
         )
 
-        hash = calculate_sha256_string(text_content)
-        Files.update_file_hash_by_id(file.id, hash)
+        if form_data.content or not file.hash:
+            hash = calculate_sha256_string(text_content)
+            Files.update_file_hash_by_id(file.id, hash)
+        else:
+            # Hashed while the upload was streamed to storage
+            hash = file.hash
+
+        # Also the last point at which an ingestion job can be cancelled
+        INGESTION_QUEUE.set_progress(0.6)
 
         if not request.app.state.config.BYPASS_EMBEDDING_AND_RETRIEVAL:
             try:
@@ -1211,6 +1268,8 @@ def process_file(
                 "content": text_content,
             }
 
+    except JobCancelled:
+        raise
     except Exception as e:
         log.exception(e)
         if "No pandoc was found" in str(e):
@@ -1316,6 +1375,7 @@ class QueryDocForm(BaseModel):
     k_reranker: Optional[int] = None
     r: Optional[float] = None
     hybrid: Optional[bool] = None
+    filter: Optional[dict] = None
 
 
 @router.post("/query/doc")
@@ -1328,13 +1388,8 @@ def query_doc_handler(
         if request.app.state.config.ENABLE_RAG_HYBRID_SEARCH and (
             form_data.hybrid is None or form_data.hybrid
         ):
-            collection_results = {}
-            collection_results[form_data.collection_name] = VECTOR_DB_CLIENT.get(
-                collection_name=form_data.collection_name
-            )
             return query_doc_with_hybrid_search(
                 collection_name=form_data.collection_name,
-                collection_result=collection_results[form_data.collection_name],
                 query=form_data.query,
                 embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
                     query, prefix=prefix, user=user
@@ -1361,6 +1416,7 @@ def query_doc_handler(
                     if form_data.hybrid_bm25_weight
                     else request.app.state.config.HYBRID_BM25_WEIGHT
                 ),
+                filter=form_data.filter,
                 user=user,
             )
         else:
@@ -1371,6 +1427,7 @@ def query_doc_handler(
                 ),
                 k=form_data.k if form_data.k else request.app.state.config.TOP_K,
                 user=user,
+                filter=form_data.filter,
             )
     except Exception as e:
         log.exception(e)
@@ -1388,10 +1445,11 @@ class QueryCollectionsForm(BaseModel):
     r: Optional[float] = None
     hybrid: Optional[bool] = None
     hybrid_bm25_weight: Optional[float] = None
+    filter: Optional[dict] = None
 
 
 @router.post("/query/collection")
-def query_collection_handler(
+async def query_collection_handler(
     request: Request,
     form_data: QueryCollectionsForm,
     user=Depends(get_verified_user),
@@ -1400,7 +1458,8 @@ def query_collection_handler(
         if request.app.state.config.ENABLE_RAG_HYBRID_SEARCH and (
             form_data.hybrid is None or form_data.hybrid
         ):
-            return query_collection_with_hybrid_search(
+            return await run_in_threadpool(
+                query_collection_with_hybrid_search,
                 collection_names=form_data.collection_names,
                 queries=[form_data.query],
                 embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
@@ -1428,15 +1487,17 @@ def query_collection_handler(
                     if form_data.hybrid_bm25_weight
                     else request.app.state.config.HYBRID_BM25_WEIGHT
                 ),
+                filter=form_data.filter,
             )
         else:
-            return query_collection(
+            return await query_collection(
                 collection_names=form_data.collection_names,
                 queries=[form_data.query],
                 embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
                     query, prefix=prefix, user=user
                 ),
                 k=form_data.k if form_data.k else request.app.state.config.TOP_K,
+                filter=form_data.filter,
             )
 
     except Exception as e:
@@ -1470,6 +1531,10 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
                 collection_name=form_data.collection_name,
                 metadata={"hash": hash},
             )
+            BM25_INDEX.delete(
+                collection_name=form_data.collection_name,
+                filter={"hash": hash},
+            )
             return {"status": True}
         else:
             return {"status": False}
@@ -1481,6 +1546,7 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
 @router.post("/reset/db")
 def reset_vector_db(user=Depends(get_admin_user)):
     VECTOR_DB_CLIENT.reset()
+    BM25_INDEX.reset()
     Knowledges.delete_all_knowledge()
 
 
@@ -1608,3 +1674,57 @@ def process_files_batch(
                 )
 
     return BatchProcessFilesResponse(results=results, errors=errors)
+
+
+####################################
+#
+# Ingestion jobs
+#
+####################################
+
+
+def process_file_job(request: Request, job: IngestionJob, user):
+    process_file(request, ProcessFileForm(**job.payload), user=user)
+
+
+INGESTION_QUEUE.register("process_file", process_file_job)
+
+
+@router.get("/ingest/jobs", response_model=list[IngestionJob])
+async def get_ingestion_jobs(
+    status: Optional[str] = None,
+    limit: int = 100,
+    user=Depends(get_verified_user),
+):
+    return INGESTION_QUEUE.get_jobs(
+        user_id=None if user.role == "admin" else user.id,
+        status=status,
+        limit=limit,
+    )
+
+
+@router.get("/ingest/jobs/{job_id}", response_model=IngestionJob)
+async def get_ingestion_job(job_id: str, user=Depends(get_verified_user)):
+    job = INGESTION_QUEUE.get_job(job_id)
+    if job is None or (user.role != "admin" and job.user_id != user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+    return job
+
+
+@router.post("/ingest/jobs/{job_id}/cancel")
+async def cancel_ingestion_job(job_id: str, user=Depends(get_verified_user)):
+    job = INGESTION_QUEUE.get_job(job_id)
+    if job is None or (user.role != "admin" and job.user_id != user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+    return {"status": INGESTION_QUEUE.cancel(job_id)}
+
+
+@router.get("/ingest/stats")
+async def get_ingestion_stats(user=Depends(get_admin_user)):
+    return INGESTION_QUEUE.stats()
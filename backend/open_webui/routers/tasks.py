@@ -3,12 +3,17 @@ from fastapi.responses import JSONResponse, RedirectResponse
 
 from pydantic import BaseModel
 from typing import Optional
+import hashlib
+import json
 import logging
 import re
+import threading
+import time
 
 from open_webui.utils.chat import generate_chat_completion
 from open_webui.utils.task import (
     title_generation_template,
+    chat_tasks_generation_template,
     follow_up_generation_template,
     query_generation_template,
     image_prompt_generation_template,
@@ -33,8 +38,13 @@ from open_webui.config import (
     DEFAULT_AUTOCOMPLETE_GENERATION_PROMPT_TEMPLATE,
     DEFAULT_EMOJI_GENERATION_PROMPT_TEMPLATE,
     DEFAULT_MOA_GENERATION_PROMPT_TEMPLATE,
+    DEFAULT_CHAT_TASKS_GENERATION_PROMPT_TEMPLATE,
+)
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    TASK_RESULT_CACHE_TTL,
+    CHAT_TASKS_UNSUPPORTED_TTL,
 )
-from open_webui.env import SRC_LOG_LEVELS
 
 
 log = logging.getLogger(__name__)
@@ -43,6 +53,61 @@ log.setLevel(SRC_LOG_LEVELS["MODELS"])
 router = APIRouter()
 
 
+# cache key -> (expires_at, completion) of recent title, tags and follow-up tasks,
+# answered only to the background tasks of a chat (form_data["use_cache"]) so an
+# explicit regeneration always reaches the model
+_task_results: dict[str, tuple[float, dict]] = {}
+_task_results_lock = threading.Lock()
+
+# task model id -> time until which the combined chat tasks are not requested from
+# it again, after it rejected their structured output
+_chat_tasks_unsupported: dict[str, float] = {}
+
+
+def get_task_cache_key(task: str, model_id: str, content: str) -> str:
+    return hashlib.sha256(
+        json.dumps([str(task), model_id, content]).encode()
+    ).hexdigest()
+
+
+def get_cached_task_result(key: str, form_data: dict) -> Optional[dict]:
+    if not form_data.get("use_cache", False):
+        return None
+    entry = _task_results.get(key)
+    if entry is not None and entry[0] > time.time():
+        return entry[1]
+    return None
+
+
+def set_cached_task_result(key: str, result):
+    # Only successful, non-streamed completions are reused
+    if TASK_RESULT_CACHE_TTL <= 0 or not isinstance(result, dict):
+        return
+
+    now = time.time()
+    with _task_results_lock:
+        if len(_task_results) >= 10000:
+            for k, value in list(_task_results.items()):
+                if value[0] <= now:
+                    _task_results.pop(k, None)
+            if len(_task_results) >= 10000:
+                _task_results.clear()
+        _task_results[key] = (now + TASK_RESULT_CACHE_TTL, result)
+
+
+def is_response_format_rejection(status_code: Optional[int], detail) -> bool:
+    # A client error that names the structured output parameters, as opposed to
+    # auth, rate limit or connection failures that say nothing about the model
+    if status_code is None or not 400 <= status_code < 500:
+        return False
+    if status_code in (401, 403, 404, 408, 429):
+        return False
+    detail = str(detail).lower()
+    return any(
+        name in detail for name in ("response_format", "json_schema", "structured")
+    )
+
+
 ##################################
 #
 # Task Endpoints
@@ -64,6 +129,7 @@ async def get_task_config(request: Request, user=Depends(get_verified_user)):
         "ENABLE_FOLLOW_UP_GENERATION": request.app.state.config.ENABLE_FOLLOW_UP_GENERATION,
         "ENABLE_TAGS_GENERATION": request.app.state.config.ENABLE_TAGS_GENERATION,
         "ENABLE_TITLE_GENERATION": request.app.state.config.ENABLE_TITLE_GENERATION,
+        "ENABLE_COMBINED_TASKS_GENERATION": request.app.state.config.ENABLE_COMBINED_TASKS_GENERATION,
         "ENABLE_SEARCH_QUERY_GENERATION": request.app.state.config.ENABLE_SEARCH_QUERY_GENERATION,
         "ENABLE_RETRIEVAL_QUERY_GENERATION": request.app.state.config.ENABLE_RETRIEVAL_QUERY_GENERATION,
         "QUERY_GENERATION_PROMPT_TEMPLATE": request.app.state.config.QUERY_GENERATION_PROMPT_TEMPLATE,
@@ -83,6 +149,7 @@ class TaskConfigForm(BaseModel):
     FOLLOW_UP_GENERATION_PROMPT_TEMPLATE: str
     ENABLE_FOLLOW_UP_GENERATION: bool
     ENABLE_TAGS_GENERATION: bool
+    ENABLE_COMBINED_TASKS_GENERATION: Optional[bool] = None
     ENABLE_SEARCH_QUERY_GENERATION: bool
     ENABLE_RETRIEVAL_QUERY_GENERATION: bool
     QUERY_GENERATION_PROMPT_TEMPLATE: str
@@ -122,6 +189,10 @@ async def update_task_config(
         form_data.TAGS_GENERATION_PROMPT_TEMPLATE
     )
     request.app.state.config.ENABLE_TAGS_GENERATION = form_data.ENABLE_TAGS_GENERATION
+    if form_data.ENABLE_COMBINED_TASKS_GENERATION is not None:
+        request.app.state.config.ENABLE_COMBINED_TASKS_GENERATION = (
+            form_data.ENABLE_COMBINED_TASKS_GENERATION
+        )
     request.app.state.config.ENABLE_SEARCH_QUERY_GENERATION = (
         form_data.ENABLE_SEARCH_QUERY_GENERATION
     )
@@ -148,6 +219,7 @@ async def update_task_config(
         "ENABLE_TAGS_GENERATION": request.app.state.config.ENABLE_TAGS_GENERATION,
         "ENABLE_FOLLOW_UP_GENERATION": request.app.state.config.ENABLE_FOLLOW_UP_GENERATION,
         "FOLLOW_UP_GENERATION_PROMPT_TEMPLATE": request.app.state.config.FOLLOW_UP_GENERATION_PROMPT_TEMPLATE,
+        "ENABLE_COMBINED_TASKS_GENERATION": request.app.state.config.ENABLE_COMBINED_TASKS_GENERATION,
         "ENABLE_SEARCH_QUERY_GENERATION": request.app.state.config.ENABLE_SEARCH_QUERY_GENERATION,
         "ENABLE_RETRIEVAL_QUERY_GENERATION": request.app.state.config.ENABLE_RETRIEVAL_QUERY_GENERATION,
         "QUERY_GENERATION_PROMPT_TEMPLATE": request.app.state.config.QUERY_GENERATION_PROMPT_TEMPLATE,
@@ -200,6 +272,11 @@ async def generate_title(
 
     content = title_generation_template(template, form_data["messages"], user)
 
+    cache_key = get_task_cache_key(TASKS.TITLE_GENERATION, task_model_id, content)
+    cached = get_cached_task_result(cache_key, form_data)
+    if cached is not None:
+        return cached
+
     max_tokens = (
         models[task_model_id].get("info", {}).get("params", {}).get("max_tokens", 1000)
     )
@@ -230,7 +307,9 @@ async def generate_title(
         raise e
 
     try:
-        return await generate_chat_completion(request, form_data=payload, user=user)
+        res = await generate_chat_completion(request, form_data=payload, user=user)
+        set_cached_task_result(cache_key, res)
+        return res
     except Exception as e:
         log.error("Exception occurred", exc_info=True)
         return JSONResponse(
@@ -284,6 +363,11 @@ async def generate_follow_ups(
 
     content = follow_up_generation_template(template, form_data["messages"], user)
 
+    cache_key = get_task_cache_key(TASKS.FOLLOW_UP_GENERATION, task_model_id, content)
+    cached = get_cached_task_result(cache_key, form_data)
+    if cached is not None:
+        return cached
+
     payload = {
         "model": task_model_id,
         "messages": [{"role": "user", "content": content}],
@@ -303,7 +387,9 @@ async def generate_follow_ups(
         raise e
 
     try:
-        return await generate_chat_completion(request, form_data=payload, user=user)
+        res = await generate_chat_completion(request, form_data=payload, user=user)
+        set_cached_task_result(cache_key, res)
+        return res
     except Exception as e:
         log.error("Exception occurred", exc_info=True)
         return JSONResponse(
@@ -357,6 +443,11 @@ async def generate_chat_tags(
 
     content = tags_generation_template(template, form_data["messages"], user)
 
+    cache_key = get_task_cache_key(TASKS.TAGS_GENERATION, task_model_id, content)
+    cached = get_cached_task_result(cache_key, form_data)
+    if cached is not None:
+        return cached
+
     payload = {
         "model": task_model_id,
         "messages": [{"role": "user", "content": content}],
@@ -376,7 +467,9 @@ async def generate_chat_tags(
         raise e
 
     try:
-        return await generate_chat_completion(request, form_data=payload, user=user)
+        res = await generate_chat_completion(request, form_data=payload, user=user)
+        set_cached_task_result(cache_key, res)
+        return res
     except Exception as e:
         log.error(f"Error generating chat completion: {e}")
         return JSONResponse(
@@ -385,6 +478,154 @@ async def generate_chat_tags(
         )
 
 
+@router.post("/chat_tasks/completions")
+async def generate_chat_tasks(
+    request: Request, form_data: dict, user=Depends(get_verified_user)
+):
+    """
+    Generate several of the title, tags and follow-ups of a chat in one
+    completion, answered as a single JSON object constrained by a schema.
+    """
+
+    enabled = {
+        TASKS.TITLE_GENERATION: request.app.state.config.ENABLE_TITLE_GENERATION,
+        TASKS.TAGS_GENERATION: request.app.state.config.ENABLE_TAGS_GENERATION,
+        TASKS.FOLLOW_UP_GENERATION: request.app.state.config.ENABLE_FOLLOW_UP_GENERATION,
+    }
+    tasks = [
+        task
+        for task, is_enabled in enabled.items()
+        if is_enabled and task in form_data.get("tasks", [])
+    ]
+
+    if not request.app.state.config.ENABLE_COMBINED_TASKS_GENERATION or not tasks:
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={"detail": "Combined tasks generation is disabled"},
+        )
+
+    # Custom prompt templates of the individual tasks take precedence
+    if (
+        request.app.state.config.TITLE_GENERATION_PROMPT_TEMPLATE != ""
+        or request.app.state.config.TAGS_GENERATION_PROMPT_TEMPLATE != ""
+        or request.app.state.config.FOLLOW_UP_GENERATION_PROMPT_TEMPLATE != ""
+    ):
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={"detail": "Combined tasks generation is disabled"},
+        )
+
+    if getattr(request.state, "direct", False) and hasattr(request.state, "model"):
+        models = {
+            request.state.model["id"]: request.state.model,
+        }
+    else:
+        models = request.app.state.MODELS
+
+    model_id = form_data["model"]
+    if model_id not in models:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Model not found",
+        )
+
+    # Check if the user has a custom task model
+    # If the user has a custom task model, use that model
+    task_model_id = get_task_model_id(
+        model_id,
+        request.app.state.config.TASK_MODEL,
+        request.app.state.config.TASK_MODEL_EXTERNAL,
+        models,
+    )
+
+    log.debug(
+        f"generating chat tasks {tasks} using model {task_model_id} for user {user.email} "
+    )
+
+    content = chat_tasks_generation_template(
+        DEFAULT_CHAT_TASKS_GENERATION_PROMPT_TEMPLATE,
+        form_data["messages"],
+        tasks,
+        user,
+    )
+
+    cache_key = get_task_cache_key(TASKS.CHAT_TASKS_GENERATION, task_model_id, content)
+    cached = get_cached_task_result(cache_key, form_data)
+    if cached is not None:
+        return cached
+
+    if _chat_tasks_unsupported.get(task_model_id, 0) > time.time():
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={
+                "detail": "Combined tasks generation is not supported by the model"
+            },
+        )
+
+    properties = {
+        TASKS.TITLE_GENERATION: {"title": {"type": "string"}},
+        TASKS.TAGS_GENERATION: {"tags": {"type": "array", "items": {"type": "string"}}},
+        TASKS.FOLLOW_UP_GENERATION: {
+            "follow_ups": {"type": "array", "items": {"type": "string"}}
+        },
+    }
+    schema = {
+        "type": "object",
+        "properties": {
+            key: value for task in tasks for key, value in properties[task].items()
+        },
+        "required": [key for task in tasks for key in properties[task]],
+        "additionalProperties": False,
+    }
+
+    payload = {
+        "model": task_model_id,
+        "messages": [{"role": "user", "content": content}],
+        "stream": False,
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {"name": "chat_tasks", "schema": schema},
+        },
+        "metadata": {
+            **(request.state.metadata if hasattr(request.state, "metadata") else {}),
+            "task": str(TASKS.CHAT_TASKS_GENERATION),
+            "task_body": form_data,
+            "chat_id": form_data.get("chat_id", None),
+        },
+    }
+
+    # Process the payload through the pipeline
+    try:
+        payload = await process_pipeline_inlet_filter(request, payload, user, models)
+    except Exception as e:
+        raise e
+
+    try:
+        res = await generate_chat_completion(request, form_data=payload, user=user)
+        # Upstream errors of OpenAI compatible connections are returned, not raised
+        if isinstance(res, Response) and is_response_format_rejection(
+            res.status_code, getattr(res, "body", b"")
+        ):
+            log.info(f"Model {task_model_id} rejected the chat tasks response format")
+            _chat_tasks_unsupported[task_model_id] = (
+                time.time() + CHAT_TASKS_UNSUPPORTED_TTL
+            )
+        set_cached_task_result(cache_key, res)
+        return res
+    except Exception as e:
+        log.error(f"Error generating chat tasks completion: {e}")
+        if isinstance(e, HTTPException) and is_response_format_rejection(
+            e.status_code, e.detail
+        ):
+            _chat_tasks_unsupported[task_model_id] = (
+                time.time() + CHAT_TASKS_UNSUPPORTED_TTL
+            )
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"detail": "An internal error has occurred."},
+        )
+
+
 @router.post("/image_prompt/completions")
 async def generate_image_prompt(
     request: Request, form_data: dict, user=Depends(get_verified_user)
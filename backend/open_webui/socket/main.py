@@ -7,7 +7,6 @@ import sys
 import time
 from typing import Dict, Set
 from redis import asyncio as aioredis
-import pycrdt as Y
 
 from open_webui.models.users import Users, UserNameResponse
 from open_webui.models.channels import Channels
@@ -132,7 +131,19 @@ else:
 
 
 YDOC_MANAGER = YdocManager(
-    redis=REDIS,
+    redis=(
+        get_redis_connection(
+            redis_url=WEBSOCKET_REDIS_URL,
+            redis_sentinels=get_sentinels_from_env(
+                WEBSOCKET_SENTINEL_HOSTS, WEBSOCKET_SENTINEL_PORT
+            ),
+            redis_cluster=WEBSOCKET_REDIS_CLUSTER,
+            async_mode=True,
+            decode_responses=False,
+        )
+        if WEBSOCKET_MANAGER == "redis"
+        else None
+    ),
     redis_key_prefix=f"{REDIS_KEY_PREFIX}:ydoc:documents",
 )
 
@@ -423,14 +434,8 @@ async def ydoc_document_join(sid, data):
 
         active_session_ids = get_session_ids_from_room(f"doc_{document_id}")
 
-        # Get the Yjs document state
-        ydoc = Y.Doc()
-        updates = await YDOC_MANAGER.get_updates(document_id)
-        for update in updates:
-            ydoc.apply_update(bytes(update))
-
         # Encode the entire document state as an update
-        state_update = ydoc.get_update()
+        state_update = await YDOC_MANAGER.get_state(document_id)
         await sio.emit(
             "ydoc:document:state",
             {
@@ -499,14 +504,8 @@ async def yjs_document_state(sid, data):
             log.warning(f"Document {document_id} not found")
             return
 
-        # Get the Yjs document state
-        ydoc = Y.Doc()
-        updates = await YDOC_MANAGER.get_updates(document_id)
-        for update in updates:
-            ydoc.apply_update(bytes(update))
-
         # Encode the entire document state as an update
-        state_update = ydoc.get_update()
+        state_update = await YDOC_MANAGER.get_state(document_id)
 
         await sio.emit(
             "ydoc:document:state",
@@ -669,76 +668,36 @@ def get_event_emitter(request_info, update_db=True):
         await asyncio.gather(*emit_tasks)
 
         if update_db:
-            if "type" in event_data and event_data["type"] == "status":
-                Chats.add_message_status_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    event_data.get("data", {}),
+            # Buffered and merged per message, see Chats.buffer_message_update
+            chat_id = request_info["chat_id"]
+            message_id = request_info["message_id"]
+            event_type = event_data.get("type")
+            data = event_data.get("data", {})
+
+            if event_type == "status":
+                Chats.buffer_message_update(
+                    chat_id, message_id, append={"statusHistory": [data]}
                 )
 
-            if "type" in event_data and event_data["type"] == "message":
-                message = Chats.get_message_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
+            if event_type == "message":
+                Chats.buffer_message_update(
+                    chat_id, message_id, append={"content": data.get("content", "")}
                 )
 
-                if message:
-                    content = message.get("content", "")
-                    content += event_data.get("data", {}).get("content", "")
-
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                        {
-                            "content": content,
-                        },
-                    )
-
-            if "type" in event_data and event_data["type"] == "replace":
-                content = event_data.get("data", {}).get("content", "")
-
-                Chats.upsert_message_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    {
-                        "content": content,
-                    },
+            if event_type == "replace":
+                Chats.buffer_message_update(
+                    chat_id, message_id, set={"content": data.get("content", "")}
                 )
 
-            if "type" in event_data and event_data["type"] == "files":
-                message = Chats.get_message_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
+            if event_type == "files":
+                Chats.buffer_message_update(
+                    chat_id, message_id, prepend={"files": data.get("files", [])}
                 )
 
-                files = event_data.get("data", {}).get("files", [])
-                files.extend(message.get("files", []))
-
-                Chats.upsert_message_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    {
-                        "files": files,
-                    },
-                )
-
-            if event_data.get("type") in ["source", "citation"]:
-                data = event_data.get("data", {})
+            if event_type in ["source", "citation"]:
                 if data.get("type") == None:
-                    message = Chats.get_message_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                    )
-
-                    sources = message.get("sources", [])
-                    sources.append(data)
-
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                        {
-                            "sources": sources,
-                        },
+                    Chats.buffer_message_update(
+                        chat_id, message_id, append={"sources": [data]}
                     )
 
     return __event_emitter__
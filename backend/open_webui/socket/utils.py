@@ -1,7 +1,13 @@
 import json
 import uuid
+from collections import OrderedDict
 from open_webui.utils.redis import get_redis_connection
-from open_webui.env import REDIS_KEY_PREFIX
+from open_webui.env import (
+    REDIS_KEY_PREFIX,
+    YDOC_COMPACTION_UPDATES,
+    YDOC_COMPACTION_BYTES,
+    YDOC_CACHED_DOCUMENTS,
+)
 from typing import Optional, List, Tuple
 import pycrdt as Y
 
@@ -109,52 +115,201 @@ class RedisDict:
 
 
 class YdocManager:
+    """
+    Collaborative document state shared between workers.
+
+    Each document is stored as a snapshot (all updates merged into a single
+    encoded state) plus the raw binary updates received since. Once the pending
+    updates exceed `compaction_updates` or `compaction_bytes` they are folded
+    into the snapshot, so loading a document replays a bounded number of
+    updates however long it has been edited.
+
+    Each worker also keeps the decoded document with the pending updates it
+    applied, so a join only applies the updates received since and encodes the
+    state, instead of decoding the whole snapshot again. At most
+    `cached_documents` documents are kept, least recently used first out.
+
+    The Redis client must be created with decode_responses=False.
+    """
+
     def __init__(
         self,
         redis=None,
         redis_key_prefix: str = f"{REDIS_KEY_PREFIX}:ydoc:documents",
+        compaction_updates: int = YDOC_COMPACTION_UPDATES,
+        compaction_bytes: int = YDOC_COMPACTION_BYTES,
+        cached_documents: int = YDOC_CACHED_DOCUMENTS,
     ):
+        self._states = {}
         self._updates = {}
+        # document_id -> (snapshot, number of pending updates applied, last
+        # pending update applied, Y.Doc)
+        self._docs = OrderedDict()
         self._users = {}
         self._redis = redis
         self._redis_key_prefix = redis_key_prefix
+        self._compaction_updates = compaction_updates
+        self._compaction_bytes = compaction_bytes
+        self._cached_documents = cached_documents
+
+    def _get_key(self, document_id: str, name: str) -> str:
+        return f"{self._redis_key_prefix}:{document_id}:{name}"
+
+    def _should_compact(self, count: int, size: int) -> bool:
+        return count >= self._compaction_updates or size >= self._compaction_bytes
+
+    def _get_doc(
+        self, document_id: str, state: Optional[bytes], updates: List[bytes]
+    ) -> Y.Doc:
+        cached = self._docs.get(document_id)
+        if (
+            cached is not None
+            and cached[0] == state
+            and cached[1] <= len(updates)
+            # The last update applied must still be in place, another worker
+            # may have cleared the document and a new session begun since
+            and (cached[1] == 0 or updates[cached[1] - 1] == cached[2])
+        ):
+            _, applied, _, ydoc = cached
+        else:
+            # New document, compacted or cleared since
+            ydoc, applied = Y.Doc(), 0
+            if state:
+                ydoc.apply_update(state)
+        for update in updates[applied:]:
+            ydoc.apply_update(update)
+        self._cache_doc(document_id, state, updates, ydoc)
+        return ydoc
+
+    def _cache_doc(
+        self,
+        document_id: str,
+        state: Optional[bytes],
+        updates: List[bytes],
+        ydoc: Y.Doc,
+    ):
+        self._docs[document_id] = (
+            state,
+            len(updates),
+            updates[-1] if updates else None,
+            ydoc,
+        )
+        self._docs.move_to_end(document_id)
+        while len(self._docs) > self._cached_documents:
+            self._docs.popitem(last=False)
+
+    async def _read(self, document_id: str) -> Tuple[Optional[bytes], List[bytes]]:
+        if self._redis:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.get(self._get_key(document_id, "state"))
+                pipe.lrange(self._get_key(document_id, "pending_updates"), 0, -1)
+                state, updates = await pipe.execute()
+            return state, updates
+        return self._states.get(document_id), list(self._updates.get(document_id, []))
 
     async def append_to_updates(self, document_id: str, update: bytes):
         document_id = document_id.replace(":", "_")
+        update = bytes(update)
+
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            await self._redis.rpush(redis_key, json.dumps(list(update)))
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.rpush(self._get_key(document_id, "pending_updates"), update)
+                pipe.incrby(self._get_key(document_id, "size"), len(update))
+                count, size = await pipe.execute()
         else:
-            if document_id not in self._updates:
-                self._updates[document_id] = []
-            self._updates[document_id].append(update)
+            updates = self._updates.setdefault(document_id, [])
+            updates.append(update)
+            count, size = len(updates), sum(len(u) for u in updates)
 
-    async def get_updates(self, document_id: str) -> List[bytes]:
+        if self._should_compact(count, int(size)):
+            await self.compact(document_id)
+
+    async def compact(self, document_id: str):
+        """Merge the snapshot and the pending updates into a new snapshot."""
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            updates = await self._redis.lrange(redis_key, 0, -1)
-            return [bytes(json.loads(update)) for update in updates]
+            lock_key = self._get_key(document_id, "compaction_lock")
+            if not await self._redis.set(lock_key, b"1", nx=True, ex=30):
+                # Another worker is compacting this document
+                return
+
+            try:
+                state, updates = await self._read(document_id)
+                if not updates:
+                    return
+
+                ydoc = self._get_doc(document_id, state, updates)
+                merged = ydoc.get_update()
+
+                # Write the snapshot before trimming so readers never miss an
+                # update (applying one twice is a no-op), and only drop the
+                # updates that were merged; later ones stay queued
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    pipe.set(self._get_key(document_id, "state"), merged)
+                    pipe.ltrim(
+                        self._get_key(document_id, "pending_updates"), len(updates), -1
+                    )
+                    pipe.decrby(
+                        self._get_key(document_id, "size"),
+                        sum(len(update) for update in updates),
+                    )
+                    await pipe.execute()
+                self._cache_doc(document_id, merged, [], ydoc)
+            finally:
+                await self._redis.delete(lock_key)
         else:
-            return self._updates.get(document_id, [])
+            state, updates = await self._read(document_id)
+            if not updates:
+                return
+            ydoc = self._get_doc(document_id, state, updates)
+            merged = ydoc.get_update()
+            self._states[document_id] = merged
+            self._updates[document_id] = []
+            self._cache_doc(document_id, merged, [], ydoc)
+
+    async def get_updates(self, document_id: str) -> List[bytes]:
+        """Return the snapshot (if any) followed by the updates made since."""
+        document_id = document_id.replace(":", "_")
+        state, updates = await self._read(document_id)
+        return ([state] if state else []) + updates
+
+    async def get_state(self, document_id: str) -> bytes:
+        """Return the whole document encoded as a single update."""
+        document_id = document_id.replace(":", "_")
+        state, updates = await self._read(document_id)
+        if not updates:
+            return state or Y.Doc().get_update()
+        ydoc = self._get_doc(document_id, state, updates)
+        merged = ydoc.get_update()
+
+        # Bound the replay cost of the next load if compaction fell behind
+        if self._should_compact(len(updates), sum(len(u) for u in updates)):
+            await self.compact(document_id)
+        return merged
 
     async def document_exists(self, document_id: str) -> bool:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            return await self._redis.exists(redis_key) > 0
+            return (
+                await self._redis.exists(
+                    self._get_key(document_id, "state"),
+                    self._get_key(document_id, "pending_updates"),
+                )
+                > 0
+            )
         else:
-            return document_id in self._updates
+            return document_id in self._states or document_id in self._updates
 
     async def get_users(self, document_id: str) -> List[str]:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:users"
-            users = await self._redis.smembers(redis_key)
-            return list(users)
+            users = await self._redis.smembers(self._get_key(document_id, "users"))
+            return [
+                user.decode() if isinstance(user, bytes) else user for user in users
+            ]
         else:
             return self._users.get(document_id, [])
 
@@ -162,8 +317,7 @@ class YdocManager:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:users"
-            await self._redis.sadd(redis_key, user_id)
+            await self._redis.sadd(self._get_key(document_id, "users"), user_id)
         else:
             if document_id not in self._users:
                 self._users[document_id] = set()
@@ -173,8 +327,7 @@ class YdocManager:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:users"
-            await self._redis.srem(redis_key, user_id)
+            await self._redis.srem(self._get_key(document_id, "users"), user_id)
         else:
             if document_id in self._users and user_id in self._users[document_id]:
                 self._users[document_id].remove(user_id)
@@ -183,6 +336,8 @@ class YdocManager:
         if self._redis:
             keys = await self._redis.keys(f"{self._redis_key_prefix}:*")
             for key in keys:
+                if isinstance(key, bytes):
+                    key = key.decode()
                 if key.endswith(":users"):
                     await self._redis.srem(key, user_id)
 
@@ -203,12 +358,15 @@ class YdocManager:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            await self._redis.delete(redis_key)
-            redis_users_key = f"{self._redis_key_prefix}:{document_id}:users"
-            await self._redis.delete(redis_users_key)
+            await self._redis.delete(
+                *[
+                    self._get_key(document_id, name)
+                    # "updates" held JSON encoded updates before snapshots
+                    for name in ("state", "pending_updates", "size", "users", "updates")
+                ]
+            )
         else:
-            if document_id in self._updates:
-                del self._updates[document_id]
-            if document_id in self._users:
-                del self._users[document_id]
+            self._states.pop(document_id, None)
+            self._updates.pop(document_id, None)
+            self._users.pop(document_id, None)
+        self._docs.pop(document_id, None)
@@ -0,0 +1,118 @@
+"""
+Join latency of a collaborative note while it is being edited, loading the
+compacted document from YdocManager and replaying every update kept since the
+note was created, as joins did before compaction.
+
+    python -m open_webui.socket.ydoc_benchmark --edits 100000
+
+Edits are single character insertions and short deletions at random positions
+made by a client Y.Doc, keeping the note around --size characters, each stored
+through YdocManager.append_to_updates. A join is measured as get_state, the
+call the document join handler makes, one edit before every --step edits, when
+the pending updates of the compacted document are close to the threshold.
+What remains of the join cost is encoding the state, which grows with the
+deleted items Yjs keeps. Without --redis-url the in-memory store is used.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import pycrdt as Y
+
+from open_webui.socket.utils import YdocManager
+
+
+def replay(updates: list[bytes]) -> bytes:
+    ydoc = Y.Doc()
+    for update in updates:
+        ydoc.apply_update(update)
+    return ydoc.get_update()
+
+
+def get_text(state: bytes) -> str:
+    ydoc = Y.Doc()
+    ydoc.apply_update(state)
+    return str(ydoc.get("content", type=Y.Text))
+
+
+async def measure(join, joins: int) -> tuple[float, bytes]:
+    latencies = []
+    for _ in range(joins):
+        start = time.perf_counter()
+        state = await join()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)[len(latencies) // 2], state
+
+
+async def run(manager: YdocManager, args):
+    document_id = f"benchmark-{random.getrandbits(32):08x}"
+    rng = random.Random(0)
+
+    doc = Y.Doc()
+    text = doc.get("content", type=Y.Text)
+    updates, history = [], []
+    doc.observe(lambda event: updates.append(event.update))
+
+    print(
+        f"{'edits':>8}  {'state':>9}  {'compacted':>10} {'stored':>7}  "
+        f"{'all updates':>11} {'stored':>7}"
+    )
+    try:
+        for edit in range(1, args.edits + 1):
+            length = len(text)
+            if length > args.size or (length > 100 and rng.random() < 0.4):
+                index = rng.randrange(length - 5)
+                del text[index : index + rng.randint(1, 5)]
+            else:
+                text.insert(rng.randint(0, length), rng.choice("abcdefgh \n"))
+
+            for update in updates:
+                await manager.append_to_updates(document_id, update)
+            history.extend(updates)
+            updates.clear()
+
+            if edit % args.step == args.step - 1:
+                stored = await manager.get_updates(document_id)
+                latency, state = await measure(
+                    lambda: manager.get_state(document_id), args.joins
+                )
+
+                async def join_all_updates():
+                    return replay(history)
+
+                full_latency, full_state = await measure(join_all_updates, args.joins)
+                assert get_text(state) == get_text(full_state) == str(text)
+
+                print(
+                    f"{edit:>8}  {len(state) / 1024:7.0f}KiB  "
+                    f"{latency:8.2f}ms {len(stored):>7}  "
+                    f"{full_latency:9.2f}ms {len(history):>7}"
+                )
+    finally:
+        await manager.clear_document(document_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--edits", type=int, default=100000)
+    parser.add_argument("--step", type=int, default=10000)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--joins", type=int, default=5)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    redis = None
+    if args.redis_url:
+        from open_webui.utils.redis import get_redis_connection
+
+        redis = get_redis_connection(
+            args.redis_url, None, async_mode=True, decode_responses=False
+        )
+    manager = YdocManager(redis=redis, redis_key_prefix="open-webui:ydoc:benchmark")
+    asyncio.run(run(manager, args))
+
+
+if __name__ == "__main__":
+    main()
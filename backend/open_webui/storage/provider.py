@@ -1,11 +1,19 @@
 import os
 import shutil
 import json
+import hashlib
 import logging
+import threading
+import uuid
 from abc import ABC, abstractmethod
-from typing import BinaryIO, Tuple, Dict
-
-from open_webui.config import STORAGE_PROVIDER, UPLOAD_DIR
+from typing import BinaryIO, Iterator, NamedTuple, Dict
+
+from open_webui.config import (
+    STORAGE_PROVIDER,
+    UPLOAD_DIR,
+    STORAGE_UPLOAD_CHUNK_SIZE,
+    STORAGE_UPLOAD_BUFFER_SIZE,
+)
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.env import SRC_LOG_LEVELS
 
@@ -13,6 +21,37 @@ log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
 
+class StoredFile(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+
+class UploadBuffer:
+    """
+    Bounds the memory used by uploads across all concurrent requests.
+
+    Each upload holds at most one chunk at a time, and a chunk is only read
+    once its size fits in the shared budget, so many large uploads at once
+    queue up instead of growing the worker's memory.
+    """
+
+    def __init__(self, chunk_size: int, buffer_size: int):
+        self.chunk_size = max(chunk_size, 1)
+        self._slots = threading.BoundedSemaphore(max(buffer_size // self.chunk_size, 1))
+
+    def chunks(self, file: BinaryIO) -> Iterator[bytes]:
+        while True:
+            with self._slots:
+                chunk = file.read(self.chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+
+UPLOAD_BUFFER = UploadBuffer(STORAGE_UPLOAD_CHUNK_SIZE, STORAGE_UPLOAD_BUFFER_SIZE)
+
+
 class StorageProvider(ABC):
     @abstractmethod
     def get_file(self, file_path: str) -> str:
@@ -21,7 +60,11 @@ class StorageProvider(ABC):
     @abstractmethod
     def upload_file(
         self, file: BinaryIO, filename: str, tags: Dict[str, str]
-    ) -> Tuple[bytes, str]:
+    ) -> StoredFile:
+        """
+        Stream `file` to storage in chunks, returning its path, size and
+        sha256 computed on the way.
+        """
         pass
 
     @abstractmethod
@@ -37,15 +80,29 @@ class LocalStorageProvider(StorageProvider):
     @staticmethod
     def upload_file(
         file: BinaryIO, filename: str, tags: Dict[str, str] = None
-    ) -> Tuple[bytes, str]:
-        contents = file.read()
-        if not contents:
-            raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+    ) -> StoredFile:
         file_path = os.path.join(UPLOAD_DIR, filename)
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        return contents, file_path
+
+        # Written under a temporary name so a failed upload leaves no file behind
+        tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in UPLOAD_BUFFER.chunks(file):
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+
+            if size == 0:
+                raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return StoredFile(path=file_path, size=size, sha256=sha256.hexdigest())
 
     @staticmethod
     def get_file(file_path: str) -> str:
@@ -14,6 +14,9 @@ from cryptography.hazmat.primitives import serialization
 import json
 
 
+import asyncio
+import threading
+import time
 from datetime import datetime, timedelta
 import pytz
 from pytz import UTC
@@ -34,6 +37,8 @@ from open_webui.env import (
     STATIC_DIR,
     SRC_LOG_LEVELS,
     WEBUI_AUTH_TRUSTED_EMAIL_HEADER,
+    DATABASE_USER_CACHE_TTL,
+    DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL,
 )
 
 from fastapi import BackgroundTasks, Depends, HTTPException, Request, Response, status
@@ -187,6 +192,45 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
+# token -> (expires_at, payload) of recently verified tokens
+_verified_tokens: dict[str, tuple[float, dict]] = {}
+_verified_tokens_lock = threading.Lock()
+
+
+def decode_verified_token(token: str) -> Optional[dict]:
+    """
+    `decode_token` with the payloads of valid tokens reused for up to
+    DATABASE_USER_CACHE_TTL seconds, never past the token's own expiry.
+    """
+    now = time.time()
+    entry = _verified_tokens.get(token)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    data = decode_token(token)
+    if data is not None and DATABASE_USER_CACHE_TTL > 0:
+        expires_at = now + DATABASE_USER_CACHE_TTL
+        if isinstance(data.get("exp"), (int, float)):
+            expires_at = min(expires_at, data["exp"])
+
+        with _verified_tokens_lock:
+            if len(_verified_tokens) >= 10000:
+                for key, value in list(_verified_tokens.items()):
+                    if value[0] <= now:
+                        _verified_tokens.pop(key, None)
+            _verified_tokens[token] = (expires_at, data)
+    return data
+
+
+async def periodic_user_last_active_flush():
+    while True:
+        await asyncio.sleep(DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(Users.flush_users_last_active)
+        except Exception as e:
+            log.error(f"Failed to write last active timestamps: {e}")
+
+
 def extract_token_from_auth_header(auth_header: str):
     return auth_header[len("Bearer ") :]
 
@@ -262,7 +306,7 @@ def get_current_user(
 
     # auth by jwt token
     try:
-        data = decode_token(token)
+        data = decode_verified_token(token)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -270,7 +314,7 @@ def get_current_user(
         )
 
     if data is not None and "id" in data:
-        user = Users.get_user_by_id(data["id"])
+        user = Users.get_cached_user_by_id(data["id"])
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -300,10 +344,8 @@ def get_current_user(
                 current_span.set_attribute("client.user.role", user.role)
                 current_span.set_attribute("client.auth.type", "jwt")
 
-            # Refresh the user's last active timestamp asynchronously
-            # to prevent blocking the request
-            if background_tasks:
-                background_tasks.add_task(Users.update_user_last_active_by_id, user.id)
+            # Refresh the user's last active timestamp, written in batches
+            Users.record_user_last_active(user.id)
         return user
     else:
         raise HTTPException(
@@ -313,7 +355,7 @@ def get_current_user(
 
 
 def get_current_user_by_api_key(api_key: str):
-    user = Users.get_user_by_api_key(api_key)
+    user = Users.get_cached_user_by_api_key(api_key)
 
     if user is None:
         raise HTTPException(
@@ -329,7 +371,7 @@ def get_current_user_by_api_key(api_key: str):
             current_span.set_attribute("client.user.role", user.role)
             current_span.set_attribute("client.auth.type", "api_key")
 
-        Users.update_user_last_active_by_id(user.id)
+        Users.record_user_last_active(user.id)
 
     return user
 
@@ -0,0 +1,300 @@
+import html
+import json
+import re
+from typing import Callable, Optional
+
+
+def split_content_and_whitespace(content):
+    content_stripped = content.rstrip()
+    original_whitespace = (
+        content[len(content_stripped) :] if len(content) > len(content_stripped) else ""
+    )
+    return content_stripped, original_whitespace
+
+
+def is_opening_code_block(content):
+    backtick_segments = content.split("```")
+    # Even number of segments means the last backticks are opening a new block
+    return len(backtick_segments) > 1 and len(backtick_segments) % 2 == 0
+
+
+def quote_reasoning_content(reasoning: str) -> str:
+    return "\n".join(
+        (f"> {line}" if not line.startswith(">") else line)
+        for line in reasoning.splitlines()
+    )
+
+
+def serialize_content_block(
+    content: str,
+    block: dict,
+    raw: bool = False,
+    get_reasoning_display_content: Callable[[str], str] = quote_reasoning_content,
+) -> str:
+    """
+    Appends the serialized form of a single content block to the content
+    serialized so far and returns the result.
+    """
+    if block["type"] == "text":
+        block_content = block["content"].strip()
+        if block_content:
+            content = f"{content}{block_content}\n"
+    elif block["type"] == "tool_calls":
+        attributes = block.get("attributes", {})
+
+        tool_calls = block.get("content", [])
+        results = block.get("results", [])
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if results:
+
+            tool_calls_display_content = ""
+            for tool_call in tool_calls:
+
+                tool_call_id = tool_call.get("id", "")
+                tool_name = tool_call.get("function", {}).get("name", "")
+                tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                tool_result = None
+                tool_result_files = None
+                for result in results:
+                    if tool_call_id == result.get("tool_call_id", ""):
+                        tool_result = result.get("content", None)
+                        tool_result_files = result.get("files", None)
+                        break
+
+                if tool_result:
+                    tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="true" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}" result="{html.escape(json.dumps(tool_result, ensure_ascii=False))}" files="{html.escape(json.dumps(tool_result_files)) if tool_result_files else ""}">\n<summary>Tool Executed</summary>\n</details>\n'
+                else:
+                    tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+
+            if not raw:
+                content = f"{content}{tool_calls_display_content}"
+        else:
+            tool_calls_display_content = ""
+
+            for tool_call in tool_calls:
+                tool_call_id = tool_call.get("id", "")
+                tool_name = tool_call.get("function", {}).get("name", "")
+                tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+
+            if not raw:
+                content = f"{content}{tool_calls_display_content}"
+
+    elif block["type"] == "reasoning":
+        reasoning_display_content = get_reasoning_display_content(block["content"])
+
+        reasoning_duration = block.get("duration", None)
+
+        start_tag = block.get("start_tag", "")
+        end_tag = block.get("end_tag", "")
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if reasoning_duration is not None:
+            if raw:
+                content = f'{content}{start_tag}{block["content"]}{end_tag}\n'
+            else:
+                content = f'{content}<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
+        else:
+            if raw:
+                content = f'{content}{start_tag}{block["content"]}{end_tag}\n'
+            else:
+                content = f'{content}<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
+
+    elif block["type"] == "code_interpreter":
+        attributes = block.get("attributes", {})
+        output = block.get("output", None)
+        lang = attributes.get("lang", "")
+
+        content_stripped, original_whitespace = split_content_and_whitespace(content)
+        if is_opening_code_block(content_stripped):
+            # Remove trailing backticks that would open a new block
+            content = content_stripped.rstrip("`").rstrip() + original_whitespace
+        else:
+            # Keep content as is - either closing backticks or no backticks
+            content = content_stripped + original_whitespace
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if output:
+            output = html.escape(json.dumps(output))
+
+            if raw:
+                content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
+            else:
+                content = f'{content}<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+        else:
+            if raw:
+                content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
+            else:
+                content = f'{content}<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+
+    else:
+        block_content = str(block["content"]).strip()
+        if block_content:
+            content = f"{content}{block['type']}: {block_content}\n"
+
+    return content
+
+
+def serialize_content_blocks(content_blocks: list[dict], raw: bool = False) -> str:
+    content = ""
+
+    for block in content_blocks:
+        content = serialize_content_block(content, block, raw)
+
+    return content.strip()
+
+
+def _is_same_value(a, b) -> bool:
+    if a is b:
+        return True
+    if isinstance(a, (dict, list)) or isinstance(b, (dict, list)):
+        return False
+    return type(a) is type(b) and a == b
+
+
+class ContentBlocksSerializer:
+    """
+    Incremental version of `serialize_content_blocks` for a response that is
+    being streamed.
+
+    The serialized content after every block is kept, so only the blocks that
+    changed since the previous call (normally just the last, still open one)
+    are serialized again. Blocks are compared by their values; dict and list
+    values by identity, since only the last block of a response is mutated in
+    place while it is streamed.
+    """
+
+    def __init__(self):
+        # raw -> list of (block, block values, content serialized up to and including the block)
+        self._cache: dict[bool, list[tuple[dict, list, str]]] = {}
+        # Complete lines of the reasoning quoted last and their quoted form
+        self._quoted_reasoning: tuple[str, str] = ("", "")
+
+    def serialize(self, content_blocks: list[dict], raw: bool = False) -> str:
+        cache = self._cache.setdefault(raw, [])
+
+        # Reuse the serialized content of the unchanged leading blocks, the last block is always
+        # serialized again as its nested values may have been mutated in place
+        idx = 0
+        while idx < min(len(cache), len(content_blocks) - 1):
+            block, values, _ = cache[idx]
+            if block is not content_blocks[idx] or not self._is_unchanged(
+                values, block
+            ):
+                break
+            idx += 1
+
+        del cache[idx:]
+        content = cache[-1][2] if cache else ""
+
+        for block in content_blocks[idx:]:
+            content = serialize_content_block(
+                content, block, raw, self._quote_reasoning_content
+            )
+            cache.append((block, list(block.items()), content))
+
+        return content.strip()
+
+    def _quote_reasoning_content(self, reasoning: str) -> str:
+        # Lines split at a "\n" stay the same lines when text is appended, so
+        # only the lines after the previously quoted ones are quoted again
+        source, quoted = self._quoted_reasoning
+        if not source or not reasoning.startswith(source):
+            source, quoted = "", ""
+
+        rest = reasoning[len(source) :]
+        complete = rest[: rest.rfind("\n") + 1]
+        if complete:
+            quoted_complete = quote_reasoning_content(complete)
+            source = f"{source}{complete}"
+            quoted = f"{quoted}\n{quoted_complete}" if quoted else quoted_complete
+            rest = rest[len(complete) :]
+        self._quoted_reasoning = (source, quoted)
+
+        if not rest:
+            return quoted
+        quoted_rest = quote_reasoning_content(rest)
+        return f"{quoted}\n{quoted_rest}" if quoted else quoted_rest
+
+    @staticmethod
+    def _is_unchanged(values: list, block: dict) -> bool:
+        if len(values) != len(block):
+            return False
+
+        for (key, value), (block_key, block_value) in zip(values, block.items()):
+            if key != block_key or not _is_same_value(value, block_value):
+                return False
+        return True
+
+
+class TagContentScanner:
+    """
+    Searches tag patterns in content that grows by appending stream deltas.
+
+    When a pattern did not match the content a delta was appended to, only the
+    tail of the new content where a match could still start is searched again,
+    instead of the whole accumulated content.
+    """
+
+    def __init__(self):
+        # pattern -> (content that did not match, offset from which a match could still start)
+        self._misses: dict[str, tuple[str, int]] = {}
+        self._appended: Optional[tuple[str, str]] = None
+
+    def append(self, content: str, value: str) -> str:
+        appended = f"{content}{value}"
+        self._appended = (content, appended)
+        return appended
+
+    def search(
+        self, pattern: str, content: str, literal: Optional[str] = None
+    ) -> Optional[re.Match]:
+        """
+        Same as `re.search(pattern, content)`.
+
+        `literal` is the text matched by `pattern` if it is a plain string,
+        otherwise matches are expected to span at most one newline, as for the
+        `<tag(\\s.*?)?>` start tag patterns.
+        """
+        start = 0
+
+        miss = self._misses.get(pattern)
+        if miss is not None:
+            missed_content, offset = miss
+            if missed_content is content:
+                return None
+            if (
+                self._appended is not None
+                and self._appended[0] is missed_content
+                and self._appended[1] is content
+            ):
+                start = offset
+
+        match = re.compile(pattern).search(content, start)
+        if match is None:
+            if literal is not None:
+                # A new match has to overlap the appended content
+                offset = max(0, len(content) - len(literal) + 1)
+            else:
+                # A new match has to end on the last line and spans at most one
+                # newline, so it starts on one of the last two lines
+                last_newline = content.rfind("\n")
+                offset = (
+                    content.rfind("\n", 0, last_newline) + 1
+                    if last_newline != -1
+                    else 0
+                )
+            self._misses[pattern] = (content, offset)
+        else:
+            self._misses.pop(pattern, None)
+
+        return match
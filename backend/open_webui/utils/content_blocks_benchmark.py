@@ -0,0 +1,157 @@
+"""
+CPU cost of serializing content blocks and scanning for tags on every delta of
+a streamed response, re-run over the whole accumulated content as before and
+with the incremental ContentBlocksSerializer and TagContentScanner.
+
+    python -m open_webui.utils.content_blocks_benchmark --tokens 100000
+
+The synthetic stream starts with a reasoning block and continues with a text
+block, one token per delta. Both runs must produce the same serialized content,
+which is compared at every --check-every delta.
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import Optional
+
+from open_webui.utils.content_blocks import (
+    ContentBlocksSerializer,
+    TagContentScanner,
+    serialize_content_blocks,
+)
+
+START_TAGS = [
+    "<think>",
+    "<thinking>",
+    "<reason>",
+    "<reasoning>",
+    "<thought>",
+    "<Thought>",
+    "<|begin_of_thought|>",
+    "◁think▷",
+    "<|begin_of_solution|>",
+    "<code_interpreter>",
+]
+
+WORDS = (
+    "let me check whether the serialized content of the last block changes "
+    "when a delta is appended to the response that is being streamed"
+).split()
+
+
+def start_tag_pattern(start_tag: str) -> tuple[str, Optional[str]]:
+    """Pattern and literal searched by tag_content_handler for a start tag."""
+    if start_tag.startswith("<") and start_tag.endswith(">"):
+        return rf"<{re.escape(start_tag[1:-1])}(\s.*?)?>", None
+    return re.escape(start_tag), start_tag
+
+
+def generate_stream(tokens: int) -> list[str]:
+    rng = random.Random(0)
+    return [
+        rng.choice(WORDS) + ("\n" if rng.random() < 0.06 else " ")
+        for _ in range(tokens)
+    ]
+
+
+def run(
+    stream: list[str],
+    reasoning_tokens: int,
+    incremental: bool,
+    check_every: int,
+) -> tuple[float, list[float], list[str]]:
+    patterns = [start_tag_pattern(tag) for tag in START_TAGS]
+    serializer = ContentBlocksSerializer()
+    scanner = TagContentScanner()
+
+    reasoning = {
+        "type": "reasoning",
+        "start_tag": "<think>",
+        "end_tag": "</think>",
+        "content": "",
+    }
+    content_blocks = [reasoning]
+    content = ""
+    latencies, checks = [], []
+
+    start = time.perf_counter()
+    for idx, delta in enumerate(stream):
+        delta_start = time.perf_counter()
+        if idx < reasoning_tokens:
+            reasoning["content"] += delta
+        else:
+            if idx == reasoning_tokens:
+                reasoning["duration"] = 12
+                content_blocks.append({"type": "text", "content": ""})
+
+            content_blocks[-1]["content"] += delta
+            if incremental:
+                content = scanner.append(content, delta)
+                for pattern, literal in patterns:
+                    scanner.search(pattern, content, literal=literal)
+            else:
+                content = f"{content}{delta}"
+                for pattern, _ in patterns:
+                    re.search(pattern, content)
+
+        if incremental:
+            serialized = serializer.serialize(content_blocks)
+        else:
+            serialized = serialize_content_blocks(content_blocks)
+        latencies.append((time.perf_counter() - delta_start) * 1000)
+
+        if idx % check_every == 0 or idx == len(stream) - 1:
+            checks.append(serialized)
+
+    return time.perf_counter() - start, latencies, checks
+
+
+def report(name: str, duration: float, latencies: list[float]):
+    tail = sorted(latencies[-1000:])
+    print(
+        f"{name:<14} {duration:8.2f}s  {duration / len(latencies) * 1e6:8.1f}us/delta  "
+        f"last 1000 deltas p50 {tail[len(tail) // 2]:7.3f}ms  "
+        f"p99 {tail[int(len(tail) * 0.99)]:7.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tokens", type=int, default=100000)
+    parser.add_argument(
+        "--reasoning",
+        type=float,
+        default=0.5,
+        help="fraction of the tokens streamed into the reasoning block",
+    )
+    parser.add_argument("--check-every", type=int, default=1000)
+    args = parser.parse_args()
+
+    stream = generate_stream(args.tokens)
+    reasoning_tokens = int(args.tokens * args.reasoning)
+    print(
+        f"{args.tokens} tokens ({sum(map(len, stream)) / 1024:.0f} KiB), "
+        f"{reasoning_tokens} of them reasoning"
+    )
+
+    duration, latencies, incremental_checks = run(
+        stream, reasoning_tokens, True, args.check_every
+    )
+    report("incremental", duration, latencies)
+
+    duration, latencies, full_checks = run(
+        stream, reasoning_tokens, False, args.check_every
+    )
+    report("full", duration, latencies)
+
+    mismatches = sum(a != b for a, b in zip(incremental_checks, full_checks))
+    print(
+        f"output {'identical' if not mismatches else 'DIFFERS'} "
+        f"at {len(full_checks)} checked deltas"
+    )
+
+
+if __name__ == "__main__":
+    main()
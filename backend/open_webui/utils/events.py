@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from uuid import uuid4
+
+from open_webui.env import SRC_LOG_LEVELS, REDIS_KEY_PREFIX
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+REDIS_EVENTS_CHANNEL = f"{REDIS_KEY_PREFIX}:events"
+
+
+class EventBus:
+    """
+    Publish/subscribe of small state-change events keyed by topic.
+
+    Events are delivered to the subscribers of this process directly and, once
+    started with a Redis connection, relayed over Redis pub/sub to the other
+    workers. Delivery is at most once: subscribers must read the current state
+    after subscribing and only use events to learn about later changes.
+
+    `publish` may be called from any thread (e.g. sync endpoints or ingestion
+    workers); subscribers are asyncio queues on the event loop.
+    """
+
+    def __init__(self):
+        self.instance_id = str(uuid4())
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        # Pending Redis publishes, referenced until done so they are not
+        # garbage collected mid-flight
+        self._tasks: set[asyncio.Task] = set()
+
+    def start(self, redis=None):
+        self._loop = asyncio.get_running_loop()
+        self._redis = redis
+        if redis is not None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        self._redis = None
+
+    @property
+    def relayed(self) -> bool:
+        """Whether events published by other workers reach this process."""
+        return self._redis is not None
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(REDIS_EVENTS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        payload = json.loads(message["data"])
+                        # Events of this process were already delivered locally
+                        if payload.get("source") != self.instance_id:
+                            self._dispatch(payload["topic"], payload["event"])
+                    except Exception as e:
+                        log.exception(f"Error handling event: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f"Event bus listener disconnected, retrying: {e}")
+                await asyncio.sleep(1)
+
+    def _dispatch(self, topic: str, event: dict):
+        for queue in self._subscribers.get(topic, ()):
+            queue.put_nowait(event)
+
+    def _publish(self, topic: str, event: dict):
+        self._dispatch(topic, event)
+        if self._redis is not None:
+            message = {"source": self.instance_id, "topic": topic, "event": event}
+            task = asyncio.create_task(
+                self._redis.publish(REDIS_EVENTS_CHANNEL, json.dumps(message))
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def publish(self, topic: str, event: dict):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            self._publish(topic, event)
+        else:
+            loop.call_soon_threadsafe(self._publish, topic, event)
+
+    @contextmanager
+    def subscribe(self, topic: str) -> Iterator[asyncio.Queue]:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(topic, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def stats(self) -> dict:
+        return {
+            "topics": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "redis": self._redis is not None,
+            "pending_publishes": len(self._tasks),
+        }
+
+
+EVENT_BUS = EventBus()
+
+
+def get_file_status_topic(file_id: str) -> str:
+    return f"file:{file_id}:status"
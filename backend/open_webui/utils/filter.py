@@ -57,48 +57,65 @@ def get_sorted_filter_ids(request, model: dict, enabled_filter_ids: list = None)
     return filter_ids
 
 
-async def process_filter_functions(
-    request, filter_functions, filter_type, form_data, extra_params
-):
-    skip_files = None
-
-    for function in filter_functions:
-        filter = function
-        filter_id = function.id
-        if not filter:
-            continue
-
-        function_module = get_function_module(
-            request, filter_id, load_from_db=(filter_type != "stream")
-        )
-        # Prepare handler function
-        handler = getattr(function_module, filter_type, None)
-        if not handler:
-            continue
-
-        # Check if the function has a file_handler variable
-        if filter_type == "inlet" and hasattr(function_module, "file_handler"):
-            skip_files = function_module.file_handler
-
-        # Apply valves to the function
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
+class FilterChain:
+    """
+    The handlers of one filter hook, resolved once and reused for every call.
+
+    Building the chain loads each filter's module, applies its valves and the
+    user's valves and works out which extra parameters the handler accepts, so
+    running it (e.g. once per streamed chunk) is a plain call per filter. The
+    chain rebuilds itself when a function or valves changed in this process
+    since it was built (see `Functions.version`).
+    """
+
+    def __init__(self, request, filter_functions, filter_type, extra_params):
+        self.request = request
+        self.filter_functions = filter_functions
+        self.filter_type = filter_type
+        self.extra_params = extra_params
+
+        self.version = None
+        self.handlers = []
+        self.skip_files = None
+
+    def build(self):
+        self.version = Functions.version
+        self.handlers = []
+        self.skip_files = None
+
+        for function in self.filter_functions:
+            filter = function
+            filter_id = function.id
+            if not filter:
+                continue
+
+            function_module = get_function_module(
+                self.request, filter_id, load_from_db=(self.filter_type != "stream")
             )
+            # Prepare handler function
+            handler = getattr(function_module, self.filter_type, None)
+            if not handler:
+                continue
+
+            # Check if the function has a file_handler variable
+            if self.filter_type == "inlet" and hasattr(function_module, "file_handler"):
+                self.skip_files = function_module.file_handler
+
+            # Apply valves to the function
+            if hasattr(function_module, "valves") and hasattr(
+                function_module, "Valves"
+            ):
+                valves = Functions.get_function_valves_by_id(filter_id)
+                function_module.valves = function_module.Valves(
+                    **(valves if valves else {})
+                )
 
-        try:
             # Prepare parameters
             sig = inspect.signature(handler)
-
-            params = {"body": form_data}
-            if filter_type == "stream":
-                params = {"event": form_data}
-
-            params = params | {
+            params = {
                 k: v
                 for k, v in {
-                    **extra_params,
+                    **self.extra_params,
                     "__id__": filter_id,
                 }.items()
                 if k in sig.parameters
@@ -108,27 +125,49 @@ async def process_filter_functions(
             if "__user__" in sig.parameters:
                 if hasattr(function_module, "UserValves"):
                     try:
-                        params["__user__"]["valves"] = function_module.UserValves(
-                            **Functions.get_user_valves_by_id_and_user_id(
-                                filter_id, params["__user__"]["id"]
-                            )
-                        )
+                        params["__user__"] = {
+                            **params["__user__"],
+                            "valves": function_module.UserValves(
+                                **Functions.get_user_valves_by_id_and_user_id(
+                                    filter_id, params["__user__"]["id"]
+                                )
+                            ),
+                        }
                     except Exception as e:
                         log.exception(f"Failed to get user values: {e}")
 
-            # Execute handler
-            if inspect.iscoroutinefunction(handler):
-                form_data = await handler(**params)
-            else:
-                form_data = handler(**params)
+            self.handlers.append(
+                (filter_id, handler, inspect.iscoroutinefunction(handler), params)
+            )
+
+    async def __call__(self, form_data):
+        if self.version != Functions.version:
+            self.build()
+
+        data_key = "event" if self.filter_type == "stream" else "body"
+        for filter_id, handler, is_coroutine, params in self.handlers:
+            try:
+                # Execute handler
+                if is_coroutine:
+                    form_data = await handler(**{data_key: form_data}, **params)
+                else:
+                    form_data = handler(**{data_key: form_data}, **params)
+
+            except Exception as e:
+                log.debug(f"Error in {self.filter_type} handler {filter_id}: {e}")
+                raise e
 
-        except Exception as e:
-            log.debug(f"Error in {filter_type} handler {filter_id}: {e}")
-            raise e
+        # Handle file cleanup for inlet
+        if self.skip_files and "files" in form_data.get("metadata", {}):
+            del form_data["files"]
+            del form_data["metadata"]["files"]
 
-    # Handle file cleanup for inlet
-    if skip_files and "files" in form_data.get("metadata", {}):
-        del form_data["files"]
-        del form_data["metadata"]["files"]
+        return form_data, {}
 
-    return form_data, {}
+
+async def process_filter_functions(
+    request, filter_functions, filter_type, form_data, extra_params
+):
+    """Run a filter hook once; hooks run repeatedly should reuse a `FilterChain`."""
+    chain = FilterChain(request, filter_functions, filter_type, extra_params)
+    return await chain(form_data)
@@ -0,0 +1,271 @@
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+# Smoothing factor of the latency moving average
+EWMA_ALPHA = 0.3
+
+
+class BackendStats:
+    def __init__(self, url: str):
+        self.url = url
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ewma_latency: Optional[float] = None
+        self.ejected_until = 0.0
+        # Smooth weighted round-robin state
+        self.current_weight = 0.0
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def model_dump(self) -> dict:
+        now = time.monotonic()
+        return {
+            "url": self.url,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "ewma_latency_ms": (
+                round(self.ewma_latency * 1000, 1)
+                if self.ewma_latency is not None
+                else None
+            ),
+            "ejected": self.is_ejected(now),
+            "ejected_for": max(round(self.ejected_until - now, 1), 0),
+        }
+
+
+class Strategy(ABC):
+    """Picks one of the candidate backends; `candidates` are (index, weight, stats)."""
+
+    @abstractmethod
+    def choose(
+        self, key: str, candidates: list[tuple[int, float, BackendStats]]
+    ) -> int:
+        pass
+
+
+class RandomStrategy(Strategy):
+    def choose(self, key, candidates):
+        return random.choice(candidates)[0]
+
+
+class LeastConnectionsStrategy(Strategy):
+    def choose(self, key, candidates):
+        # Weighted by capacity; ties are broken by latency, then randomly
+        return min(
+            candidates,
+            key=lambda c: (
+                c[2].in_flight / c[1],
+                c[2].ewma_latency or 0.0,
+                random.random(),
+            ),
+        )[0]
+
+
+class EwmaStrategy(Strategy):
+    def choose(self, key, candidates):
+        # Backends without samples yet are tried first so they get measured
+        unmeasured = [c for c in candidates if c[2].ewma_latency is None]
+        if unmeasured:
+            return random.choice(unmeasured)[0]
+
+        # Expected wait: latency times the queue in front of the new request
+        return min(
+            candidates,
+            key=lambda c: c[2].ewma_latency * (c[2].in_flight + 1) / c[1],
+        )[0]
+
+
+class WeightedStrategy(Strategy):
+    """Smooth weighted round-robin, as used by nginx."""
+
+    def choose(self, key, candidates):
+        total = sum(weight for _, weight, _ in candidates)
+        for _, weight, stats in candidates:
+            stats.current_weight += weight
+
+        idx, _, stats = max(candidates, key=lambda c: c[2].current_weight)
+        stats.current_weight -= total
+        return idx
+
+
+class ConsistentHashStrategy(Strategy):
+    """
+    Rendezvous hashing on the model name, so requests for a model keep landing
+    on the same backend (with the model and its KV cache already loaded) and
+    only the models of a removed or ejected backend move elsewhere.
+    """
+
+    def choose(self, key, candidates):
+        def score(candidate):
+            _, weight, stats = candidate
+            digest = hashlib.sha256(f"{key}|{stats.url}".encode()).digest()
+            h = (int.from_bytes(digest[:8], "big") + 1) / (2**64 + 1)
+            return -weight / math.log(h)
+
+        return max(candidates, key=score)[0]
+
+
+STRATEGIES = {
+    "random": RandomStrategy,
+    "least_connections": LeastConnectionsStrategy,
+    "ewma": EwmaStrategy,
+    "weighted": WeightedStrategy,
+    "consistent_hash": ConsistentHashStrategy,
+}
+
+
+class RequestTracker:
+    """Accounts a single upstream request against its backend."""
+
+    def __init__(self, balancer: "LoadBalancer", stats: Optional[BackendStats]):
+        self.balancer = balancer
+        self.stats = stats
+        self.start = time.monotonic()
+        self.finished = False
+
+        if self.stats is not None:
+            with self.balancer._lock:
+                self.stats.in_flight += 1
+                self.stats.requests += 1
+
+    def response(self, status: int):
+        """Record time to response headers; 5xx counts as a backend failure."""
+        if self.stats is None:
+            return
+        self.balancer._record_latency(self.stats, time.monotonic() - self.start)
+        if status >= 500:
+            self.balancer._record_failure(self.stats)
+        else:
+            self.balancer._record_success(self.stats)
+
+    def finish(self, ok: bool = True):
+        if self.finished or self.stats is None:
+            return
+        self.finished = True
+        with self.balancer._lock:
+            self.stats.in_flight -= 1
+        if not ok:
+            self.balancer._record_failure(self.stats)
+
+    async def wrap(self, iterator: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Keep the request in flight until a streamed body is consumed or dropped."""
+        try:
+            async for chunk in iterator:
+                yield chunk
+        finally:
+            self.finish()
+
+
+class LoadBalancer:
+    """
+    Chooses a backend among the nodes serving a model and passively tracks
+    their health.
+
+    Requests are accounted per backend URL (in flight, EWMA of the time to
+    response headers, failures). A backend that fails `max_failures` times in
+    a row is ejected for `cooldown` seconds; afterwards it is tried again and a
+    single success puts it back in rotation. If every candidate is ejected the
+    ejection is ignored rather than failing the request.
+    """
+
+    def __init__(self, strategy: str, max_failures: int, cooldown: float):
+        if strategy not in STRATEGIES:
+            log.warning(
+                f"Unknown load balancing strategy {strategy}, using least_connections"
+            )
+            strategy = "least_connections"
+
+        self.strategy_name = strategy
+        self.strategy = STRATEGIES[strategy]()
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self._backends: dict[str, BackendStats] = {}
+
+    def _get_stats(self, url: str) -> BackendStats:
+        url = url.rstrip("/")
+        stats = self._backends.get(url)
+        if stats is None:
+            with self._lock:
+                stats = self._backends.setdefault(url, BackendStats(url))
+        return stats
+
+    def select(self, key: str, backends: list[tuple[int, str, float]]) -> int:
+        """Return the index of the backend to use out of (index, url, weight)."""
+        if len(backends) == 1:
+            return backends[0][0]
+
+        now = time.monotonic()
+        candidates = [
+            (idx, weight if weight > 0 else 1.0, self._get_stats(url))
+            for idx, url, weight in backends
+        ]
+        healthy = [c for c in candidates if not c[2].is_ejected(now)]
+
+        with self._lock:
+            return self.strategy.choose(key, healthy or candidates)
+
+    def track(self, url: str) -> RequestTracker:
+        """
+        Start tracking a request to `url`, which is matched by prefix against the
+        known backends; requests to unknown hosts get a no-op tracker.
+        """
+        stats = None
+        for backend_url, backend_stats in list(self._backends.items()):
+            if url == backend_url or url.startswith(f"{backend_url}/"):
+                if stats is None or len(backend_url) > len(stats.url):
+                    stats = backend_stats
+        return RequestTracker(self, stats)
+
+    def _record_latency(self, stats: BackendStats, latency: float):
+        with self._lock:
+            if stats.ewma_latency is None:
+                stats.ewma_latency = latency
+            else:
+                stats.ewma_latency = (
+                    EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * stats.ewma_latency
+                )
+
+    def _record_success(self, stats: BackendStats):
+        with self._lock:
+            stats.consecutive_failures = 0
+            stats.ejected_until = 0.0
+
+    def _record_failure(self, stats: BackendStats):
+        with self._lock:
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            if (
+                self.max_failures > 0
+                and stats.consecutive_failures >= self.max_failures
+            ):
+                if not stats.is_ejected(time.monotonic()):
+                    log.warning(
+                        f"Ejecting backend {stats.url} for {self.cooldown}s "
+                        f"after {stats.consecutive_failures} consecutive failures"
+                    )
+                stats.ejected_until = time.monotonic() + self.cooldown
+
+    def stats(self) -> dict:
+        return {
+            "strategy": self.strategy_name,
+            "backends": [stats.model_dump() for stats in self._backends.values()],
+        }
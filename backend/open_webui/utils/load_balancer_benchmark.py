@@ -0,0 +1,288 @@
+"""
+Latency of chat requests spread over several mock Ollama servers by each load
+balancing strategy, and how a backend that goes down is ejected and restored.
+
+    python -m open_webui.utils.load_balancer_benchmark --delays 50,50,200
+
+Every mock server answers /api/chat with a short NDJSON stream after its delay
+(with +-20% jitter) and serves --parallel requests at a time, queueing the
+rest like OLLAMA_NUM_PARALLEL does. Requests are sent through the shared
+session pool and accounted like send_post_request does. With --outage, that
+server fails every request with a 500 while the middle third of the requests
+is sent, then recovers.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+
+from open_webui.utils.load_balancer import STRATEGIES, LoadBalancer
+from open_webui.utils.session_pool import SESSION_POOL
+
+
+def parse_list(value: str, cast=float) -> list:
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+
+class MockOllama:
+    def __init__(self, delay: float, failure_rate: float, parallel: int, seed: int):
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.parallel = parallel
+        self.rng = random.Random(seed)
+        self.url = None
+        self.runner = None
+        self.reset()
+
+    def reset(self):
+        self.down = False
+        self.slots = asyncio.Semaphore(self.parallel)
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        if self.down or self.rng.random() < self.failure_rate:
+            return web.json_response({"error": "mock failure"}, status=500)
+
+        async with self.slots:
+            await asyncio.sleep(self.delay * self.rng.uniform(0.8, 1.2))
+            response = web.StreamResponse(
+                headers={"Content-Type": "application/x-ndjson"}
+            )
+            await response.prepare(request)
+            for idx in range(5):
+                chunk = {"model": payload["model"], "done": idx == 4}
+                await response.write(f"{json.dumps(chunk)}\n".encode())
+            await response.write_eof()
+            return response
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/api/chat", self.chat)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+class Outage:
+    """Ejection and restore of the backend that goes down during a run."""
+
+    def __init__(self, balancer: LoadBalancer, server: MockOllama):
+        self.balancer = balancer
+        self.server = server
+        self.ejections = 0
+        self.failed_requests = 0
+        self.recovered_at: Optional[float] = None
+        self.restore_time: Optional[float] = None
+
+    def record(self, url: str, ok: bool):
+        if url != self.server.url:
+            return
+        if not ok:
+            self.failed_requests += 1
+        elif self.recovered_at is not None and self.restore_time is None:
+            self.restore_time = time.monotonic() - self.recovered_at
+
+    async def monitor(self):
+        stats = self.balancer._get_stats(self.server.url)
+        ejected = False
+        while True:
+            now = time.monotonic()
+            if stats.is_ejected(now) and not ejected:
+                self.ejections += 1
+            ejected = stats.is_ejected(now)
+            await asyncio.sleep(0.01)
+
+
+async def send(
+    session: aiohttp.ClientSession,
+    balancer: LoadBalancer,
+    url: str,
+    model: str,
+) -> bool:
+    tracker = balancer.track(f"{url}/api/chat")
+    r = None
+    try:
+        r = await session.post(
+            f"{url}/api/chat",
+            json={"model": model, "messages": [{"role": "user", "content": "hi"}]},
+        )
+        tracker.response(r.status)
+        if not r.ok:
+            tracker.finish()
+            return False
+        async for _ in tracker.wrap(r.content):
+            pass
+        return True
+    except Exception:
+        tracker.finish(ok=False)
+        return False
+    finally:
+        if r is not None:
+            r.release()
+
+
+async def run(strategy: str, servers: list[MockOllama], args) -> dict:
+    for server in servers:
+        server.reset()
+
+    balancer = LoadBalancer(strategy, args.max_failures, args.cooldown)
+    backends = [
+        (idx, server.url, weight)
+        for idx, (server, weight) in enumerate(zip(servers, args.weights))
+    ]
+    session = SESSION_POOL.get_session()
+
+    outage = None
+    monitor = None
+    if args.outage is not None:
+        outage = Outage(balancer, servers[args.outage])
+        monitor = asyncio.create_task(outage.monitor())
+
+    latencies, errors = [], 0
+    counts = [0] * len(servers)
+    requests = iter(range(args.requests))
+
+    async def worker():
+        nonlocal errors
+        for idx in requests:
+            if outage is not None:
+                if idx == args.requests // 3:
+                    outage.server.down = True
+                elif idx == 2 * args.requests // 3 and outage.server.down:
+                    outage.server.down = False
+                    outage.recovered_at = time.monotonic()
+
+            model = f"model-{idx % args.models}"
+            backend = balancer.select(model, backends)
+            counts[backend] += 1
+
+            start = time.perf_counter()
+            ok = await send(session, balancer, servers[backend].url, model)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors += 1
+            if outage is not None:
+                outage.record(servers[backend].url, ok)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    duration = time.perf_counter() - start
+    if monitor is not None:
+        monitor.cancel()
+
+    latencies.sort()
+    return {
+        "duration": duration,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "errors": errors,
+        "counts": counts,
+        "outage": outage,
+    }
+
+
+def report(strategy: str, result: dict, requests: int):
+    share = "/".join(f"{count * 100 / requests:.0f}" for count in result["counts"])
+    print(
+        f"{strategy:<18} {result['duration']:7.2f}s  "
+        f"p50 {result['p50']:8.1f}ms  p95 {result['p95']:8.1f}ms  "
+        f"errors {result['errors']:>5}  share % {share}"
+    )
+
+    outage = result["outage"]
+    if outage is not None:
+        restore = (
+            f"back in rotation {outage.restore_time:.2f}s after recovery"
+            if outage.restore_time is not None
+            else "not restored before the run ended"
+        )
+        print(
+            f"{'':<18} outage: ejected {outage.ejections}x, "
+            f"{outage.failed_requests} requests failed on it, {restore}"
+        )
+
+
+async def main_async(args):
+    servers = [
+        MockOllama(delay / 1000, failure_rate, args.parallel, seed)
+        for seed, (delay, failure_rate) in enumerate(zip(args.delays, args.failures))
+    ]
+    for server in servers:
+        await server.start()
+
+    print(
+        f"{len(servers)} backends, delays {'/'.join(f'{d:g}' for d in args.delays)}ms, "
+        f"{args.parallel} parallel each, {args.requests} requests "
+        f"({args.concurrency} concurrent, {args.models} models)"
+    )
+    try:
+        for strategy in args.strategies:
+            result = await run(strategy, servers, args)
+            report(strategy, result, args.requests)
+    finally:
+        await SESSION_POOL.close()
+        for server in servers:
+            await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--delays",
+        type=parse_list,
+        default=[50, 50, 200],
+        help="comma separated delay of every backend in milliseconds",
+    )
+    parser.add_argument(
+        "--failures",
+        type=parse_list,
+        default=None,
+        help="comma separated failure rate of every backend",
+    )
+    parser.add_argument(
+        "--weights",
+        type=parse_list,
+        default=None,
+        help="comma separated weight of every backend",
+    )
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--models", type=int, default=8)
+    parser.add_argument(
+        "--outage",
+        type=int,
+        default=None,
+        help="index of the backend that is down during the middle of the run",
+    )
+    parser.add_argument("--max-failures", type=int, default=3)
+    parser.add_argument("--cooldown", type=float, default=1.0)
+    parser.add_argument(
+        "--strategies", type=lambda v: parse_list(v, str), default=list(STRATEGIES)
+    )
+    args = parser.parse_args()
+
+    args.failures = args.failures or [0.0] * len(args.delays)
+    args.weights = args.weights or [1.0] * len(args.delays)
+    if not len(args.delays) == len(args.failures) == len(args.weights):
+        parser.error("--delays, --failures and --weights need one value per backend")
+    if args.outage is not None and not 0 <= args.outage < len(args.delays):
+        parser.error("--outage must be the index of a backend")
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
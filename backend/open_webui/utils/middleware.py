@@ -16,7 +16,6 @@ import re
 import ast
 
 from uuid import uuid4
-from concurrent.futures import ThreadPoolExecutor
 
 
 from fastapi import Request, HTTPException
@@ -37,6 +36,7 @@ from open_webui.routers.tasks import (
     generate_follow_ups,
     generate_image_prompt,
     generate_chat_tags,
+    generate_chat_tasks,
 )
 # from open_webui.routers.retrieval import process_web_search, SearchForm
 # from open_webui.routers.images import (
@@ -79,10 +79,15 @@ from open_webui.utils.misc import (
     convert_logit_bias_input_to_json,
 )
 from open_webui.utils.tools import get_tools
+from open_webui.utils.content_blocks import (
+    ContentBlocksSerializer,
+    TagContentScanner,
+)
 from open_webui.utils.plugin import load_function_module_by_id
 from open_webui.utils.filter import (
     get_sorted_filter_ids,
     process_filter_functions,
+    FilterChain,
 )
 # from open_webui.utils.code_interpreter import execute_code_jupyter
 from open_webui.utils.payload import apply_system_prompt_to_body
@@ -99,6 +104,8 @@ from open_webui.env import (
     GLOBAL_LOG_LEVEL,
     CHAT_RESPONSE_STREAM_DELTA_CHUNK_SIZE,
     CHAT_RESPONSE_MAX_TOOL_CALL_RETRIES,
+    CHAT_RESPONSE_MAX_TOOL_CALL_CONCURRENCY,
+    CHAT_RESPONSE_TOOL_CALL_TIMEOUT,
     BYPASS_MODEL_ACCESS_CONTROL,
     ENABLE_REALTIME_CHAT_SAVE,
     ENABLE_QUERIES_CACHE,
@@ -662,36 +669,30 @@ async def chat_completion_files_handler(
             queries = [get_last_user_message(body["messages"])]
 
         try:
-            # Offload get_sources_from_items to a separate thread
-            loop = asyncio.get_running_loop()
-            with ThreadPoolExecutor() as executor:
-                sources = await loop.run_in_executor(
-                    executor,
-                    lambda: get_sources_from_items(
-                        request=request,
-                        items=files,
-                        queries=queries,
-                        embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
-                            query, prefix=prefix, user=user
-                        ),
-                        k=request.app.state.config.TOP_K,
-                        reranking_function=(
-                            (
-                                lambda sentences: request.app.state.RERANKING_FUNCTION(
-                                    sentences, user=user
-                                )
-                            )
-                            if request.app.state.RERANKING_FUNCTION
-                            else None
-                        ),
-                        k_reranker=request.app.state.config.TOP_K_RERANKER,
-                        r=request.app.state.config.RELEVANCE_THRESHOLD,
-                        hybrid_bm25_weight=request.app.state.config.HYBRID_BM25_WEIGHT,
-                        hybrid_search=request.app.state.config.ENABLE_RAG_HYBRID_SEARCH,
-                        full_context=request.app.state.config.RAG_FULL_CONTEXT,
-                        user=user,
-                    ),
-                )
+            sources = await get_sources_from_items(
+                request=request,
+                items=files,
+                queries=queries,
+                embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
+                    query, prefix=prefix, user=user
+                ),
+                k=request.app.state.config.TOP_K,
+                reranking_function=(
+                    (
+                        lambda sentences: request.app.state.RERANKING_FUNCTION(
+                            sentences, user=user
+                        )
+                    )
+                    if request.app.state.RERANKING_FUNCTION
+                    else None
+                ),
+                k_reranker=request.app.state.config.TOP_K_RERANKER,
+                r=request.app.state.config.RELEVANCE_THRESHOLD,
+                hybrid_bm25_weight=request.app.state.config.HYBRID_BM25_WEIGHT,
+                hybrid_search=request.app.state.config.ENABLE_RAG_HYBRID_SEARCH,
+                full_context=request.app.state.config.RAG_FULL_CONTEXT,
+                user=user,
+            )
         except Exception as e:
             log.exception(e)
 
@@ -1111,162 +1112,196 @@ async def process_chat_response(
                 )
 
             if tasks and messages:
-                if (
-                    TASKS.FOLLOW_UP_GENERATION in tasks
-                    and tasks[TASKS.FOLLOW_UP_GENERATION]
-                ):
-                    res = await generate_follow_ups(
-                        request,
-                        {
-                            "model": message["model"],
-                            "messages": messages,
-                            "message_id": metadata["message_id"],
-                            "chat_id": metadata["chat_id"],
-                        },
-                        user,
-                    )
 
-                    if res and isinstance(res, dict):
-                        if len(res.get("choices", [])) == 1:
-                            follow_ups_string = (
-                                res.get("choices", [])[0]
-                                .get("message", {})
-                                .get("content", "")
-                            )
-                        else:
-                            follow_ups_string = ""
+                def get_task_response_json(res) -> Optional[dict]:
+                    if not res or not isinstance(res, dict):
+                        return None
 
-                        follow_ups_string = follow_ups_string[
-                            follow_ups_string.find("{") : follow_ups_string.rfind("}")
-                            + 1
-                        ]
-
-                        try:
-                            follow_ups = json.loads(follow_ups_string).get(
-                                "follow_ups", []
-                            )
-
-                            Chats.upsert_message_to_chat_by_id_and_message_id(
-                                metadata["chat_id"],
-                                metadata["message_id"],
-                                {
-                                    "followUps": follow_ups,
-                                },
-                            )
+                    if len(res.get("choices", [])) == 1:
+                        response_string = (
+                            res.get("choices", [])[0]
+                            .get("message", {})
+                            .get("content", "")
+                        ) or ""
+                    else:
+                        response_string = ""
 
-                            await event_emitter(
-                                {
-                                    "type": "chat:message:follow_ups",
-                                    "data": {
-                                        "follow_ups": follow_ups,
-                                    },
-                                }
-                            )
-                        except Exception as e:
-                            pass
+                    response_string = response_string[
+                        response_string.find("{") : response_string.rfind("}") + 1
+                    ]
 
-                if TASKS.TITLE_GENERATION in tasks:
-                    user_message = get_last_user_message(messages)
-                    if user_message and len(user_message) > 100:
-                        user_message = user_message[:100] + "..."
+                    try:
+                        response_json = json.loads(response_string)
+                        if isinstance(response_json, dict):
+                            return response_json
+                    except Exception as e:
+                        pass
+                    return None
 
-                    if tasks[TASKS.TITLE_GENERATION]:
+                user_message = get_last_user_message(messages)
+                if user_message and len(user_message) > 100:
+                    user_message = user_message[:100] + "..."
 
-                        res = await generate_title(
+                async def follow_up_generation(follow_ups=None):
+                    if follow_ups is None:
+                        res = await generate_follow_ups(
                             request,
                             {
                                 "model": message["model"],
                                 "messages": messages,
+                                "message_id": metadata["message_id"],
                                 "chat_id": metadata["chat_id"],
+                                "use_cache": True,
                             },
                             user,
                         )
 
-                        if res and isinstance(res, dict):
-                            if len(res.get("choices", [])) == 1:
-                                title_string = (
-                                    res.get("choices", [])[0]
-                                    .get("message", {})
-                                    .get(
-                                        "content", message.get("content", user_message)
-                                    )
-                                )
-                            else:
-                                title_string = ""
+                        response_json = get_task_response_json(res)
+                        if response_json is None:
+                            return
+                        follow_ups = response_json.get("follow_ups", [])
 
-                            title_string = title_string[
-                                title_string.find("{") : title_string.rfind("}") + 1
-                            ]
+                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                        metadata["chat_id"],
+                        metadata["message_id"],
+                        {
+                            "followUps": follow_ups,
+                        },
+                    )
 
-                            try:
-                                title = json.loads(title_string).get(
-                                    "title", user_message
-                                )
-                            except Exception as e:
-                                title = ""
+                    await event_emitter(
+                        {
+                            "type": "chat:message:follow_ups",
+                            "data": {
+                                "follow_ups": follow_ups,
+                            },
+                        }
+                    )
+
+                async def title_generation(title=None):
+                    if title is None:
+                        res = await generate_title(
+                            request,
+                            {
+                                "model": message["model"],
+                                "messages": messages,
+                                "chat_id": metadata["chat_id"],
+                                "use_cache": True,
+                            },
+                            user,
+                        )
 
-                            if not title:
-                                title = messages[0].get("content", user_message)
+                        if not res or not isinstance(res, dict):
+                            return
 
-                            Chats.update_chat_title_by_id(metadata["chat_id"], title)
+                        response_json = get_task_response_json(res)
+                        title = (
+                            response_json.get("title", user_message)
+                            if response_json is not None
+                            else ""
+                        )
 
-                            await event_emitter(
-                                {
-                                    "type": "chat:title",
-                                    "data": title,
-                                }
-                            )
-                    elif len(messages) == 2:
+                    if not title:
                         title = messages[0].get("content", user_message)
 
-                        Chats.update_chat_title_by_id(metadata["chat_id"], title)
+                    Chats.update_chat_title_by_id(metadata["chat_id"], title)
 
-                        await event_emitter(
+                    await event_emitter(
+                        {
+                            "type": "chat:title",
+                            "data": title,
+                        }
+                    )
+
+                async def tags_generation(tags=None):
+                    if tags is None:
+                        res = await generate_chat_tags(
+                            request,
                             {
-                                "type": "chat:title",
-                                "data": message.get("content", user_message),
-                            }
+                                "model": message["model"],
+                                "messages": messages,
+                                "chat_id": metadata["chat_id"],
+                                "use_cache": True,
+                            },
+                            user,
                         )
 
-                if TASKS.TAGS_GENERATION in tasks and tasks[TASKS.TAGS_GENERATION]:
-                    res = await generate_chat_tags(
-                        request,
+                        response_json = get_task_response_json(res)
+                        if response_json is None:
+                            return
+                        tags = response_json.get("tags", [])
+
+                    Chats.update_chat_tags_by_id(metadata["chat_id"], tags, user)
+
+                    await event_emitter(
                         {
-                            "model": message["model"],
-                            "messages": messages,
-                            "chat_id": metadata["chat_id"],
-                        },
-                        user,
+                            "type": "chat:tags",
+                            "data": tags,
+                        }
                     )
 
-                    if res and isinstance(res, dict):
-                        if len(res.get("choices", [])) == 1:
-                            tags_string = (
-                                res.get("choices", [])[0]
-                                .get("message", {})
-                                .get("content", "")
-                            )
-                        else:
-                            tags_string = ""
+                task_handlers = {
+                    TASKS.FOLLOW_UP_GENERATION: follow_up_generation,
+                    TASKS.TITLE_GENERATION: title_generation,
+                    TASKS.TAGS_GENERATION: tags_generation,
+                }
+                task_keys = {
+                    TASKS.FOLLOW_UP_GENERATION: ("follow_ups", list),
+                    TASKS.TITLE_GENERATION: ("title", str),
+                    TASKS.TAGS_GENERATION: ("tags", list),
+                }
+                requested_tasks = [task for task in task_handlers if tasks.get(task)]
 
-                        tags_string = tags_string[
-                            tags_string.find("{") : tags_string.rfind("}") + 1
-                        ]
+                # Ask for all of them in one structured completion first, the
+                # tasks the model did not answer are then generated separately
+                results = {}
+                if len(requested_tasks) > 1:
+                    try:
+                        res = await generate_chat_tasks(
+                            request,
+                            {
+                                "model": message["model"],
+                                "messages": messages,
+                                "message_id": metadata["message_id"],
+                                "chat_id": metadata["chat_id"],
+                                "use_cache": True,
+                                "tasks": [str(task) for task in requested_tasks],
+                            },
+                            user,
+                        )
+                        response_json = get_task_response_json(res) or {}
+                    except Exception as e:
+                        log.debug(f"Error generating chat tasks: {e}")
+                        response_json = {}
 
-                        try:
-                            tags = json.loads(tags_string).get("tags", [])
-                            Chats.update_chat_tags_by_id(
-                                metadata["chat_id"], tags, user
-                            )
+                    for task in requested_tasks:
+                        key, value_type = task_keys[task]
+                        if isinstance(response_json.get(key), value_type):
+                            results[task] = response_json[key]
 
-                            await event_emitter(
-                                {
-                                    "type": "chat:tags",
-                                    "data": tags,
-                                }
-                            )
-                        except Exception as e:
-                            pass
+                async def run_task(task):
+                    try:
+                        await task_handlers[task](results.get(task))
+                    except Exception as e:
+                        log.debug(f"Error running {task}: {e}")
+
+                await asyncio.gather(*[run_task(task) for task in requested_tasks])
+
+                if (
+                    TASKS.TITLE_GENERATION in tasks
+                    and not tasks[TASKS.TITLE_GENERATION]
+                    and len(messages) == 2
+                ):
+                    title = messages[0].get("content", user_message)
+
+                    Chats.update_chat_title_by_id(metadata["chat_id"], title)
+
+                    await event_emitter(
+                        {
+                            "type": "chat:title",
+                            "data": message.get("content", user_message),
+                        }
+                    )
 
     event_emitter = None
     event_caller = None
@@ -1441,153 +1476,13 @@ async def process_chat_response(
         task_id = str(uuid4())  # Create a unique task ID.
         model_id = form_data.get("model", "")
 
-        def split_content_and_whitespace(content):
-            content_stripped = content.rstrip()
-            original_whitespace = (
-                content[len(content_stripped) :]
-                if len(content) > len(content_stripped)
-                else ""
-            )
-            return content_stripped, original_whitespace
-
-        def is_opening_code_block(content):
-            backtick_segments = content.split("```")
-            # Even number of segments means the last backticks are opening a new block
-            return len(backtick_segments) > 1 and len(backtick_segments) % 2 == 0
-
         # Handle as a background task
         async def response_handler(response, events):
-            def serialize_content_blocks(content_blocks, raw=False):
-                content = ""
+            content_blocks_serializer = ContentBlocksSerializer()
+            tag_content_scanner = TagContentScanner()
 
-                for block in content_blocks:
-                    if block["type"] == "text":
-                        block_content = block["content"].strip()
-                        if block_content:
-                            content = f"{content}{block_content}\n"
-                    elif block["type"] == "tool_calls":
-                        attributes = block.get("attributes", {})
-
-                        tool_calls = block.get("content", [])
-                        results = block.get("results", [])
-
-                        if content and not content.endswith("\n"):
-                            content += "\n"
-
-                        if results:
-
-                            tool_calls_display_content = ""
-                            for tool_call in tool_calls:
-
-                                tool_call_id = tool_call.get("id", "")
-                                tool_name = tool_call.get("function", {}).get(
-                                    "name", ""
-                                )
-                                tool_arguments = tool_call.get("function", {}).get(
-                                    "arguments", ""
-                                )
-
-                                tool_result = None
-                                tool_result_files = None
-                                for result in results:
-                                    if tool_call_id == result.get("tool_call_id", ""):
-                                        tool_result = result.get("content", None)
-                                        tool_result_files = result.get("files", None)
-                                        break
-
-                                if tool_result:
-                                    tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="true" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}" result="{html.escape(json.dumps(tool_result, ensure_ascii=False))}" files="{html.escape(json.dumps(tool_result_files)) if tool_result_files else ""}">\n<summary>Tool Executed</summary>\n</details>\n'
-                                else:
-                                    tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
-
-                            if not raw:
-                                content = f"{content}{tool_calls_display_content}"
-                        else:
-                            tool_calls_display_content = ""
-
-                            for tool_call in tool_calls:
-                                tool_call_id = tool_call.get("id", "")
-                                tool_name = tool_call.get("function", {}).get(
-                                    "name", ""
-                                )
-                                tool_arguments = tool_call.get("function", {}).get(
-                                    "arguments", ""
-                                )
-
-                                tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
-
-                            if not raw:
-                                content = f"{content}{tool_calls_display_content}"
-
-                    elif block["type"] == "reasoning":
-                        reasoning_display_content = "\n".join(
-                            (f"> {line}" if not line.startswith(">") else line)
-                            for line in block["content"].splitlines()
-                        )
-
-                        reasoning_duration = block.get("duration", None)
-
-                        start_tag = block.get("start_tag", "")
-                        end_tag = block.get("end_tag", "")
-
-                        if content and not content.endswith("\n"):
-                            content += "\n"
-
-                        if reasoning_duration is not None:
-                            if raw:
-                                content = (
-                                    f'{content}{start_tag}{block["content"]}{end_tag}\n'
-                                )
-                            else:
-                                content = f'{content}<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
-                        else:
-                            if raw:
-                                content = (
-                                    f'{content}{start_tag}{block["content"]}{end_tag}\n'
-                                )
-                            else:
-                                content = f'{content}<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
-
-                    elif block["type"] == "code_interpreter":
-                        attributes = block.get("attributes", {})
-                        output = block.get("output", None)
-                        lang = attributes.get("lang", "")
-
-                        content_stripped, original_whitespace = (
-                            split_content_and_whitespace(content)
-                        )
-                        if is_opening_code_block(content_stripped):
-                            # Remove trailing backticks that would open a new block
-                            content = (
-                                content_stripped.rstrip("`").rstrip()
-                                + original_whitespace
-                            )
-                        else:
-                            # Keep content as is - either closing backticks or no backticks
-                            content = content_stripped + original_whitespace
-
-                        if content and not content.endswith("\n"):
-                            content += "\n"
-
-                        if output:
-                            output = html.escape(json.dumps(output))
-
-                            if raw:
-                                content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
-                            else:
-                                content = f'{content}<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
-                        else:
-                            if raw:
-                                content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
-                            else:
-                                content = f'{content}<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
-
-                    else:
-                        block_content = str(block["content"]).strip()
-                        if block_content:
-                            content = f"{content}{block['type']}: {block_content}\n"
-
-                return content.strip()
+            def serialize_content_blocks(content_blocks, raw=False):
+                return content_blocks_serializer.serialize(content_blocks, raw)
 
             def convert_content_blocks_to_messages(content_blocks, raw=False):
                 messages = []
@@ -1655,7 +1550,15 @@ async def process_chat_response(
                                 rf"<{re.escape(start_tag[1:-1])}(\s.*?)?>"
                             )
 
-                        match = re.search(start_tag_pattern, content)
+                        match = tag_content_scanner.search(
+                            start_tag_pattern,
+                            content,
+                            literal=(
+                                None
+                                if start_tag.startswith("<") and start_tag.endswith(">")
+                                else start_tag
+                            ),
+                        )
                         if match:
                             try:
                                 attr_content = (
@@ -1718,7 +1621,9 @@ async def process_chat_response(
                         end_tag_pattern = rf"{re.escape(end_tag)}"
 
                     # Check if the content has the end tag
-                    if re.search(end_tag_pattern, content):
+                    if tag_content_scanner.search(
+                        end_tag_pattern, content, literal=end_tag
+                    ):
                         end_flag = True
 
                         block_content = content_blocks[-1]["content"]
@@ -1875,6 +1780,14 @@ async def process_chat_response(
 
                     response_tool_calls = []
 
+                    # Resolved once, run for every chunk
+                    stream_filter = FilterChain(
+                        request,
+                        filter_functions,
+                        "stream",
+                        {"__body__": form_data, **extra_params},
+                    )
+
                     delta_count = 0
                     delta_chunk_size = max(
                         CHAT_RESPONSE_STREAM_DELTA_CHUNK_SIZE,
@@ -1917,13 +1830,7 @@ async def process_chat_response(
                         try:
                             data = json.loads(data)
 
-                            data, _ = await process_filter_functions(
-                                request=request,
-                                filter_functions=filter_functions,
-                                filter_type="stream",
-                                form_data=data,
-                                extra_params={"__body__": form_data, **extra_params},
-                            )
+                            data, _ = await stream_filter(data)
 
                             if data:
                                 if "event" in data:
@@ -2088,7 +1995,9 @@ async def process_chat_response(
                                                 }
                                             )
 
-                                        content = f"{content}{value}"
+                                        content = tag_content_scanner.append(
+                                            content, value
+                                        )
                                         if not content_blocks:
                                             content_blocks.append(
                                                 {
@@ -2135,10 +2044,10 @@ async def process_chat_response(
 
                                         if ENABLE_REALTIME_CHAT_SAVE:
                                             # Save message in the database
-                                            Chats.upsert_message_to_chat_by_id_and_message_id(
+                                            Chats.buffer_message_update(
                                                 metadata["chat_id"],
                                                 metadata["message_id"],
-                                                {
+                                                set={
                                                     "content": serialize_content_blocks(
                                                         content_blocks
                                                     ),
@@ -2236,9 +2145,7 @@ async def process_chat_response(
 
                     tools = metadata.get("tools", {})
 
-                    results = []
-
-                    for tool_call in response_tool_calls:
+                    async def execute_tool_call(tool_call):
                         tool_call_id = tool_call.get("id", "")
                         tool_name = tool_call.get("function", {}).get("name", "")
                         tool_args = tool_call.get("function", {}).get("arguments", "{}")
@@ -2289,7 +2196,7 @@ async def process_chat_response(
                                 }
 
                                 if tool.get("direct", False):
-                                    tool_result = await event_caller(
+                                    tool_call_coroutine = event_caller(
                                         {
                                             "type": "execute:tool",
                                             "data": {
@@ -2306,10 +2213,17 @@ async def process_chat_response(
 
                                 else:
                                     tool_function = tool["callable"]
-                                    tool_result = await tool_function(
+                                    tool_call_coroutine = tool_function(
                                         **tool_function_params
                                     )
 
+                                tool_result = await asyncio.wait_for(
+                                    tool_call_coroutine,
+                                    timeout=CHAT_RESPONSE_TOOL_CALL_TIMEOUT,
+                                )
+
+                            except asyncio.TimeoutError:
+                                tool_result = f"Tool call timed out after {CHAT_RESPONSE_TOOL_CALL_TIMEOUT} seconds"
                             except Exception as e:
                                 tool_result = str(e)
 
@@ -2328,17 +2242,32 @@ async def process_chat_response(
                                 tool_result, indent=2, ensure_ascii=False
                             )
 
-                        results.append(
-                            {
-                                "tool_call_id": tool_call_id,
-                                "content": tool_result,
-                                **(
-                                    {"files": tool_result_files}
-                                    if tool_result_files
-                                    else {}
-                                ),
-                            }
-                        )
+                        return {
+                            "tool_call_id": tool_call_id,
+                            "content": tool_result,
+                            **(
+                                {"files": tool_result_files}
+                                if tool_result_files
+                                else {}
+                            ),
+                        }
+
+                    tool_call_semaphore = asyncio.Semaphore(
+                        CHAT_RESPONSE_MAX_TOOL_CALL_CONCURRENCY
+                    )
+
+                    async def execute_tool_call_limited(tool_call):
+                        async with tool_call_semaphore:
+                            return await execute_tool_call(tool_call)
+
+                    # Run the calls concurrently, the results keep the order of the calls.
+                    # Cancelling the response task (stop_task) cancels the pending calls.
+                    results = await asyncio.gather(
+                        *[
+                            execute_tool_call_limited(tool_call)
+                            for tool_call in response_tool_calls
+                        ]
+                    )
 
                     content_blocks[-1]["results"] = results
 
@@ -2591,6 +2520,10 @@ async def process_chat_response(
                             "content": serialize_content_blocks(content_blocks),
                         },
                     )
+                else:
+                    Chats.flush_message_updates(
+                        metadata["chat_id"], metadata["message_id"]
+                    )
 
                 # Send a webhook notification if the user is not active
                 if not get_active_status_by_user_id(user.id):
@@ -2629,6 +2562,10 @@ async def process_chat_response(
                             "content": serialize_content_blocks(content_blocks),
                         },
                     )
+                else:
+                    Chats.flush_message_updates(
+                        metadata["chat_id"], metadata["message_id"]
+                    )
 
             if response.background is not None:
                 await response.background()
@@ -2641,26 +2578,19 @@ async def process_chat_response(
             def wrap_item(item):
                 return f"data: {item}\n\n"
 
+            # Resolved once, run for every chunk
+            stream_filter = FilterChain(
+                request, filter_functions, "stream", extra_params
+            )
+
             for event in events:
-                event, _ = await process_filter_functions(
-                    request=request,
-                    filter_functions=filter_functions,
-                    filter_type="stream",
-                    form_data=event,
-                    extra_params=extra_params,
-                )
+                event, _ = await stream_filter(event)
 
                 if event:
                     yield wrap_item(json.dumps(event))
 
             async for data in original_generator:
-                data, _ = await process_filter_functions(
-                    request=request,
-                    filter_functions=filter_functions,
-                    filter_type="stream",
-                    form_data=data,
-                    extra_params=extra_params,
-                )
+                data, _ = await stream_filter(data)
 
                 if data:
                     yield data
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Request
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class ModelRegistry:
+    """
+    In-memory model list of a provider with stale-while-revalidate refreshes.
+
+    The cached list is keyed by `get_key(request)`, which must only depend on
+    the connection settings (not on the request or user), so every caller
+    shares one entry. For the same reason it is loaded without a user, so no
+    user info headers are forwarded for a list that is served to everyone.
+
+    Once the list is older than `ttl` it is still served immediately while a
+    single background task reloads it; callers only wait on the first load and
+    after the connection settings changed. A `ttl` of None never expires the
+    list on its own.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        load: Callable[[Request], Awaitable[Any]],
+        get_key: Callable[[Request], str],
+        ttl: Optional[float],
+    ):
+        self.name = name
+        self.load = load
+        self.get_key = get_key
+        self.ttl = ttl
+
+        self.models = None
+        self.key: Optional[str] = None
+        self.loaded_at = 0.0
+
+        self._task: Optional[asyncio.Task] = None
+        self._task_key: Optional[str] = None
+
+    def is_fresh(self) -> bool:
+        return self.ttl is None or time.monotonic() - self.loaded_at < self.ttl
+
+    async def _load(self, request: Request, key: str):
+        start = time.monotonic()
+        models = await self.load(request)
+        self.models, self.key, self.loaded_at = models, key, time.monotonic()
+        log.debug(f"{self.name} models loaded in {self.loaded_at - start:.3f}s")
+        return models
+
+    def _refresh(self, request: Request, key: str) -> asyncio.Task:
+        # Single flight: concurrent callers share the load for the same settings
+        if self._task is None or self._task.done() or self._task_key != key:
+            self._task = asyncio.create_task(self._load(request, key))
+            self._task_key = key
+            self._task.add_done_callback(self._on_done)
+        return self._task
+
+    def _on_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            log.error(f"Failed to refresh {self.name} models: {task.exception()}")
+
+    async def get(self, request: Request, refresh: bool = False):
+        key = self.get_key(request)
+        if self.models is not None and self.key == key and not refresh:
+            if not self.is_fresh():
+                self._refresh(request, key)
+            return self.models
+
+        # Shield the shared load from the cancellation of a single caller
+        return await asyncio.shield(self._refresh(request, key))
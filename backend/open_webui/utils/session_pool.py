@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+import weakref
+from typing import Optional
+
+import aiohttp
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    AIOHTTP_CLIENT_POOL_LIMIT,
+    AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST,
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_DNS_CACHE_TTL,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class ClientSessionPool:
+    """
+    Application-scoped aiohttp sessions shared by all upstream requests.
+
+    Reusing one session (and therefore one connector) per event loop keeps
+    connections to model backends, tool servers, pipelines and webhooks alive
+    between requests instead of paying TCP/TLS setup on every call.
+
+    Sessions are created without a default timeout override; callers pass a
+    per-request `timeout=` where they previously configured one on their own
+    session. Responses must be released (or used as context managers) so the
+    connection goes back to the pool; sessions are only closed on shutdown.
+
+    Cookies are never stored: the session is shared by all users, so a cookie
+    set on one user's upstream response must not be sent with the next user's
+    request. Cookies passed to a single request with `cookies=` are still sent.
+    """
+
+    def __init__(self):
+        self._sessions: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.requests = 0
+        self.active_requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.queued = 0
+        self.queue_wait = 0.0
+
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.requests += 1
+            self.active_requests += 1
+
+        async def on_request_done(session, context, params):
+            self.active_requests -= 1
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_connection_queued_start(session, context, params):
+            context.queued_at = time.monotonic()
+            self.queued += 1
+
+        async def on_connection_queued_end(session, context, params):
+            self.queue_wait += time.monotonic() - context.queued_at
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_done)
+        trace_config.on_request_exception.append(on_request_done)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        return trace_config
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=AIOHTTP_CLIENT_POOL_LIMIT,
+            limit_per_host=AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=AIOHTTP_CLIENT_DNS_CACHE_TTL,
+            use_dns_cache=AIOHTTP_CLIENT_DNS_CACHE_TTL is not None,
+            keepalive_timeout=AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT,
+            enable_cleanup_closed=True,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            trust_env=True,
+            trace_configs=[self._create_trace_config()],
+        )
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session of the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = self._create_session()
+            self._sessions[loop] = session
+        return session
+
+    async def start(self):
+        self.get_session()
+        log.info(
+            "Started HTTP client pool "
+            f"(limit={AIOHTTP_CLIENT_POOL_LIMIT or 'none'}, "
+            f"limit_per_host={AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST or 'none'})"
+        )
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+        # Sessions of other (finished) loops cannot be awaited from here
+        self._sessions.clear()
+
+    def stats(self) -> dict:
+        connections = self.connections_created + self.connections_reused
+        return {
+            "requests": self.requests,
+            "active_requests": self.active_requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_rate": self.connections_reused / connections if connections else 0.0,
+            "queued": self.queued,
+            "queue_wait_seconds": round(self.queue_wait, 3),
+            "limit": AIOHTTP_CLIENT_POOL_LIMIT,
+            "limit_per_host": AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST,
+        }
+
+
+SESSION_POOL = ClientSessionPool()
+
+
+def get_session() -> aiohttp.ClientSession:
+    return SESSION_POOL.get_session()
+
+
+async def cleanup_response(response: Optional[aiohttp.ClientResponse]):
+    """Return the connection of a (possibly streamed) response to the pool."""
+    if response:
+        response.release()
@@ -1,3 +1,4 @@
+import json
 import logging
 import math
 import re
@@ -8,6 +9,7 @@ import uuid
 
 from open_webui.utils.misc import get_last_user_message, get_messages_content
 
+from open_webui.constants import TASKS
 from open_webui.env import SRC_LOG_LEVELS
 from open_webui.config import DEFAULT_RAG_TEMPLATE
 
@@ -261,6 +263,50 @@ def tags_generation_template(
     return template
 
 
+# Fields of the combined chat tasks generation: task -> (key, description, example)
+CHAT_TASKS_GENERATION_FIELDS = {
+    TASKS.TITLE_GENERATION: (
+        "title",
+        "a concise, 3-5 word title with an emoji summarizing the chat history, without quotation marks or special formatting",
+        "📉 Stock Market Trends",
+    ),
+    TASKS.TAGS_GENERATION: (
+        "tags",
+        '1-3 broad tags categorizing the main themes of the chat history (e.g. Science, Technology, Arts, Business, Health), along with 1-3 more specific subtopic tags; use only ["General"] if the chat is too short or too diverse',
+        ["Business", "Finance", "Stock Market"],
+    ),
+    TASKS.FOLLOW_UP_GENERATION: (
+        "follow_ups",
+        "3-5 concise follow-up questions the user might naturally ask next, written from the user's point of view and not repeating what was already covered",
+        [
+            "How do interest rates affect stock prices?",
+            "What is a good first index fund?",
+        ],
+    ),
+}
+
+
+def chat_tasks_generation_template(
+    template: str, messages: list[dict], tasks: list[str], user: Optional[Any] = None
+) -> str:
+    fields = [CHAT_TASKS_GENERATION_FIELDS[task] for task in tasks]
+    template = template.replace(
+        "{{TASKS}}",
+        "\n".join(f'- "{key}": {description}' for key, description, _ in fields),
+    )
+    template = template.replace(
+        "{{OUTPUT}}",
+        json.dumps({key: example for key, _, example in fields}, ensure_ascii=False),
+    )
+
+    prompt = get_last_user_message(messages)
+    template = replace_prompt_variable(template, prompt)
+    template = replace_messages_variable(template, messages)
+
+    template = prompt_template(template, user)
+    return template
+
+
 def image_prompt_generation_template(
     template: str, messages: list[dict], user: Optional[Any] = None
 ) -> str:
@@ -1,9 +1,9 @@
 import json
 import logging
-import aiohttp
 
 from open_webui.config import WEBUI_FAVICON_URL
 from open_webui.env import SRC_LOG_LEVELS, VERSION
+from open_webui.utils.session_pool import get_session
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["WEBHOOK"])
@@ -42,11 +42,10 @@ async def post_webhook(name: str, url: str, message: str, event_data: dict) -> b
             payload = {**event_data}
 
         log.debug(f"payload: {payload}")
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as r:
-                r_text = await r.text()
-                r.raise_for_status()
-                log.debug(f"r.text: {r_text}")
+        async with get_session().post(url, json=payload) as r:
+            r_text = await r.text()
+            r.raise_for_status()
+            log.debug(f"r.text: {r_text}")
 
         return True
     except Exception as e: